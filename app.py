@@ -1,26 +1,50 @@
 import os
 import json
 import re
-from flask import Flask, render_template, request, redirect, url_for, flash, jsonify
-from flask_wtf.csrf import CSRFProtect
+import hashlib
+import importlib.util
+from flask import Flask, Response, current_app, has_app_context, render_template, request, redirect, url_for, flash, jsonify, stream_with_context
+from flask_wtf.csrf import CSRFProtect, validate_csrf
+from wtforms.validators import ValidationError
 from werkzeug.utils import secure_filename
 from bs4 import BeautifulSoup
-import nltk
-from nltk.tokenize import word_tokenize
-from nltk.util import ngrams
 from collections import Counter
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+import multiprocessing
+import threading
 import uuid
 from datetime import datetime
-from openai import OpenAI
 from dotenv import load_dotenv
 import requests
+import xml.etree.ElementTree as ET
 from urllib.parse import urlparse
+from fetcher import PageCache
+from fingerprint import DuplicateIndex, simhash
+from scheduler import HostScheduler
+from selector_engine import SelectorMatcher
+from jobs import JobError, JobManager
+from llm_cache import LLMCache
+from sitemaps import SITEMAP_MAX_BYTES, discover_sitemap_urls, parse_url_list
+from storage import KEYWORD_SORTS, KEYWORD_TIERS, compress_json, create_store, decompress_json
+import metrics
+from metrics import stage_timer
 
 # Load environment variables
 load_dotenv()
 
-# Initialize OpenAI client (will automatically use OPENAI_API_KEY from environment)
-client = OpenAI()
+# OpenAI client, created on first use by get_openai_client() (reads OPENAI_API_KEY from environment)
+openai_client = None
+_openai_client_lock = threading.Lock()
+
+# OpenAI settings for SEO keyword analysis
+OPENAI_MODEL = "gpt-4o"
+OPENAI_TEMPERATURE = 0.3
+OPENAI_MAX_TOKENS = 2000
+SEO_KEYWORD_LIMIT = 40  # Analyze top 40 keywords
+SEO_CHUNK_SIZE = 40  # Keywords per request when analyzing the full list in chunks
+RANKING_DIFF_LIMIT = 100  # Keywords listed per change type in a refreshed analysis' ranking diff
+SEO_SYSTEM_PROMPT = "You are a senior ecommerce SEO strategist with expertise in competitive keyword analysis and product page optimization. Provide actionable insights for PDP optimization."
 
 # Browser headers for web scraping
 BROWSER_HEADERS = {
@@ -29,25 +53,230 @@ BROWSER_HEADERS = {
     'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
 }
 
-# Download required NLTK data
-try:
-    nltk.data.find('tokenizers/punkt')
-except LookupError:
-    nltk.download('punkt')
-
-app = Flask(__name__)
-app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'seo2025')
-app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max file size
-app.config['WTF_CSRF_ENABLED'] = True
-app.config['WTF_CSRF_TIME_LIMIT'] = 3600  # 1 hour
-app.config['WTF_CSRF_SSL_STRICT'] = False  # Allow HTTP in development
-csrf = CSRFProtect(app)
-
-# Ensure data directory exists
-os.makedirs('data', exist_ok=True)
-
-def crawl_url(url):
-    """Crawl a URL and extract content with SEO metadata"""
+# Keyword count multiplier per page section - title matters most for SEO, then
+# description and specs (key product attributes), then supporting context
+DEFAULT_FIELD_WEIGHTS = {
+    'product_title': 3,
+    'description': 2,
+    'specifications': 2,
+    'breadcrumbs': 1,
+    'reviews': 1,
+    'price_info': 1,
+    'main_content': 1,
+    'meta_title': 1,
+    'meta_description': 1
+}
+
+# Refined stop words - removed some ecommerce-valuable terms, added more noise words
+_BASE_STOP_WORDS = {
+    # Basic stop words
+    'a', 'an', 'and', 'are', 'as', 'at', 'be', 'by', 'for', 'from', 'has', 'he', 
+    'in', 'is', 'it', 'its', 'of', 'on', 'that', 'the', 'to', 'was', 'will', 'with',
+    'i', 'you', 'your', 'we', 'they', 'them', 'this', 'these', 'those', 'or', 'but',
+    'if', 'then', 'else', 'when', 'where', 'why', 'how', 'all', 'any', 'both', 'each',
+    'few', 'more', 'most', 'other', 'some', 'such', 'no', 'nor', 'not', 'only', 'own',
+    'same', 'so', 'than', 'too', 'very', 'can', 'will', 'just', 'should', 'now',
+    
+    # Generic ecommerce noise (keep valuable terms like "product", "price", "quality")
+    'account', 'com', 'login', 'checkout', 'cart', 'currently', 'available',
+    'please', 'click', 'here', 'view', 'see', 'per', 'use', 'within', 'inc', 
+    'log', 'must', 'option', 'yes', 'no', 'also', 'cancel', 'password', 'create', 
+    'get', 'canceled', 'submitted', 'sign', 'up', 'register', 'login', 'logout',
+    
+    # Website navigation noise
+    'home', 'page', 'next', 'previous', 'back', 'top', 'bottom', 'menu', 'link',
+    'button', 'tab', 'section', 'content', 'main', 'sidebar', 'footer', 'header',
+    
+    # Generic action words without product context
+    'read', 'learn', 'find', 'discover', 'explore', 'browse', 'visit', 'contact',
+    'about', 'help', 'support', 'faq', 'terms', 'privacy', 'policy', 'legal'
+}
+
+# Ecommerce-valuable terms to preserve (removed from stop words if present)
+PRESERVE_TERMS = frozenset({
+    'product', 'products', 'price', 'prices', 'cost', 'quality', 'brand', 'brands',
+    'shipping', 'delivery', 'return', 'returns', 'warranty', 'guarantee',
+    'review', 'reviews', 'rating', 'ratings', 'customer', 'customers',
+    'sale', 'discount', 'offer', 'deal', 'promotion', 'free', 'premium',
+    'size', 'sizes', 'color', 'colors', 'style', 'styles', 'model', 'models',
+    'material', 'materials', 'feature', 'features', 'specification', 'specs'
+})
+
+STOP_WORDS = frozenset(_BASE_STOP_WORDS - PRESERVE_TERMS)
+
+# Allow 2-letter words for sizes
+SIZE_ABBREVIATIONS = frozenset({'xs', 'sm', 'md', 'lg', 'xl', 'os'})
+
+# Substrings that mark quality/attribute keywords (strategic tier 4)
+QUALITY_TERMS = (
+    'premium', 'professional', 'advanced', 'pro', 'deluxe', 'luxury',
+    'organic', 'natural', 'eco', 'sustainable', 'biodegradable',
+    'wireless', 'bluetooth', 'smart', 'digital', 'electronic',
+    'waterproof', 'durable', 'lightweight', 'portable', 'compact',
+    'multi', 'ultra', 'super', 'extra', 'plus', 'max', 'high',
+    'quality', 'best', 'top', 'rated', 'popular', 'featured'
+)
+QUALITY_TERMS_PATTERN = re.compile('|'.join(re.escape(term) for term in QUALITY_TERMS))
+
+NON_WORD_PATTERN = re.compile(r'[^\w\s]')
+
+# Contractions NLTK's treebank tokenizer splits even without punctuation
+TREEBANK_SPLIT_WORDS = {
+    'cannot': ('can', 'not'),
+    'gimme': ('gim', 'me'),
+    'gonna': ('gon', 'na'),
+    'gotta': ('got', 'ta'),
+    'lemme': ('lem', 'me'),
+    'wanna': ('wan', 'na')
+}
+
+csrf = CSRFProtect()
+
+# Services of the module-level app; every app made by create_app() has its own in
+# flask_app.extensions['services'], looked up with get_service()
+SERVICES = ('analysis_store', 'job_manager', 'llm_cache', 'page_cache', 'fetch_scheduler')
+analysis_store = None  # Saved analyses: summary, ranked keywords and compressed per-URL token tables
+job_manager = None  # Background analysis jobs (POST /crawl returns immediately with a job ID)
+llm_cache = None  # Memoized LLM analyses, keyed on the keyword payload, product title, model and temperature
+page_cache = None  # Conditional-GET cache so unchanged competitor pages are revalidated instead of re-downloaded
+fetch_scheduler = None  # Per-host politeness (concurrency, spacing, backoff, robots.txt) shared by all crawls
+parse_pool = None  # Optional process pool for parsing and tokenizing (PARSE_PROCESSES), created on first use
+_parse_pool_lock = threading.Lock()
+
+def create_app(config=None):
+    """Create and configure the Flask application
+    
+    Nothing here touches the network or the filesystem: the OpenAI client is
+    created on first use, and data/ directories when something is first written.
+    """
+    flask_app = Flask(__name__)
+    flask_app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'seo2025')
+    flask_app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max file size
+    flask_app.config['WTF_CSRF_ENABLED'] = True
+    flask_app.config['WTF_CSRF_TIME_LIMIT'] = 3600  # 1 hour
+    flask_app.config['WTF_CSRF_SSL_STRICT'] = False  # Allow HTTP in development
+    flask_app.config['CRAWL_MAX_WORKERS'] = int(os.environ.get('CRAWL_MAX_WORKERS', 6))  # Concurrent URL fetches per analysis
+    flask_app.config['CRAWL_JOB_WORKERS'] = int(os.environ.get('CRAWL_JOB_WORKERS', 2))  # Analyses run in the background at once
+    flask_app.config['JOB_TTL'] = int(os.environ.get('JOB_TTL', 7 * 24 * 3600))  # Seconds finished jobs' status files are kept
+    flask_app.config['FIELD_WEIGHTS'] = parse_field_weights(os.environ.get('FIELD_WEIGHTS', '{}'))
+    flask_app.config['KEYWORD_BACKEND'] = os.environ.get('KEYWORD_BACKEND', 'auto')  # 'auto', 'python' or 'matrix'
+    flask_app.config['MATRIX_BACKEND_MIN_DOCS'] = int(os.environ.get('MATRIX_BACKEND_MIN_DOCS', 50))
+    flask_app.config['SEO_MAX_CONCURRENCY'] = int(os.environ.get('SEO_MAX_CONCURRENCY', 4))  # Parallel OpenAI requests per chunked analysis
+    flask_app.config['SEO_TOKEN_BUDGET'] = int(os.environ.get('SEO_TOKEN_BUDGET', 60000))  # Estimated prompt + completion tokens per chunked analysis
+    flask_app.config['LLM_CACHE_ENABLED'] = os.environ.get('LLM_CACHE_ENABLED', '1') != '0'
+    flask_app.config['LLM_CACHE_DIR'] = os.environ.get('LLM_CACHE_DIR', os.path.join('data', 'llm_cache'))
+    flask_app.config['LLM_CACHE_MEMORY_ENTRIES'] = int(os.environ.get('LLM_CACHE_MEMORY_ENTRIES', 256))
+    flask_app.config['HTTP_CACHE_ENABLED'] = os.environ.get('HTTP_CACHE_ENABLED', '1') != '0'
+    flask_app.config['HTTP_CACHE_DIR'] = os.environ.get('HTTP_CACHE_DIR', os.path.join('data', 'http_cache'))
+    flask_app.config['HTTP_CACHE_MAX_BYTES'] = int(os.environ.get('HTTP_CACHE_MAX_BYTES', 1024 * 1024 * 1024))  # Page bodies kept on disk (0 = no limit)
+    flask_app.config['ANALYSIS_STORE'] = os.environ.get('ANALYSIS_STORE', 'sqlite')  # 'sqlite' or 'json' (legacy one file per analysis)
+    flask_app.config['KEYWORDS_API_MAX_PER_PAGE'] = int(os.environ.get('KEYWORDS_API_MAX_PER_PAGE', 500))
+    flask_app.config['ANALYSIS_TIMINGS'] = os.environ.get('ANALYSIS_TIMINGS', '0') == '1'  # Store a per-stage timing breakdown with each analysis
+    flask_app.config['CRAWL_HOST_CONCURRENCY'] = int(os.environ.get('CRAWL_HOST_CONCURRENCY', 2))  # Requests in flight per host across all analyses
+    flask_app.config['CRAWL_HOST_DELAY'] = float(os.environ.get('CRAWL_HOST_DELAY', 0.5))  # Seconds between request starts on one host
+    flask_app.config['CRAWL_MAX_RETRIES'] = int(os.environ.get('CRAWL_MAX_RETRIES', 2))  # Retries after a 429/503 answer
+    flask_app.config['CRAWL_MAX_BACKOFF'] = float(os.environ.get('CRAWL_MAX_BACKOFF', 60))  # Longest wait honoured from Retry-After or backoff
+    flask_app.config['ROBOTS_TXT_ENABLED'] = os.environ.get('ROBOTS_TXT_ENABLED', '1') != '0'
+    flask_app.config['ROBOTS_USER_AGENT'] = os.environ.get('ROBOTS_USER_AGENT', '*')  # Agent token matched against robots.txt rules
+    flask_app.config['ROBOTS_CACHE_TTL'] = int(os.environ.get('ROBOTS_CACHE_TTL', 3600))  # Seconds a fetched robots.txt is reused
+    flask_app.config['DEDUPLICATE_PAGES'] = os.environ.get('DEDUPLICATE_PAGES', '1') != '0'  # Skip near-duplicate pages before tokenizing
+    flask_app.config['DUPLICATE_MAX_DISTANCE'] = int(os.environ.get('DUPLICATE_MAX_DISTANCE', 3))  # SimHash bits two near-duplicate pages may differ by
+    flask_app.config['PARSE_PROCESSES'] = int(os.environ.get('PARSE_PROCESSES', 0))  # Worker processes for parsing and tokenizing (0 = in the crawl threads)
+    flask_app.config['BULK_MAX_URLS'] = int(os.environ.get('BULK_MAX_URLS', 500))  # Pages per bulk (sitemap / URL list) analysis
+    flask_app.config['BULK_MAX_WORKERS'] = int(os.environ.get('BULK_MAX_WORKERS', 8))  # Concurrent page fetches per bulk analysis
+    flask_app.config['FETCH_MAX_BYTES'] = int(os.environ.get('FETCH_MAX_BYTES', 10 * 1024 * 1024))  # Decoded page bytes read per URL (0 = no limit)
+    flask_app.config['FETCH_STOP_MARKER'] = os.environ.get('FETCH_STOP_MARKER', '')  # e.g. '</main>' to stop reading once the content area has arrived
+    if config:
+        flask_app.config.update(config)
+    
+    csrf.init_app(flask_app)
+    flask_app.extensions['services'] = init_services(flask_app.config)
+    register_routes(flask_app)
+    return flask_app
+
+def parse_field_weights(value):
+    """DEFAULT_FIELD_WEIGHTS updated with the JSON object in a FIELD_WEIGHTS setting"""
+    try:
+        overrides = json.loads(value)
+    except ValueError as e:
+        raise ValueError(f'FIELD_WEIGHTS is not valid JSON ({e}): {value!r}') from None
+    if not isinstance(overrides, dict) or not all(
+            isinstance(weight, (int, float)) and not isinstance(weight, bool) for weight in overrides.values()):
+        raise ValueError(f'FIELD_WEIGHTS must be a JSON object of numeric section weights, '
+                         f'e.g. {{"product_title": 4, "reviews": 0}}: {value!r}')
+    return dict(DEFAULT_FIELD_WEIGHTS, **overrides)
+
+def init_services(config):
+    """The storage, job and cache services for an app configuration, by name (see SERVICES)"""
+    return {
+        'analysis_store': create_store(config['ANALYSIS_STORE'], 'data'),
+        'job_manager': JobManager(max_workers=config['CRAWL_JOB_WORKERS'], state_dir=os.path.join('data', 'jobs'),
+                                  job_ttl=config['JOB_TTL']),
+        'llm_cache': LLMCache(config['LLM_CACHE_DIR'], config['LLM_CACHE_MEMORY_ENTRIES']) if config['LLM_CACHE_ENABLED'] else None,
+        'page_cache': PageCache(config['HTTP_CACHE_DIR'], config['HTTP_CACHE_MAX_BYTES'] or None)
+        if config['HTTP_CACHE_ENABLED'] else None,
+        'fetch_scheduler': HostScheduler(
+            max_per_host=config['CRAWL_HOST_CONCURRENCY'],
+            min_delay=config['CRAWL_HOST_DELAY'],
+            max_retries=config['CRAWL_MAX_RETRIES'],
+            max_backoff=config['CRAWL_MAX_BACKOFF'],
+            user_agent=config['ROBOTS_USER_AGENT'],
+            headers=BROWSER_HEADERS,
+            respect_robots=config['ROBOTS_TXT_ENABLED'],
+            robots_ttl=config['ROBOTS_CACHE_TTL']
+        )
+    }
+
+def get_setting(name):
+    """Config value of the current app, or of the module-level app outside an app context"""
+    return (current_app if has_app_context() else app).config[name]
+
+def get_service(name):
+    """A service (see SERVICES) of the current app, or of the module-level app outside an app context
+    
+    The module-level app's services are read from the module attributes of the
+    same name, so scripts and tests can swap them.
+    """
+    flask_app = current_app._get_current_object() if has_app_context() else app
+    if flask_app is app:
+        return globals()[name]
+    return flask_app.extensions['services'][name]
+
+def in_app_context(func):
+    """Wrap func to run in the current app's context, for worker threads that read settings or services"""
+    flask_app = current_app._get_current_object() if has_app_context() else app
+    
+    def run(*args, **kwargs):
+        with flask_app.app_context():
+            return func(*args, **kwargs)
+    return run
+
+def get_openai_client():
+    """The shared OpenAI client, created (and the SDK imported) on first use"""
+    global openai_client
+    if openai_client is None:
+        with _openai_client_lock:
+            if openai_client is None:
+                from openai import OpenAI
+                openai_client = OpenAI()
+    return openai_client
+
+class AnalysisError(JobError):
+    """Raised when an analysis cannot produce a result, e.g. too few URLs crawled"""
+
+def get_fetch_options():
+    """Keyword arguments for fetch_page() from the download limit settings"""
+    return {
+        'max_bytes': get_setting('FETCH_MAX_BYTES') or None,
+        'stop_marker': get_setting('FETCH_STOP_MARKER') or None
+    }
+
+def fetch_url(url, timings=None, fetch_options=None):
+    """Download a URL politely, returning (FetchResult, None) or (None, error message)
+    
+    The fetch duration is recorded like crawl_url()'s stages; fetch_options
+    are passed on to fetch_page() (see get_fetch_options()).
+    """
     try:
         # Validate URL format
         parsed_url = urlparse(url)
@@ -58,94 +287,22 @@ def crawl_url(url):
         if not url.startswith(('http://', 'https://')):
             url = 'https://' + url
         
-        # Make request with browser headers and timeout
-        response = requests.get(url, headers=BROWSER_HEADERS, timeout=30)
-        response.raise_for_status()
-        
-        # Parse HTML content
-        soup = BeautifulSoup(response.content, 'lxml')
-        
-        # Extract SEO metadata
-        meta_title = ""
-        meta_description = ""
-        
-        title_tag = soup.find('title')
-        if title_tag:
-            meta_title = title_tag.get_text().strip()
-        
-        meta_desc_tag = soup.find('meta', attrs={'name': 'description'})
-        if meta_desc_tag:
-            meta_description = meta_desc_tag.get('content', '').strip()
-        
-        # Extract ecommerce-specific content with weighted importance
-        ecommerce_content = extract_ecommerce_content(soup)
-        
-        # Build prioritized content string with weighted repetition for importance
-        weighted_content = []
-        
-        # Product title (weight: 3x) - most important for SEO
-        if ecommerce_content['product_title']:
-            weighted_content.extend([ecommerce_content['product_title']] * 3)
-        
-        # Product description (weight: 2x) - very important
-        if ecommerce_content['description']:
-            weighted_content.extend([ecommerce_content['description']] * 2)
-        
-        # Specifications (weight: 2x) - contains key product attributes
-        if ecommerce_content['specifications']:
-            weighted_content.extend([ecommerce_content['specifications']] * 2)
-        
-        # Breadcrumbs (weight: 1x) - category context
-        if ecommerce_content['breadcrumbs']:
-            weighted_content.append(ecommerce_content['breadcrumbs'])
-        
-        # Reviews (weight: 1x) - customer language
-        if ecommerce_content['reviews']:
-            weighted_content.append(ecommerce_content['reviews'])
-        
-        # Price info (weight: 1x) - less important for keyword extraction
-        if ecommerce_content['price_info']:
-            weighted_content.append(ecommerce_content['price_info'])
-        
-        # Fallback to generic content extraction if no ecommerce content found
-        if not any(ecommerce_content.values()):
-            # Try to find main content areas
-            content_selectors = [
-                'main', 'article', '[role="main"]', '.content', '.main-content',
-                '#content', '#main', '.post-content', '.entry-content', '.article-content'
-            ]
-            
-            main_content = ""
-            for selector in content_selectors:
-                content_elem = soup.select_one(selector)
-                if content_elem:
-                    main_content = content_elem.get_text()
-                    break
-            
-            if not main_content:
-                # Remove navigation, header, footer, sidebar elements
-                for elem in soup(['nav', 'header', 'footer', 'aside', '.sidebar', '.navigation', '.menu']):
-                    elem.decompose()
-                
-                body = soup.find('body')
-                if body:
-                    main_content = body.get_text()
-                else:
-                    main_content = soup.get_text()
-            
-            weighted_content.append(main_content)
+        # Make request with browser headers and timeout over the pooled session for this host,
+        # waiting for the host's turn under the shared politeness limits
+        page_cache = get_service('page_cache')
+        with stage_timer('fetch', timings):
+            response = get_service('fetch_scheduler').fetch(url, headers=BROWSER_HEADERS, timeout=30,
+                                                            cache=page_cache, **(fetch_options or {}))
         
-        # Combine all weighted content
-        combined_content = ' '.join(weighted_content)
-        clean_text = clean_html(combined_content)
+        metrics.PAGE_BYTES.observe(len(response.content))
+        if response.truncated:
+            metrics.TRUNCATED_PAGES.inc(reason=response.truncated)
+        if page_cache is not None:
+            metrics.CACHE_REQUESTS.inc(cache='http', result='hit' if response.from_cache else 'miss')
+        if not response.from_cache:
+            metrics.DOWNLOADED_BYTES.inc(len(response.content))
         
-        return {
-            'url': url,
-            'title': meta_title,
-            'description': meta_description,
-            'content': clean_text,
-            'status': 'success'
-        }, None
+        return response, None
         
     except requests.exceptions.Timeout:
         return None, f"Timeout error for {url}"
@@ -154,136 +311,837 @@ def crawl_url(url):
     except Exception as e:
         return None, f"Unexpected error for {url}: {str(e)}"
 
+def process_page(content, url, timings=None):
+    """Parse downloaded HTML and extract its content sections and SEO metadata
+    
+    Needs no app context or network, so it can run in a worker process.
+    """
+    # Parse HTML content once; everything below reads text out of this tree
+    with stage_timer('parse', timings):
+        soup = BeautifulSoup(content, 'lxml')
+        strip_non_content(soup)
+    
+    # Extract SEO metadata
+    meta_title = ""
+    meta_description = ""
+    
+    title_tag = soup.find('title')
+    if title_tag:
+        meta_title = title_tag.get_text().strip()
+    
+    meta_desc_tag = soup.find('meta', attrs={'name': 'description'})
+    if meta_desc_tag:
+        meta_description = meta_desc_tag.get('content', '').strip()
+    
+    with stage_timer('extract', timings):
+        sections = extract_page_sections(soup)
+    
+    # Section weighting happens at tokenization time (see FIELD_WEIGHTS), so the
+    # plain content string just lists each section once
+    clean_text = ' '.join(text for text in sections.values() if text)
+    
+    return {
+        'url': url,
+        'title': meta_title,
+        'description': meta_description,
+        'content': clean_text,
+        'sections': sections,
+        'status': 'success'
+    }
+
+def tokenize_page(crawl_result, weights=None):
+    """Weighted keyword counts for a processed page: its sections plus SEO metadata"""
+    fields = dict(crawl_result['sections'])
+    fields['meta_title'] = crawl_result['title']
+    fields['meta_description'] = crawl_result['description']
+    return tokenize_fields(fields, weights)
+
+def content_hash(crawl_result, weights=None):
+    """Fingerprint of a page's extracted title, description and sections (and the weights applied to them)"""
+    payload = [crawl_result['title'], crawl_result['description'], crawl_result['sections'], weights]
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode('utf-8')).hexdigest()
+
+def analyze_page(content, url, weights=None, previous_hash=None, duplicates=None, position=None):
+    """process_page() then tokenize_page(), as (page, tokens, timings)
+    
+    The CPU-bound half of the pipeline in one picklable call for process pools.
+    Only compact results cross the process boundary: page holds the title,
+    description, content_hash and body_hash (of the raw HTML) and the SimHash
+    fingerprint of the extracted text, tokens the weighted keyword counts and
+    timings the seconds spent in each stage.
+    Tokenizing is skipped, and tokens is None, if the content_hash equals
+    previous_hash or if the fingerprint near-duplicates a page in duplicates
+    (a DuplicateIndex) before position, whose key is then set as
+    page['duplicate_of'].
+    """
+    timings = {}
+    crawl_result = process_page(content, url, timings)
+    page = {
+        'title': crawl_result['title'],
+        'description': crawl_result['description'],
+        'content_hash': content_hash(crawl_result, weights),
+        'body_hash': hashlib.sha256(content).hexdigest()
+    }
+    if previous_hash is not None and page['content_hash'] == previous_hash:
+        return page, None, timings
+    with stage_timer('fingerprint', timings):
+        page['fingerprint'] = simhash(crawl_result['content'])
+    if duplicates is not None:
+        page['duplicate_of'] = duplicates.find(page['fingerprint'], before=position)
+        if page['duplicate_of'] is not None:
+            return page, None, timings
+    with stage_timer('tokenize', timings):
+        tokens = tokenize_page(crawl_result, weights)
+    return page, dict(tokens), timings
+
+def new_duplicate_index():
+    """An empty DuplicateIndex for one analysis, or None if DEDUPLICATE_PAGES is off"""
+    if not get_setting('DEDUPLICATE_PAGES'):
+        return None
+    return DuplicateIndex(get_setting('DUPLICATE_MAX_DISTANCE'))
+
+def create_parse_pool(processes):
+    """A process pool for analyze_page() calls
+    
+    Workers are spawned rather than forked, since forking a process that is
+    already running threads can leave locks held in the child.
+    """
+    return ProcessPoolExecutor(max_workers=processes, mp_context=multiprocessing.get_context('spawn'))
+
+def get_parse_pool():
+    """The shared parse/tokenize process pool, created on first use, or None if PARSE_PROCESSES is 0"""
+    global parse_pool
+    processes = get_setting('PARSE_PROCESSES')
+    if not processes:
+        return None
+    if parse_pool is None:
+        with _parse_pool_lock:
+            if parse_pool is None:
+                parse_pool = create_parse_pool(processes)
+    return parse_pool
+
+def reset_parse_pool(pool):
+    """Drop a broken parse pool (e.g. a worker was killed) so the next analysis starts a fresh one"""
+    global parse_pool
+    with _parse_pool_lock:
+        if parse_pool is pool:
+            parse_pool = None
+    pool.shutdown(wait=False)
+
+def parse_and_tokenize(content, url, weights=None, timings=None, pool=None, previous_hash=None, duplicates=None,
+                       position=None):
+    """Run analyze_page() in the parse pool if given, else in this thread, returning (page, tokens)
+    
+    Stage timings measured in a worker process are added to the metrics and
+    to timings here, as if the stages had run locally. A worker process checks
+    for duplicates against a snapshot of the index taken at submission.
+    """
+    if pool is not None:
+        try:
+            page, tokens, page_timings = pool.submit(
+                analyze_page, content, url, weights, previous_hash,
+                duplicates.snapshot() if duplicates is not None else None, position
+            ).result()
+        except BrokenProcessPool:
+            reset_parse_pool(pool)
+        else:
+            for stage, seconds in page_timings.items():
+                metrics.STAGE_SECONDS.observe(seconds, stage=stage)
+                if timings is not None:
+                    timings[stage] = round(timings.get(stage, 0) + seconds, 6)
+            return page, tokens
+    
+    page, tokens, page_timings = analyze_page(content, url, weights, previous_hash, duplicates, position)
+    if timings is not None:
+        for stage, seconds in page_timings.items():
+            timings[stage] = round(timings.get(stage, 0) + seconds, 6)
+    return page, tokens
+
+def crawl_url(url, timings=None, fetch_options=None):
+    """Crawl a URL and extract content with SEO metadata
+    
+    Stage durations (fetch, parse, extract) are recorded in the metrics and,
+    if a timings dict is given, added to it. fetch_options are passed on to
+    fetch_page() (see get_fetch_options()).
+    """
+    response, error = fetch_url(url, timings, fetch_options)
+    if error:
+        return None, error
+    try:
+        return process_page(response.content, response.url, timings), None
+    except Exception as e:
+        return None, f"Unexpected error for {response.url}: {str(e)}"
+
+def extract_page_sections(soup):
+    """Normalized text of each content section, falling back to the main content area"""
+    # Extract ecommerce-specific content, normalized per section
+    ecommerce_content = extract_ecommerce_content(soup)
+    sections = {name: normalize_whitespace(text) for name, text in ecommerce_content.items()}
+    
+    # Fallback to generic content extraction if no ecommerce content found
+    if not any(ecommerce_content.values()):
+        # Try to find main content areas
+        main_content = ""
+        content_elem = content_matcher.first_matches(soup)['main_content']
+        if content_elem:
+            main_content = content_elem.get_text()
+        
+        if not main_content:
+            # Remove navigation, header, footer, sidebar elements
+            for elem in soup(['nav', 'header', 'footer', 'aside', '.sidebar', '.navigation', '.menu']):
+                elem.decompose()
+            
+            body = soup.find('body')
+            if body:
+                main_content = body.get_text()
+            else:
+                main_content = soup.get_text()
+        
+        sections['main_content'] = normalize_whitespace(main_content)
+    
+    return sections
+
+def failed_url_record(url, error):
+    """urls_data record for a URL that could not be crawled"""
+    metrics.PAGES.inc(status='failed')
+    return {
+        'url': url,
+        'title': '',
+        'description': '',
+        'total_tokens': 0,
+        'filtered_keywords': {},
+        'keyword_count': 0,
+        'status': 'failed',
+        'error': error
+    }
+
+def url_record(url, page, tokens):
+    """urls_data record for a crawled and tokenized URL
+    
+    page supplies the title and description, plus the content hashes that let
+    a later refresh skip unchanged pages.
+    """
+    total_tokens = sum(tokens.values())
+    metrics.PAGES.inc(status='success')
+    metrics.PAGE_TOKENS.observe(total_tokens)
+    metrics.VOCABULARY_SIZE.observe(len(tokens), scope='page')
+    record = {
+        'url': url,
+        'title': page['title'],
+        'description': page['description'],
+        'total_tokens': total_tokens,
+        'filtered_keywords': dict(tokens),
+        'keyword_count': len(tokens.keys()),
+        'status': 'success'
+    }
+    record.update(page_hashes(page))
+    return record
+
+def duplicate_url_record(url, page, duplicate_of):
+    """urls_data record for a URL skipped as a near-duplicate of the URL duplicate_of"""
+    metrics.PAGES.inc(status='duplicate')
+    record = {
+        'url': url,
+        'title': page['title'],
+        'description': page['description'],
+        'total_tokens': 0,
+        'filtered_keywords': {},
+        'keyword_count': 0,
+        'status': 'duplicate',
+        'duplicate_of': duplicate_of
+    }
+    record.update(page_hashes(page))
+    return record
+
+def index_page(duplicates, url, fingerprint, position):
+    """Add a crawled page's fingerprint (an int, or hex string from a saved record) to a DuplicateIndex"""
+    if duplicates is not None and fingerprint is not None:
+        duplicates.add(url, int(fingerprint, 16) if isinstance(fingerprint, str) else fingerprint, position)
+
+def resolve_duplicates(urls_data, max_distance, progress=None):
+    """Mark near-duplicate urls_data records in input order, in place, returning the records demoted
+    
+    A crawled page is a near-duplicate if its fingerprint is within
+    max_distance bits of any earlier page's, so which pages are kept does not
+    depend on which finished crawling first. duplicate_of names the earliest
+    such page. Tokenized records that turn out to be duplicates are replaced;
+    the replaced records are returned so their keyword counts can be taken
+    back out of an aggregate.
+    """
+    duplicates = DuplicateIndex(max_distance)
+    demoted = []
+    for index, record in enumerate(urls_data):
+        if record['status'] == 'failed':
+            continue
+        fingerprint = record.get('fingerprint')
+        duplicate_of = duplicates.find(int(fingerprint, 16)) if fingerprint else None
+        index_page(duplicates, record['url'], fingerprint, index)
+        if duplicate_of is None:
+            continue
+        if record['status'] == 'success':
+            demoted.append(record)
+            urls_data[index] = dict(record, status='duplicate', total_tokens=0, filtered_keywords={}, keyword_count=0)
+            if progress is not None:
+                progress.update_url(index, 'duplicate', f'Same content as {duplicate_of}')
+        urls_data[index]['duplicate_of'] = duplicate_of
+    return demoted
+
+def page_hashes(page):
+    """The content hashes and fingerprint of a processed page, as stored in its urls_data record"""
+    hashes = {key: page[key] for key in ('content_hash', 'body_hash') if key in page}
+    if page.get('fingerprint') is not None:
+        hashes['fingerprint'] = format(page['fingerprint'], '016x')
+    return hashes
+
+def analyze_url(url, index=None, progress=None, weights=None, record_timings=False, fetch_options=None,
+                parse_pool=None, duplicates=None):
+    """Crawl and tokenize one URL, returning its urls_data record
+    
+    With record_timings, the record includes a 'timings' dict of seconds spent
+    in each stage for this URL. With a parse_pool, the raw HTML is parsed and
+    tokenized in a worker process (see parse_and_tokenize()). With a
+    DuplicateIndex, the page is indexed at index, and a near-duplicate of an
+    earlier page already analyzed is recorded as a duplicate instead of being
+    tokenized; resolve_duplicates() settles the rest once all pages are in.
+    """
+    if progress is not None:
+        progress.update_url(index, 'fetching')
+    
+    timings = {}
+    response, error = fetch_url(url, timings, fetch_options)
+    
+    if response is not None:
+        if progress is not None:
+            progress.update_url(index, 'tokenizing')
+        
+        # Parse once, then tokenize each section weighted by its importance, plus SEO metadata
+        try:
+            page, tokens = parse_and_tokenize(response.content, response.url, weights, timings, parse_pool,
+                                              duplicates=duplicates, position=index)
+        except Exception as e:
+            error = f"Unexpected error for {response.url}: {str(e)}"
+    
+    if error:
+        if progress is not None:
+            progress.update_url(index, 'failed', error)
+        return failed_url_record(url, error)
+    
+    index_page(duplicates, url, page['fingerprint'], index)
+    if page.get('duplicate_of') is not None:
+        if progress is not None:
+            progress.update_url(index, 'duplicate', f"Same content as {page['duplicate_of']}")
+        return duplicate_url_record(url, page, page['duplicate_of'])
+    
+    if progress is not None:
+        progress.update_url(index, 'done')
+    
+    record = url_record(url, page, tokens)
+    if record_timings:
+        record['timings'] = timings
+    return record
+
+def crawl_urls(urls, max_workers=None, progress=None):
+    """Crawl and tokenize several URLs concurrently, returning urls_data records in input order"""
+    if not urls:
+        return []
+    
+    if max_workers is None:
+        max_workers = get_setting('CRAWL_MAX_WORKERS')
+    
+    # Settings are read once here rather than for every URL
+    weights = get_setting('FIELD_WEIGHTS')
+    record_timings = get_setting('ANALYSIS_TIMINGS')
+    fetch_options = get_fetch_options()
+    pool = get_parse_pool()
+    duplicates = new_duplicate_index()
+    
+    # Fetches are I/O bound, so a small bounded thread pool brings the total
+    # wait down to roughly the slowest URL instead of the sum of all of them.
+    # Parsing and tokenizing is CPU bound and, with PARSE_PROCESSES set, is handed
+    # to the shared process pool; each crawl thread has at most one page queued
+    # there, so concurrent analyses take turns instead of starving each other
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(urls)))) as executor:
+        urls_data = list(executor.map(in_app_context(
+            lambda item: analyze_url(item[1], item[0], progress, weights, record_timings, fetch_options, pool, duplicates)
+        ), enumerate(urls)))
+    if duplicates is not None:
+        resolve_duplicates(urls_data, duplicates.max_distance, progress)
+    return urls_data
+
+def run_crawl_analysis(urls, progress=None):
+    """Run the crawl -> tokenize -> aggregate -> save pipeline for a list of URLs
+    
+    Returns (analysis_id, result, message). Raises AnalysisError if fewer than
+    two URLs could be crawled. progress, if given, receives update()/update_url()
+    calls as the pipeline advances (see jobs.Job).
+    """
+    if progress is not None:
+        progress.update(state='fetching')
+    
+    # Wall-clock time of the crawl and aggregate stages for this analysis
+    timings = {}
+    
+    # Crawl URLs concurrently (results come back in input order)
+    with stage_timer('crawl', timings):
+        urls_data = crawl_urls(urls, progress=progress)
+    
+    return complete_analysis(urls_data, progress, timings)
+
+def complete_analysis(urls_data, progress=None, timings=None):
+    """Aggregate crawled urls_data records and save them as a new analysis
+    
+    Returns (analysis_id, result, message); raises AnalysisError if fewer than
+    two URLs were crawled successfully.
+    """
+    if timings is None:
+        timings = {}
+    failed_urls = [f"{data['url']}: {data['error']}" for data in urls_data if data['status'] == 'failed']
+    duplicate_urls = [f"{data['url']} (same content as {data['duplicate_of']})"
+                      for data in urls_data if data['status'] == 'duplicate']
+    
+    # Check if we have enough successful URLs
+    successful_urls = [data for data in urls_data if data['status'] == 'success']
+    if len(successful_urls) < 2:
+        message = 'Not enough distinct URLs could be crawled successfully.'
+        if failed_urls:
+            message += f' Failed URLs: {", ".join(failed_urls)}'
+        if duplicate_urls:
+            message += f' Near-duplicate URLs: {", ".join(duplicate_urls)}'
+        raise AnalysisError(message)
+    
+    if progress is not None:
+        progress.update(state='aggregating')
+    
+    # Find common keywords from successful URLs only
+    successful_keywords_list = [data['filtered_keywords'] for data in successful_urls]
+    with stage_timer('aggregate', timings):
+        common_keywords = find_common_keywords(successful_keywords_list)
+    metrics.VOCABULARY_SIZE.observe(len(common_keywords), scope='analysis')
+    
+    # Generate analysis ID and save results
+    analysis_id = str(uuid.uuid4())[:8]
+    result = save_analysis_result(analysis_id, urls_data, common_keywords,
+                                  timings=timings if get_setting('ANALYSIS_TIMINGS') else None)
+    
+    message = f'Analysis completed! Found {len(common_keywords)} common keywords from {len(successful_urls)} URLs.'
+    if failed_urls:
+        message += f' Failed URLs: {", ".join(failed_urls)}'
+    if duplicate_urls:
+        message += f' Near-duplicate URLs skipped: {", ".join(duplicate_urls)}'
+    
+    return analysis_id, result, message
+
+def crawl_job(job, urls):
+    """Background job body for a /crawl submission"""
+    analysis_id, _, message = run_crawl_analysis(urls, progress=job)
+    job.update(state='done', analysis_id=analysis_id, message=message)
+
+def read_sitemap(sitemap_url, include=None, limit=None):
+    """Page URLs listed in a sitemap (or sitemap index), fetched politely"""
+    def fetch(url):
+        return get_service('fetch_scheduler').fetch(url, headers=BROWSER_HEADERS, timeout=30, max_bytes=SITEMAP_MAX_BYTES).content
+    
+    try:
+        return discover_sitemap_urls(sitemap_url, fetch, include=include, limit=limit)
+    except requests.exceptions.RequestException as e:
+        raise AnalysisError(f'Could not fetch sitemap {sitemap_url}: {str(e)}')
+    except (ET.ParseError, OSError, EOFError, ValueError) as e:
+        raise AnalysisError(f'Could not read sitemap {sitemap_url}: {str(e)}')
+
+def run_bulk_analysis(urls, progress=None, max_workers=None):
+    """Crawl -> tokenize -> aggregate for hundreds of URLs as a streaming pipeline
+    
+    Each page is folded into a KeywordAggregator as soon as it is tokenized and
+    its token table is kept only in compressed form, with at most a couple of
+    pages per worker in flight, so memory stays bounded as the URL count grows.
+    Returns (analysis_id, result, message) like run_crawl_analysis().
+    """
+    if max_workers is None:
+        max_workers = get_setting('BULK_MAX_WORKERS')
+    weights = get_setting('FIELD_WEIGHTS')
+    record_timings = get_setting('ANALYSIS_TIMINGS')
+    fetch_options = get_fetch_options()
+    pool = get_parse_pool()
+    duplicates = new_duplicate_index()
+    
+    if progress is not None:
+        progress.update(state='fetching')
+    
+    timings = {}
+    aggregator = KeywordAggregator()
+    urls_data = [None] * len(urls)
+    
+    @in_app_context
+    def process(index):
+        return index, analyze_url(urls[index], index, progress, weights, record_timings, fetch_options, pool,
+                                  duplicates)
+    
+    with stage_timer('crawl', timings), ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+        pending_indexes = iter(range(len(urls)))
+        in_flight = set()
+        while True:
+            # Keep the window full; the per-host scheduler spaces requests to each site
+            while len(in_flight) < max_workers * 2:
+                index = next(pending_indexes, None)
+                if index is None:
+                    break
+                in_flight.add(executor.submit(process, index))
+            if not in_flight:
+                break
+            
+            finished, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in finished:
+                index, record = future.result()
+                if record['status'] == 'success':
+                    aggregator.add(record['filtered_keywords'])
+                record['filtered_keywords'] = compress_json(record['filtered_keywords'])
+                urls_data[index] = record
+    
+    if duplicates is not None:
+        # Pages tokenized before an earlier near-duplicate finished are taken back out
+        for record in resolve_duplicates(urls_data, duplicates.max_distance, progress):
+            aggregator.remove(decompress_json(record['filtered_keywords']))
+    skipped = {status: sum(1 for record in urls_data if record['status'] == status) for status in ('failed', 'duplicate')}
+    
+    if aggregator.num_files < 2:
+        raise AnalysisError(f'Not enough URLs could be crawled successfully ({aggregator.num_files} of {len(urls)}).')
+    
+    if progress is not None:
+        progress.update(state='aggregating')
+    
+    with stage_timer('aggregate', timings):
+        common_keywords = aggregator.rank()
+    metrics.VOCABULARY_SIZE.observe(len(common_keywords), scope='analysis')
+    
+    analysis_id = str(uuid.uuid4())[:8]
+    result = save_analysis_result(analysis_id, urls_data, common_keywords,
+                                  timings=timings if record_timings else None)
+    
+    message = (f'Bulk analysis completed! Found {len(common_keywords)} common keywords '
+               f'from {aggregator.num_files} of {len(urls)} URLs.')
+    if skipped['duplicate']:
+        message += f" {skipped['duplicate']} near-duplicate URLs were skipped."
+    if skipped['failed']:
+        message += f" {skipped['failed']} URLs could not be crawled."
+    return analysis_id, result, message
+
+def bulk_job(job, urls=None, sitemap_url=None, include=None, limit=None):
+    """Background job body for a /bulk submission (a URL list, or a sitemap read first)"""
+    if sitemap_url:
+        job.update(state='fetching', message=f'Reading sitemap {sitemap_url}')
+        urls = read_sitemap(sitemap_url, include=include, limit=limit)
+        if len(urls) < 2:
+            raise AnalysisError(f'Found {len(urls)} matching URLs in the sitemap; at least 2 are needed.')
+        job.set_urls(urls)
+        job.update(message='')
+    
+    analysis_id, _, message = run_bulk_analysis(urls, progress=job)
+    job.update(state='done', analysis_id=analysis_id, message=message)
+
+def refresh_url(previous, index=None, progress=None, weights=None, fetch_options=None, parse_pool=None,
+                duplicates=None, reuse_tokens=True):
+    """Re-fetch one URL of a saved analysis, returning (urls_data record, outcome)
+    
+    outcome is 'unchanged' when the page's raw HTML or extracted content hash
+    matches the saved record (which is then reused without re-tokenizing),
+    'changed' when it was re-tokenized or its content changed, or 'failed'.
+    Pages saved as near-duplicates are always parsed again, since the page
+    they duplicated may have changed; with a DuplicateIndex they are checked
+    against it as in analyze_url(). With reuse_tokens off (the saved tables
+    were counted with other weights) every page is re-tokenized.
+    """
+    url = previous['url']
+    was_crawled = reuse_tokens and previous.get('status') == 'success'
+    if progress is not None:
+        progress.update_url(index, 'fetching')
+    
+    timings = {}
+    response, error = fetch_url(url, timings, fetch_options)
+    tokens = None
+    
+    if response is not None:
+        # Identical bytes (e.g. a 304 served from the page cache) need no parsing at all
+        if was_crawled and previous.get('body_hash') == hashlib.sha256(response.content).hexdigest():
+            index_page(duplicates, url, previous.get('fingerprint'), index)
+            if progress is not None:
+                progress.update_url(index, 'done')
+            return previous, 'unchanged'
+        
+        if progress is not None:
+            progress.update_url(index, 'tokenizing')
+        try:
+            page, tokens = parse_and_tokenize(response.content, response.url, weights, timings, parse_pool,
+                                              previous_hash=previous.get('content_hash') if was_crawled else None,
+                                              duplicates=duplicates, position=index)
+        except Exception as e:
+            error = f"Unexpected error for {response.url}: {str(e)}"
+    
+    if error:
+        if progress is not None:
+            progress.update_url(index, 'failed', error)
+        return failed_url_record(url, error), 'failed'
+    
+    outcome = 'unchanged' if page['content_hash'] == previous.get('content_hash') else 'changed'
+    if page.get('duplicate_of') is not None:
+        index_page(duplicates, url, page['fingerprint'], index)
+        if progress is not None:
+            progress.update_url(index, 'duplicate', f"Same content as {page['duplicate_of']}")
+        return duplicate_url_record(url, page, page['duplicate_of']), outcome
+    
+    if progress is not None:
+        progress.update_url(index, 'done')
+    if tokens is None:
+        # Markup changed but the extracted content did not
+        index_page(duplicates, url, previous.get('fingerprint'), index)
+        return dict(previous, title=page['title'], description=page['description'],
+                    body_hash=page['body_hash']), 'unchanged'
+    index_page(duplicates, url, page['fingerprint'], index)
+    return url_record(url, page, tokens), outcome
+
+def ranking_diff(previous_keywords, keywords, limit=RANKING_DIFF_LIMIT):
+    """How a ranked keyword list changed: keywords added, removed and moved (best-ranked first)"""
+    previous_ranks = {keyword_data['keyword']: rank for rank, keyword_data in enumerate(previous_keywords, start=1)}
+    ranks = {keyword_data['keyword']: rank for rank, keyword_data in enumerate(keywords, start=1)}
+    
+    added = [{'keyword': keyword, 'rank': rank} for keyword, rank in ranks.items() if keyword not in previous_ranks]
+    removed = [{'keyword': keyword, 'previous_rank': rank}
+               for keyword, rank in previous_ranks.items() if keyword not in ranks]
+    moved = [{'keyword': keyword, 'previous_rank': previous_ranks[keyword], 'rank': rank,
+              'change': previous_ranks[keyword] - rank}
+             for keyword, rank in ranks.items() if keyword in previous_ranks and previous_ranks[keyword] != rank]
+    # Biggest moves first; among equal moves, the better-ranked keyword first
+    moved.sort(key=lambda entry: (-abs(entry['change']), entry['rank']))
+    
+    return {
+        'added_count': len(added),
+        'removed_count': len(removed),
+        'moved_count': len(moved),
+        'added': added[:limit],
+        'removed': removed[:limit],
+        'moved': moved[:limit]
+    }
+
+def refresh_analysis(analysis_id, progress=None):
+    """Re-crawl a saved analysis, re-tokenizing only the pages whose content changed
+    
+    Keyword stats are rebuilt from the saved per-URL token tables and then
+    updated page by page: a changed page's old tokens are removed from the
+    aggregate and its new ones added. Near-duplicates are resolved again as in
+    a new analysis, so the ranking matches analyzing the URLs from scratch; if
+    FIELD_WEIGHTS changed since the analysis was saved, every page is re-tokenized.
+    The result is saved as a new analysis
+    with refreshed_from and a ranking_diff against the previous ranking.
+    Returns (analysis_id, result, message) like run_crawl_analysis().
+    """
+    previous = load_analysis_result(analysis_id)
+    previous_details = previous['url_details']
+    weights = get_setting('FIELD_WEIGHTS')
+    record_timings = get_setting('ANALYSIS_TIMINGS')
+    fetch_options = get_fetch_options()
+    pool = get_parse_pool()
+    duplicates = new_duplicate_index()
+    # Analyses saved before weights were recorded count as counted with other weights
+    reuse_tokens = previous.get('field_weights') == weights
+    
+    if progress is not None:
+        progress.update(state='fetching')
+    
+    timings = {}
+    aggregator = KeywordAggregator()
+    if reuse_tokens:
+        for data in previous_details:
+            if data.get('status') == 'success':
+                aggregator.add(data['filtered_keywords'])
+    
+    @in_app_context
+    def refresh(item):
+        index, data = item
+        return refresh_url(data, index, progress, weights, fetch_options, pool, duplicates, reuse_tokens)
+    
+    with stage_timer('crawl', timings):
+        with ThreadPoolExecutor(max_workers=max(1, min(get_setting('CRAWL_MAX_WORKERS'), len(previous_details)))) as executor:
+            refreshed = list(executor.map(refresh, enumerate(previous_details)))
+    
+    pages = {'unchanged': 0, 'changed': 0, 'failed': 0}
+    urls_data = []
+    with stage_timer('aggregate', timings):
+        for old, (record, outcome) in zip(previous_details, refreshed):
+            pages[outcome] += 1
+            urls_data.append(record)
+            if reuse_tokens:
+                if outcome == 'unchanged' and record['status'] == old.get('status') == 'success':
+                    continue  # Saved tokens reused as they are
+                if old.get('status') == 'success':
+                    aggregator.remove(old['filtered_keywords'])
+            if record['status'] == 'success':
+                aggregator.add(record['filtered_keywords'])
+        if duplicates is not None:
+            for record in resolve_duplicates(urls_data, duplicates.max_distance, progress):
+                aggregator.remove(record['filtered_keywords'])
+    
+    if aggregator.num_files < 2:
+        raise AnalysisError(f'Not enough URLs could be crawled successfully ({aggregator.num_files} of {len(urls_data)}).')
+    
+    if progress is not None:
+        progress.update(state='aggregating')
+    
+    with stage_timer('aggregate', timings):
+        common_keywords = aggregator.rank()
+    metrics.VOCABULARY_SIZE.observe(len(common_keywords), scope='analysis')
+    
+    diff = ranking_diff(previous['common_keywords'], common_keywords)
+    diff['previous_analysis_id'] = analysis_id
+    diff['pages'] = pages
+    
+    new_analysis_id = str(uuid.uuid4())[:8]
+    result = save_analysis_result(new_analysis_id, urls_data, common_keywords,
+                                  timings=timings if record_timings else None,
+                                  extra={'refreshed_from': analysis_id, 'ranking_diff': diff})
+    
+    message = (f"Analysis refreshed! {pages['changed']} of {len(urls_data)} pages changed "
+               f"({pages['unchanged']} unchanged, {pages['failed']} failed): {diff['added_count']} keywords entered "
+               f"and {diff['removed_count']} left the ranking.")
+    return new_analysis_id, result, message
+
+def refresh_job(job, analysis_id):
+    """Background job body for refreshing a saved analysis"""
+    new_analysis_id, _, message = refresh_analysis(analysis_id, progress=job)
+    job.update(state='done', analysis_id=new_analysis_id, message=message)
+
+def strip_non_content(soup):
+    """Remove script and style elements from a parsed tree in place"""
+    for script in soup(["script", "style"]):
+        script.decompose()
+    return soup
+
+def normalize_whitespace(text):
+    """Collapse extracted text into single-spaced phrases"""
+    lines = (line.strip() for line in text.splitlines())
+    chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
+    return ' '.join(chunk for chunk in chunks if chunk)
+
 def clean_html(text):
     """Remove HTML tags and clean text"""
     soup = BeautifulSoup(text, 'html.parser')
     # Remove script and style elements
-    for script in soup(["script", "style"]):
-        script.decompose()
+    strip_non_content(soup)
     # Get text and clean up whitespace
-    text = soup.get_text()
-    lines = (line.strip() for line in text.splitlines())
-    chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
-    text = ' '.join(chunk for chunk in chunks if chunk)
-    return text
+    return normalize_whitespace(soup.get_text())
 
 def tokenize_text(text, max_ngram=4):
     """Tokenize text into 1-4 word phrases with ecommerce-optimized filtering"""
-    # Clean and normalize text
-    text = re.sub(r'[^\w\s]', ' ', text.lower())
-    words = word_tokenize(text)
-    
-    # Refined stop words - removed some ecommerce-valuable terms, added more noise words
-    stop_words = {
-        # Basic stop words
-        'a', 'an', 'and', 'are', 'as', 'at', 'be', 'by', 'for', 'from', 'has', 'he', 
-        'in', 'is', 'it', 'its', 'of', 'on', 'that', 'the', 'to', 'was', 'will', 'with',
-        'i', 'you', 'your', 'we', 'they', 'them', 'this', 'these', 'those', 'or', 'but',
-        'if', 'then', 'else', 'when', 'where', 'why', 'how', 'all', 'any', 'both', 'each',
-        'few', 'more', 'most', 'other', 'some', 'such', 'no', 'nor', 'not', 'only', 'own',
-        'same', 'so', 'than', 'too', 'very', 'can', 'will', 'just', 'should', 'now',
-        
-        # Generic ecommerce noise (keep valuable terms like "product", "price", "quality")
-        'account', 'com', 'login', 'checkout', 'cart', 'currently', 'available',
-        'please', 'click', 'here', 'view', 'see', 'per', 'use', 'within', 'inc', 
-        'log', 'must', 'option', 'yes', 'no', 'also', 'cancel', 'password', 'create', 
-        'get', 'canceled', 'submitted', 'sign', 'up', 'register', 'login', 'logout',
-        
-        # Website navigation noise
-        'home', 'page', 'next', 'previous', 'back', 'top', 'bottom', 'menu', 'link',
-        'button', 'tab', 'section', 'content', 'main', 'sidebar', 'footer', 'header',
-        
-        # Generic action words without product context
-        'read', 'learn', 'find', 'discover', 'explore', 'browse', 'visit', 'contact',
-        'about', 'help', 'support', 'faq', 'terms', 'privacy', 'policy', 'legal'
-    }
-    
-    # Ecommerce-valuable terms to preserve (remove from stop words if present)
-    preserve_terms = {
-        'product', 'products', 'price', 'prices', 'cost', 'quality', 'brand', 'brands',
-        'shipping', 'delivery', 'return', 'returns', 'warranty', 'guarantee',
-        'review', 'reviews', 'rating', 'ratings', 'customer', 'customers',
-        'sale', 'discount', 'offer', 'deal', 'promotion', 'free', 'premium',
-        'size', 'sizes', 'color', 'colors', 'style', 'styles', 'model', 'models',
-        'material', 'materials', 'feature', 'features', 'specification', 'specs'
-    }
+    # Clean and normalize text; only word characters and whitespace remain, so a
+    # whitespace split gives the same words the treebank tokenizer would
+    words = []
+    for word in NON_WORD_PATTERN.sub(' ', text.lower()).split():
+        split_word = TREEBANK_SPLIT_WORDS.get(word)
+        if split_word:
+            words.extend(split_word)
+        else:
+            words.append(word)
     
-    # Update stop words by removing preserve terms
-    stop_words = stop_words - preserve_terms
+    # Filter words with improved criteria: no stop words, alphabetic only, and at least
+    # 3 letters unless it is a size abbreviation (xs, sm, md, lg, xl, os)
+    filtered_words = [
+        word for word in words
+        if word not in STOP_WORDS and word.isalpha() and (len(word) >= 3 or word in SIZE_ABBREVIATIONS)
+    ]
     
-    # Filter words with improved criteria
-    filtered_words = []
-    for word in words:
-        if (word not in stop_words and 
-            len(word) >= 2 and  # Allow 2-letter words for sizes, models, etc.
-            not word.isdigit() and
-            not (len(word) == 2 and word not in ['xs', 'sm', 'md', 'lg', 'xl', 'os']) and  # Allow size abbreviations
-            word.isalpha()):  # Only alphabetic characters
-            filtered_words.append(word)
+    # Every filtered word is either 3+ letters or a 2-letter size abbreviation, so a
+    # phrase is meaningful as long as one of its words is not just an abbreviation.
+    # (Phrases can never start or end with "the"/"a"/"an" - those are filtered out above.)
+    meaningful = [len(word) >= 3 or word in PRESERVE_TERMS for word in filtered_words]
     
     tokens = {}
+    num_words = len(filtered_words)
     
-    # Add single words
-    for word in filtered_words:
-        if len(word) >= 3 or word in preserve_terms:  # Allow shorter preserve terms
-            tokens[word] = tokens.get(word, 0) + 1
-    
-    # Add n-grams with improved validation
-    for n in range(2, min(max_ngram + 1, len(filtered_words) + 1)):
-        n_grams = list(ngrams(filtered_words, n))
-        for gram in n_grams:
-            # More lenient n-gram filtering for ecommerce phrases
-            if (len(gram) > 1 and
-                not all(word in stop_words for word in gram) and  # Not all stop words
-                not any(len(word) < 2 for word in gram) and  # No single characters
-                any(word in preserve_terms or len(word) >= 3 for word in gram)):  # At least one meaningful word
-                
-                phrase = ' '.join(gram)
-                # Skip overly generic phrases
-                if not phrase.startswith(('the ', 'a ', 'an ')) and not phrase.endswith((' the', ' a', ' an')):
-                    tokens[phrase] = tokens.get(phrase, 0) + 1
+    # Single sliding-window pass: extend the phrase starting at each word one word
+    # at a time, counting the single word and every n-gram up to max_ngram
+    for i in range(num_words):
+        phrase = filtered_words[i]
+        has_meaningful = meaningful[i]
+        
+        # Allow shorter preserve terms as single words
+        if has_meaningful:
+            tokens[phrase] = tokens.get(phrase, 0) + 1
+        
+        for j in range(i + 1, min(i + max_ngram, num_words)):
+            phrase = phrase + ' ' + filtered_words[j]
+            has_meaningful = has_meaningful or meaningful[j]
+            if has_meaningful:
+                tokens[phrase] = tokens.get(phrase, 0) + 1
     
     return tokens
 
-def find_common_keywords(file_keywords_list):
-    """Find keywords with strategic frequency and coverage analysis for competitive research"""
-    if not file_keywords_list:
-        return []
+def tokenize_fields(fields, weights=None, max_ngram=4):
+    """Tokenize each content field once and scale its counts by the field's weight"""
+    if weights is None:
+        weights = get_setting('FIELD_WEIGHTS')
     
-    num_files = len(file_keywords_list)
+    tokens = {}
+    for field, text in fields.items():
+        weight = weights.get(field, 1)
+        if not text or weight <= 0:
+            continue
+        
+        # Counting once and multiplying avoids re-tokenizing repeated copies and
+        # never creates phrases that span two unrelated sections
+        for token, count in tokenize_text(text, max_ngram=max_ngram).items():
+            tokens[token] = tokens.get(token, 0) + count * weight
     
-    # Get all unique keywords that appear in at least one file
-    all_keywords = set()
-    for keywords_dict in file_keywords_list:
-        all_keywords.update(keywords_dict.keys())
+    return tokens
+
+class KeywordAggregator:
+    """Document-frequency and total-frequency tables built up one document at a time
     
-    # Calculate metrics for each keyword
-    keyword_metrics = {}
-    for keyword in all_keywords:
-        # Count how many files contain this keyword
-        files_containing = sum(1 for keywords_dict in file_keywords_list if keyword in keywords_dict)
-        
-        # Calculate total frequency across all files
-        total_freq = sum(keywords_dict.get(keyword, 0) for keywords_dict in file_keywords_list)
-        
-        # Calculate average frequency per file that contains it
-        avg_freq = total_freq / files_containing if files_containing > 0 else 0
-        
-        # Calculate coverage percentage
-        coverage = files_containing / num_files
-        
-        keyword_metrics[keyword] = {
-            'total_frequency': total_freq,
-            'files_containing': files_containing,
-            'coverage': coverage,
-            'avg_frequency': avg_freq
-        }
+    Lets a pipeline fold in each page's tokens as soon as it is tokenized and
+    drop them, instead of holding every page's table until the end.
+    """
     
-    # Multi-tier filtering strategy for competitive analysis
-    # Adaptive thresholds based on number of URLs
-    strategic_keywords = {}
+    def __init__(self):
+        self.doc_freq = {}
+        self.total_freq = {}
+        self.num_files = 0
+    
+    def add(self, keywords_dict):
+        # Inverted-index style: each document's counter is walked exactly once, so the
+        # cost is linear in total token occurrences rather than vocabulary x documents
+        doc_freq = self.doc_freq
+        total_freq = self.total_freq
+        for keyword, count in keywords_dict.items():
+            doc_freq[keyword] = doc_freq.get(keyword, 0) + 1
+            total_freq[keyword] = total_freq.get(keyword, 0) + count
+        self.num_files += 1
+    
+    def remove(self, keywords_dict):
+        """Take back a document added earlier, e.g. a page whose content has since changed"""
+        doc_freq = self.doc_freq
+        total_freq = self.total_freq
+        for keyword, count in keywords_dict.items():
+            remaining = doc_freq[keyword] - 1
+            if remaining:
+                doc_freq[keyword] = remaining
+                total_freq[keyword] -= count
+            else:
+                del doc_freq[keyword]
+                del total_freq[keyword]
+        self.num_files -= 1
     
-    # Calculate adaptive thresholds
+    def rank(self):
+        """Ranked common keywords for the documents added so far (as find_common_keywords)"""
+        if not self.num_files:
+            return []
+        return rank_keywords(self.doc_freq, self.total_freq, self.num_files)
+
+def aggregate_keyword_stats(file_keywords_list):
+    """Build document-frequency and total-frequency tables in one pass over every document"""
+    aggregator = KeywordAggregator()
+    for keywords_dict in file_keywords_list:
+        aggregator.add(keywords_dict)
+    return aggregator.doc_freq, aggregator.total_freq
+
+def tier_thresholds(num_files):
+    """Adaptive coverage/frequency thresholds for the strategic tiers"""
     min_files_for_majority = max(2, int(num_files * 0.5))  # At least 50% but minimum 2 files
     min_files_for_partial = max(1, int(num_files * 0.33))  # At least 33% but minimum 1 file
     
@@ -291,63 +1149,103 @@ def find_common_keywords(file_keywords_list):
     if min_files_for_majority == min_files_for_partial and num_files >= 3:
         min_files_for_partial = min_files_for_majority - 1
     
-    for keyword, metrics in keyword_metrics.items():
+    return {
+        'majority': min_files_for_majority,
+        'partial': min_files_for_partial,
+        'gap_frequency': max(4, num_files)
+    }
+
+def rank_keywords(doc_freq, total_freq, num_files):
+    """Classify keywords into strategic tiers from their aggregate stats"""
+    # Multi-tier filtering strategy for competitive analysis
+    # Adaptive thresholds based on number of URLs
+    thresholds = tier_thresholds(num_files)
+    min_files_for_majority = thresholds['majority']
+    min_files_for_partial = thresholds['partial']
+    min_freq_for_gap = thresholds['gap_frequency']
+    
+    strategic_keywords = []
+    for keyword, files_containing in doc_freq.items():
+        total_frequency = total_freq[keyword]
+        avg_frequency = total_frequency / files_containing
+        
         # Tier 1: Keywords in ALL files (highest priority)
-        if metrics['coverage'] == 1.0 and metrics['total_frequency'] >= 2:
-            strategic_keywords[keyword] = metrics['total_frequency'] + 1000  # Boost score
+        if files_containing == num_files and total_frequency >= 2:
+            score = total_frequency + 1000  # Boost score
         
         # Tier 2: Keywords in majority of files (50%+) with decent frequency
-        elif metrics['files_containing'] >= min_files_for_majority and metrics['total_frequency'] >= 3:
-            strategic_keywords[keyword] = metrics['total_frequency'] + 500  # Medium boost
+        elif files_containing >= min_files_for_majority and total_frequency >= 3:
+            score = total_frequency + 500  # Medium boost
         
         # Tier 3: High-frequency keywords even if not in majority (competitive gaps)
-        elif metrics['total_frequency'] >= max(4, num_files) and metrics['avg_frequency'] >= 1.5:
-            strategic_keywords[keyword] = metrics['total_frequency'] + 200  # Small boost
+        elif total_frequency >= min_freq_for_gap and avg_frequency >= 1.5:
+            score = total_frequency + 200  # Small boost
         
         # Tier 4: Quality keywords with specific valuable patterns
-        elif (metrics['files_containing'] >= min_files_for_partial and 
-              metrics['total_frequency'] >= 2 and
-              any(term in keyword.lower() for term in [
-                  'premium', 'professional', 'advanced', 'pro', 'deluxe', 'luxury',
-                  'organic', 'natural', 'eco', 'sustainable', 'biodegradable',
-                  'wireless', 'bluetooth', 'smart', 'digital', 'electronic',
-                  'waterproof', 'durable', 'lightweight', 'portable', 'compact',
-                  'multi', 'ultra', 'super', 'extra', 'plus', 'max', 'high',
-                  'quality', 'best', 'top', 'rated', 'popular', 'featured'
-              ])):
-            strategic_keywords[keyword] = metrics['total_frequency'] + 150  # Quality boost
+        elif (files_containing >= min_files_for_partial and 
+              total_frequency >= 2 and
+              QUALITY_TERMS_PATTERN.search(keyword.lower())):
+            score = total_frequency + 150  # Quality boost
         
         # Tier 5: General valuable keywords appearing in multiple URLs
-        elif (metrics['files_containing'] >= min_files_for_partial and 
-              metrics['total_frequency'] >= 3 and
-              metrics['avg_frequency'] >= 1.0):
-            strategic_keywords[keyword] = metrics['total_frequency'] + 50  # Base boost
+        elif (files_containing >= min_files_for_partial and 
+              total_frequency >= 3 and
+              avg_frequency >= 1.0):
+            score = total_frequency + 50  # Base boost
+        
+        else:
+            continue
+        
+        strategic_keywords.append((keyword, score))
     
     # Sort by strategic score (descending) and then alphabetically
-    sorted_keywords = sorted(
-        strategic_keywords.items(), 
-        key=lambda x: (-x[1], x[0].lower())
-    )
+    strategic_keywords.sort(key=lambda x: (-x[1], x[0].lower()))
     
     # Convert back to original format but include coverage info
-    result = []
-    for keyword, score in sorted_keywords:
-        original_freq = keyword_metrics[keyword]['total_frequency']
-        coverage = keyword_metrics[keyword]['coverage']
-        files_count = keyword_metrics[keyword]['files_containing']
-        
-        result.append({
+    return [
+        {
             'keyword': keyword,
-            'frequency': original_freq,
-            'coverage': coverage,
-            'files_containing': files_count,
+            'frequency': total_freq[keyword],
+            'coverage': doc_freq[keyword] / num_files,
+            'files_containing': doc_freq[keyword],
             'strategic_score': score
-        })
+        }
+        for keyword, score in strategic_keywords
+    ]
+
+def numpy_available():
+    """True if the NumPy matrix backend can be used (checked without importing NumPy)"""
+    return importlib.util.find_spec('numpy') is not None
+
+def find_common_keywords(file_keywords_list, backend=None):
+    """Find keywords with strategic frequency and coverage analysis for competitive research
     
-    return result
+    backend is 'python', 'matrix' (NumPy document-term matrix) or 'auto', which
+    picks the matrix backend for large inputs when NumPy is installed.
+    """
+    if not file_keywords_list:
+        return []
+    
+    num_files = len(file_keywords_list)
+    if backend is None:
+        backend = get_setting('KEYWORD_BACKEND')
+    if backend == 'auto':
+        backend = 'matrix' if num_files >= get_setting('MATRIX_BACKEND_MIN_DOCS') and numpy_available() else 'python'
+    
+    if backend == 'matrix':
+        # Imported here so NumPy is only loaded once an analysis is big enough to need it
+        from keyword_matrix import rank_keywords_matrix
+        return rank_keywords_matrix(file_keywords_list, tier_thresholds(num_files), QUALITY_TERMS_PATTERN)
+    
+    doc_freq, total_freq = aggregate_keyword_stats(file_keywords_list)
+    return rank_keywords(doc_freq, total_freq, num_files)
 
-def save_analysis_result(analysis_id, urls_data, common_keywords):
-    """Save analysis results to JSON file"""
+def save_analysis_result(analysis_id, urls_data, common_keywords, timings=None, extra=None):
+    """Save analysis results to the configured analysis store
+    
+    timings, if given, is stored with the result as its per-stage breakdown;
+    extra holds any further top-level fields (e.g. a refresh's ranking_diff).
+    """
     # common_keywords is now a list of dicts with enhanced metadata
     
     result = {
@@ -357,12 +1255,18 @@ def save_analysis_result(analysis_id, urls_data, common_keywords):
         'urls': [data['url'] for data in urls_data],
         'common_keywords': common_keywords,  # Already in correct format
         'keyword_count': len(common_keywords),
-        'url_details': urls_data
+        'url_details': urls_data,
+        # The section weights the token tables were counted with, so a refresh knows whether it can reuse them
+        'field_weights': get_setting('FIELD_WEIGHTS')
     }
     
-    filename = f'data/analysis_{analysis_id}.json'
-    with open(filename, 'w') as f:
-        json.dump(result, f, indent=2)
+    if timings is not None:
+        result['timings'] = timings
+    if extra:
+        result.update(extra)
+    
+    with stage_timer('persist'):
+        get_service('analysis_store').save(result)
     
     return result
 
@@ -450,23 +1354,92 @@ def convert_markdown_table_to_html(table_lines):
     html_table.append('</table>')
     return ''.join(html_table)
 
-def analyze_keywords_with_openai(keywords_list, product_title):
-    """Analyze keywords with OpenAI for ecommerce SEO value and competitive insights"""
-    try:
-        # Prepare the keywords with their strategic information
-        top_keywords = keywords_list[:40]  # Analyze top 40 keywords
+class StreamingMarkdownRenderer:
+    """Incremental counterpart of markdown_to_html() for streamed completions
+    
+    feed() takes raw text deltas and returns (event, html) fragments for every
+    line completed so far: 'table_start' (table with its header row),
+    'table_row', 'table_end' and 'html' for everything else. The fragments are
+    a progressive preview; markdown_to_html() of the full text stays the
+    canonical rendering.
+    """
+    
+    def __init__(self):
+        self.buffer = ''
+        self.table_line_count = 0
+    
+    def feed(self, text):
+        self.buffer += text
+        *lines, self.buffer = self.buffer.split('\n')
+        fragments = []
+        for line in lines:
+            fragments.extend(self._render_line(line))
+        return fragments
+    
+    def finish(self):
+        fragments = self._render_line(self.buffer) if self.buffer else []
+        self.buffer = ''
+        if self.table_line_count:
+            fragments.append(('table_end', ''))
+            self.table_line_count = 0
+        return fragments
+    
+    def _render_line(self, line):
+        # Convert **text** to <strong>text</strong>
+        line = re.sub(r'\*\*(.*?)\*\*', r'<strong>\1</strong>', line).strip()
+        fragments = []
         
-        # Create detailed keyword context
-        keyword_details = []
-        for kw in top_keywords:
-            coverage_pct = round(kw.get('coverage', 0) * 100)
-            strategic_score = kw.get('strategic_score', kw['frequency'])
-            keyword_details.append(f"{kw['keyword']} (freq: {kw['frequency']}, coverage: {coverage_pct}%, score: {strategic_score})")
+        if line.startswith('|') and line.endswith('|'):
+            cells = [cell.strip() for cell in line.strip('|').split('|')]
+            self.table_line_count += 1
+            
+            if self.table_line_count == 1:
+                header = ''.join(f'<th>{cell}</th>' for cell in cells)
+                fragments.append(('table_start', f'<table class="table table-striped table-bordered"><thead><tr>{header}</tr></thead><tbody></tbody></table>'))
+            elif self.table_line_count == 2 and all(cell.startswith('-') and cell.endswith('-') for cell in cells):
+                # Separator row, skip it
+                pass
+            else:
+                fragments.append(('table_row', '<tr>' + ''.join(f'<td>{cell}</td>' for cell in cells) + '</tr>'))
+            return fragments
         
-        keywords_context = '\n'.join(keyword_details)
+        if self.table_line_count:
+            fragments.append(('table_end', ''))
+            self.table_line_count = 0
         
-        # Enhanced prompt for ecommerce competitive analysis
-        prompt = f"""You are an expert ecommerce SEO analyst conducting competitive keyword research for product detail pages (PDPs). 
+        if line:
+            if line.startswith('- '):
+                fragments.append(('html', f'<ul><li>{line[2:]}</li></ul>'))
+            elif line.startswith('<strong>'):
+                fragments.append(('html', f'<p class="seo-header">{line}</p>'))
+            else:
+                fragments.append(('html', f'<p>{line}</p>'))
+        return fragments
+
+def seo_keyword_payload(keywords_list, limit=SEO_KEYWORD_LIMIT):
+    """The ranked keyword fields sent to the LLM (and used in its cache key)"""
+    return [
+        {
+            'keyword': kw['keyword'],
+            'frequency': kw['frequency'],
+            'coverage': kw.get('coverage', 0),
+            'strategic_score': kw.get('strategic_score', kw['frequency'])
+        }
+        for kw in keywords_list[:limit]
+    ]
+
+def build_seo_prompt(keyword_payload, product_title):
+    """Build the competitive SEO analysis prompt for a keyword payload"""
+    # Create detailed keyword context
+    keyword_details = []
+    for kw in keyword_payload:
+        coverage_pct = round(kw['coverage'] * 100)
+        keyword_details.append(f"{kw['keyword']} (freq: {kw['frequency']}, coverage: {coverage_pct}%, score: {kw['strategic_score']})")
+    
+    keywords_context = '\n'.join(keyword_details)
+    
+    # Enhanced prompt for ecommerce competitive analysis
+    prompt = f"""You are an expert ecommerce SEO analyst conducting competitive keyword research for product detail pages (PDPs). 
 
 CONTEXT: These keywords were extracted from competitive product pages for a product related to: "{product_title}"
 
@@ -506,142 +1479,301 @@ Return ONLY a markdown table sorted by SEO Opportunity (High first), then by Str
 | example keyword | Commercial | High | Universal | Product Title | Core product identifier used by all competitors |
 
 Focus on keywords most valuable for product page optimization and organic traffic acquisition."""
+    return prompt
 
-        # Call OpenAI API with improved settings
-        completion = client.chat.completions.create(
-            model="gpt-4o",  # Use latest model for better analysis
+def request_seo_analysis(prompt, client=None, max_tokens=OPENAI_MAX_TOKENS):
+    """Send an analysis prompt to OpenAI and return the markdown reply (raises on API errors)"""
+    with stage_timer('openai'):
+        completion = (client or get_openai_client()).chat.completions.create(
+            model=OPENAI_MODEL,  # Use latest model for better analysis
             messages=[
-                {"role": "system", "content": "You are a senior ecommerce SEO strategist with expertise in competitive keyword analysis and product page optimization. Provide actionable insights for PDP optimization."},
+                {"role": "system", "content": SEO_SYSTEM_PROMPT},
                 {"role": "user", "content": prompt}
             ],
-            max_tokens=2000,
-            temperature=0.3  # Lower temperature for more consistent analysis
+            max_tokens=max_tokens,
+            temperature=OPENAI_TEMPERATURE  # Lower temperature for more consistent analysis
         )
+    
+    usage = getattr(completion, 'usage', None)
+    if usage is not None:
+        metrics.OPENAI_TOKENS.inc(usage.prompt_tokens, kind='prompt')
+        metrics.OPENAI_TOKENS.inc(usage.completion_tokens, kind='completion')
+    return completion.choices[0].message.content.strip()
+
+def stream_seo_analysis(prompt, client=None, max_tokens=OPENAI_MAX_TOKENS):
+    """Stream an analysis from OpenAI, yielding markdown text deltas as they arrive"""
+    with stage_timer('openai'):
+        stream = (client or get_openai_client()).chat.completions.create(
+            model=OPENAI_MODEL,
+            messages=[
+                {"role": "system", "content": SEO_SYSTEM_PROMPT},
+                {"role": "user", "content": prompt}
+            ],
+            max_tokens=max_tokens,
+            temperature=OPENAI_TEMPERATURE,
+            stream=True
+        )
+        for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+
+def get_cached_analysis(cache_key):
+    """Cached analysis HTML for a key, or None (counting the lookup in the metrics)"""
+    llm_cache = get_service('llm_cache')
+    if llm_cache is None:
+        return None
+    cached_html = llm_cache.get(cache_key)
+    metrics.CACHE_REQUESTS.inc(cache='llm', result='miss' if cached_html is None else 'hit')
+    return cached_html
+
+def cache_analysis(cache_key, html):
+    """Store analysis HTML in the LLM cache, if enabled"""
+    llm_cache = get_service('llm_cache')
+    if llm_cache is not None:
+        llm_cache.set(cache_key, html)
+
+def seo_cache_key(payload, product_title):
+    """Cache key for an analysis of a keyword payload"""
+    return LLMCache.make_key(
+        keywords=payload,
+        product_title=product_title,
+        model=OPENAI_MODEL,
+        temperature=OPENAI_TEMPERATURE
+    )
+
+def analyze_keywords_with_openai(keywords_list, product_title, client=None, use_cache=True):
+    """Analyze keywords with OpenAI for ecommerce SEO value and competitive insights"""
+    try:
+        # Prepare the keywords with their strategic information (top 40)
+        payload = seo_keyword_payload(keywords_list)
+        
+        # Identical requests are answered from the cache instead of calling the API again
+        cache_key = seo_cache_key(payload, product_title)
+        if use_cache:
+            cached_html = get_cached_analysis(cache_key)
+            if cached_html is not None:
+                return cached_html
         
-        # Convert markdown to HTML before returning
-        markdown_content = completion.choices[0].message.content.strip()
-        return markdown_to_html(markdown_content)
+        markdown_content = request_seo_analysis(build_seo_prompt(payload, product_title), client=client)
+        
+        # Convert markdown to HTML before returning (and caching)
+        html = markdown_to_html(markdown_content)
+        cache_analysis(cache_key, html)
+        return html
         
     except Exception as e:
         return f"Error analyzing keywords: {str(e)}"
 
-def extract_ecommerce_content(soup):
-    """Extract ecommerce-specific content with prioritized weighting"""
-    content_sections = {}
+def estimate_tokens(text):
+    """Rough token count for budgeting (about 4 characters per token for English)"""
+    return len(text) // 4 + 1
+
+def parse_markdown_table(markdown_text):
+    """Return (header_cells, rows) of the first markdown table in a reply"""
+    header = None
+    rows = []
+    for line in markdown_text.split('\n'):
+        line = line.strip()
+        if not (line.startswith('|') and line.endswith('|')):
+            if header is not None:
+                break
+            continue
+        
+        cells = [cell.strip() for cell in line.strip('|').split('|')]
+        if header is None:
+            header = cells
+        elif not rows and all(cell.startswith('-') and cell.endswith('-') for cell in cells):
+            continue  # Separator row
+        else:
+            rows.append(cells)
+    return header, rows
+
+def merge_seo_tables(tables):
+    """Merge per-chunk analysis tables: drop duplicate keywords and order rows High, Medium, Low"""
+    header = next((table_header for table_header, _ in tables if table_header), None)
+    if header is None:
+        return None, []
+    
+    opportunity_col = next((i for i, cell in enumerate(header) if 'opportunity' in cell.lower()), None)
+    opportunity_rank = {'high': 0, 'medium': 1, 'low': 2}
+    
+    seen = set()
+    merged = []
+    for _, rows in tables:
+        for cells in rows:
+            keyword = re.sub(r'[*`]', '', cells[0]).strip().lower() if cells else ''
+            if not keyword or keyword in seen:
+                continue
+            seen.add(keyword)
+            merged.append(cells)
     
+    # Stable sort keeps the ranked order within each opportunity level
+    if opportunity_col is not None:
+        merged.sort(key=lambda cells: opportunity_rank.get(
+            re.sub(r'[*`]', '', cells[opportunity_col]).strip().lower() if len(cells) > opportunity_col else '', 3))
+    return header, merged
+
+def analyze_keywords_chunked(keywords_list, product_title, chunk_size=SEO_CHUNK_SIZE,
+                             max_concurrency=None, token_budget=None, client=None, use_cache=True):
+    """Analyze the full ranked keyword list in concurrent chunks and merge the tables"""
+    try:
+        if max_concurrency is None:
+            max_concurrency = get_setting('SEO_MAX_CONCURRENCY')
+        if token_budget is None:
+            token_budget = get_setting('SEO_TOKEN_BUDGET')
+        
+        # Split the ranked list into chunks, stopping once the estimated
+        # prompt + completion tokens would exceed the budget
+        payload = seo_keyword_payload(keywords_list, limit=None)
+        prompts = []
+        budget_used = 0
+        covered = 0
+        for start in range(0, len(payload), chunk_size):
+            chunk = payload[start:start + chunk_size]
+            prompt = build_seo_prompt(chunk, product_title)
+            cost = estimate_tokens(SEO_SYSTEM_PROMPT) + estimate_tokens(prompt) + OPENAI_MAX_TOKENS
+            if prompts and budget_used + cost > token_budget:
+                break
+            prompts.append(prompt)
+            budget_used += cost
+            covered += len(chunk)
+        
+        if not prompts:
+            return markdown_to_html('No keywords to analyze.')
+        
+        cache_key = LLMCache.make_key(
+            keywords=payload[:covered],
+            product_title=product_title,
+            model=OPENAI_MODEL,
+            temperature=OPENAI_TEMPERATURE,
+            chunk_size=chunk_size
+        )
+        if use_cache:
+            cached_html = get_cached_analysis(cache_key)
+            if cached_html is not None:
+                return cached_html
+        
+        def analyze_chunk(prompt):
+            try:
+                return parse_markdown_table(request_seo_analysis(prompt, client=client)), None
+            except Exception as e:
+                return (None, []), str(e)
+        
+        with ThreadPoolExecutor(max_workers=max(1, min(max_concurrency, len(prompts)))) as executor:
+            chunk_results = list(executor.map(analyze_chunk, prompts))
+        
+        errors = [error for _, error in chunk_results if error]
+        if len(errors) == len(chunk_results):
+            return f"Error analyzing keywords: {errors[0]}"
+        
+        header, rows = merge_seo_tables([table for table, error in chunk_results if not error])
+        if header is None:
+            return "Error analyzing keywords: no analysis table was returned"
+        
+        lines = [f'**Analyzed {covered} of {len(payload)} keywords in {len(prompts)} batches**', '']
+        lines.append('| ' + ' | '.join(header) + ' |')
+        lines.append('|' + '|'.join('---' for _ in header) + '|')
+        lines.extend('| ' + ' | '.join(cells) + ' |' for cells in rows)
+        if errors:
+            lines.extend(['', f'{len(errors)} of {len(prompts)} keyword batches failed: {errors[0]}'])
+        
+        html = markdown_to_html('\n'.join(lines))
+        # Only complete analyses are cached so failed batches get retried next time
+        if not errors:
+            cache_analysis(cache_key, html)
+        return html
+        
+    except Exception as e:
+        return f"Error analyzing keywords: {str(e)}"
+
+# Prioritized selectors per ecommerce section; within each list the first selector that matches wins
+ECOMMERCE_SELECTORS = {
     # Product title (highest priority)
-    product_title = ""
-    title_selectors = [
+    'product_title': [
         'h1.product-title', 'h1[class*="product"]', 'h1[class*="title"]',
         '.product-name h1', '.product-title', '.pdp-product-name',
         'h1[data-testid*="product"]', '[data-automation-id*="product-title"]'
-    ]
-    
-    for selector in title_selectors:
-        title_elem = soup.select_one(selector)
-        if title_elem:
-            product_title = title_elem.get_text().strip()
-            break
-    
-    if not product_title:
-        # Fallback to any h1 that might be product title
-        h1_tags = soup.find_all('h1')
-        if h1_tags:
-            product_title = h1_tags[0].get_text().strip()
-    
-    content_sections['product_title'] = product_title
-    
+    ],
+    # Fallback to any h1 that might be product title
+    'first_h1': ['h1'],
     # Product description (high priority)
-    description = ""
-    desc_selectors = [
+    'description': [
         '.product-description', '.product-details', '.pdp-description',
         '[class*="description"]', '[class*="details"]', '.product-info',
         '[data-testid*="description"]', '.product-overview'
-    ]
-    
-    for selector in desc_selectors:
-        desc_elem = soup.select_one(selector)
-        if desc_elem:
-            description = desc_elem.get_text().strip()
-            break
-    
-    content_sections['description'] = description
-    
+    ],
     # Product specifications/features (high priority)
-    specs = ""
-    spec_selectors = [
+    'specifications': [
         '.specifications', '.product-specs', '.features', '.product-features',
         '[class*="spec"]', '[class*="feature"]', '.attributes', '.product-attributes',
         '.tech-specs', '.product-details-table'
-    ]
-    
-    for selector in spec_selectors:
-        spec_elem = soup.select_one(selector)
-        if spec_elem:
-            specs = spec_elem.get_text().strip()
-            break
-    
-    content_sections['specifications'] = specs
-    
+    ],
     # Product categories/breadcrumbs (medium priority)
-    breadcrumbs = ""
-    breadcrumb_selectors = [
+    'breadcrumbs': [
         '.breadcrumb', '.breadcrumbs', 'nav[aria-label*="breadcrumb"]',
         '[class*="breadcrumb"]', '.navigation-path', '.category-path'
-    ]
-    
-    for selector in breadcrumb_selectors:
-        breadcrumb_elem = soup.select_one(selector)
-        if breadcrumb_elem:
-            breadcrumbs = breadcrumb_elem.get_text().strip()
-            break
-    
-    content_sections['breadcrumbs'] = breadcrumbs
-    
+    ],
     # Product reviews snippets (medium priority)
-    reviews = ""
-    review_selectors = [
+    'reviews': [
         '.reviews-summary', '.review-highlights', '.customer-reviews',
         '[class*="review"]', '.ratings-reviews', '.product-reviews'
-    ]
-    
-    for selector in review_selectors:
-        review_elem = soup.select_one(selector)
-        if review_elem:
-            # Get first few review highlights, not all reviews
-            review_text = review_elem.get_text().strip()
-            reviews = review_text[:500] + "..." if len(review_text) > 500 else review_text
-            break
-    
-    content_sections['reviews'] = reviews
-    
+    ],
     # Price and availability info (low priority but useful)
-    price_info = ""
-    price_selectors = [
+    'price_info': [
         '.price', '.product-price', '[class*="price"]', '.cost',
         '.pricing', '.price-current', '.sale-price'
     ]
+}
+
+# Generic main content areas, used when a page has no recognizable ecommerce sections
+CONTENT_SELECTORS = [
+    'main', 'article', '[role="main"]', '.content', '.main-content',
+    '#content', '#main', '.post-content', '.entry-content', '.article-content'
+]
+
+# Compiled once so every page is matched in a single walk of the DOM
+ecommerce_matcher = SelectorMatcher(ECOMMERCE_SELECTORS)
+content_matcher = SelectorMatcher({'main_content': CONTENT_SELECTORS})
+
+def extract_ecommerce_content(soup):
+    """Extract ecommerce-specific content with prioritized weighting"""
+    content_sections = {}
+    matches = ecommerce_matcher.first_matches(soup)
     
-    for selector in price_selectors:
-        price_elem = soup.select_one(selector)
-        if price_elem:
-            price_info = price_elem.get_text().strip()
-            break
+    # Product title (highest priority)
+    product_title = ""
+    if matches['product_title']:
+        product_title = matches['product_title'].get_text().strip()
     
-    content_sections['price_info'] = price_info
+    if not product_title and matches['first_h1']:
+        # Fallback to any h1 that might be product title
+        product_title = matches['first_h1'].get_text().strip()
+    
+    content_sections['product_title'] = product_title
+    
+    for section in ('description', 'specifications', 'breadcrumbs', 'reviews', 'price_info'):
+        elem = matches[section]
+        text = elem.get_text().strip() if elem else ""
+        
+        # Get first few review highlights, not all reviews
+        if section == 'reviews' and len(text) > 500:
+            text = text[:500] + "..."
+        
+        content_sections[section] = text
     
     return content_sections
 
-@app.route('/')
 def index():
     return render_template('index.html')
 
-@app.route('/health')
 def health():
     """Health check endpoint that doesn't require CSRF"""
     return jsonify({'status': 'healthy', 'message': 'Ecommerce Content Analyzer is running'})
 
-@app.route('/crawl', methods=['GET', 'POST'])
+def metrics_endpoint():
+    """Stage latencies, page sizes, token counts and cache hits in the Prometheus text format"""
+    return Response(metrics.REGISTRY.render(), mimetype='text/plain; version=0.0.4; charset=utf-8')
+
 def crawl():
     if request.method == 'POST':
         try:
@@ -660,73 +1792,22 @@ def crawl():
                 flash('Maximum 6 URLs allowed for analysis', 'error')
                 return redirect(request.url)
             
-            # Crawl URLs
-            urls_data = []
-            url_keywords_list = []
-            failed_urls = []
-            
-            for url in urls:
-                crawl_result, error = crawl_url(url)
-                
-                if crawl_result:
-                    # Combine content with SEO metadata for analysis
-                    combined_content = crawl_result['content']
-                    
-                    # Add title if available
-                    if crawl_result['title']:
-                        combined_content = f"{crawl_result['title']}\n\n{combined_content}"
-                    
-                    # Add description if available
-                    if crawl_result['description']:
-                        combined_content = f"{crawl_result['description']}\n\n{combined_content}"
-                    
-                    # Process combined content
-                    tokens = tokenize_text(combined_content)
-                    
-                    urls_data.append({
-                        'url': url,
-                        'title': crawl_result['title'],
-                        'description': crawl_result['description'],
-                        'total_tokens': sum(tokens.values()),
-                        'filtered_keywords': dict(tokens),
-                        'keyword_count': len(tokens.keys()),
-                        'status': 'success'
-                    })
-                    
-                    url_keywords_list.append(tokens)
-                else:
-                    failed_urls.append(f"{url}: {error}")
-                    urls_data.append({
-                        'url': url,
-                        'title': '',
-                        'description': '',
-                        'total_tokens': 0,
-                        'filtered_keywords': {},
-                        'keyword_count': 0,
-                        'status': 'failed',
-                        'error': error
-                    })
+            # Queue the analysis and return straight away; the job page polls for progress
+            flask_app = current_app._get_current_object()
             
-            # Check if we have enough successful URLs
-            successful_urls = [data for data in urls_data if data['status'] == 'success']
-            if len(successful_urls) < 2:
-                flash(f'Not enough URLs could be crawled successfully. Failed URLs: {", ".join(failed_urls)}', 'error')
-                return redirect(request.url)
+            def run_job(job):
+                with flask_app.app_context():
+                    crawl_job(job, urls)
             
-            # Find common keywords from successful URLs only
-            successful_keywords_list = [data['filtered_keywords'] for data in successful_urls]
-            common_keywords = find_common_keywords(successful_keywords_list)
+            job_id = get_service('job_manager').submit(run_job, urls)
             
-            # Generate analysis ID and save results
-            analysis_id = str(uuid.uuid4())[:8]
-            result = save_analysis_result(analysis_id, urls_data, common_keywords)
+            if request.accept_mimetypes.best == 'application/json':
+                return jsonify({
+                    'job_id': job_id,
+                    'status_url': url_for('job_api', job_id=job_id)
+                }), 202
             
-            success_message = f'Analysis completed! Found {len(common_keywords)} common keywords from {len(successful_urls)} URLs.'
-            if failed_urls:
-                success_message += f' Failed URLs: {", ".join(failed_urls)}'
-            
-            flash(success_message, 'success')
-            return redirect(url_for('results', analysis_id=analysis_id))
+            return redirect(url_for('job_status', job_id=job_id))
             
         except Exception as e:
             flash(f'Error processing URLs: {str(e)}', 'error')
@@ -734,35 +1815,200 @@ def crawl():
     
     return render_template('crawl.html')
 
-@app.route('/results/<analysis_id>')
+def bulk():
+    """Bulk analysis of a sitemap or a URL list, run as a background job"""
+    if request.method == 'POST':
+        max_urls = get_setting('BULK_MAX_URLS')
+        sitemap_url = request.form.get('sitemap_url', '').strip()
+        include = request.form.get('include', '').strip() or None
+        try:
+            limit = min(int(request.form.get('max_urls') or max_urls), max_urls)
+        except ValueError:
+            flash('Maximum URLs must be a number', 'error')
+            return redirect(request.url)
+        
+        urls = None
+        if not sitemap_url:
+            url_text = request.form.get('url_list', '')
+            url_file = request.files.get('url_file')
+            if url_file and url_file.filename:
+                url_text += '\n' + url_file.read().decode('utf-8', errors='replace')
+            urls = parse_url_list(url_text, include=include, limit=limit)
+            if len(urls) < 2:
+                flash('Please provide a sitemap URL or a list of at least 2 URLs', 'error')
+                return redirect(request.url)
+        elif not urlparse(sitemap_url).scheme.startswith('http'):
+            flash('Sitemap URL must start with http:// or https://', 'error')
+            return redirect(request.url)
+        
+        flask_app = current_app._get_current_object()
+        
+        def run_job(job):
+            with flask_app.app_context():
+                bulk_job(job, urls=urls, sitemap_url=sitemap_url, include=include, limit=limit)
+        
+        job_id = get_service('job_manager').submit(run_job, urls or [], kind='bulk')
+        
+        if request.accept_mimetypes.best == 'application/json':
+            return jsonify({
+                'job_id': job_id,
+                'status_url': url_for('job_api', job_id=job_id)
+            }), 202
+        
+        return redirect(url_for('job_status', job_id=job_id))
+    
+    return render_template('bulk.html', max_urls=get_setting('BULK_MAX_URLS'))
+
+def job_status(job_id):
+    job = get_service('job_manager').get(job_id)
+    if job is None:
+        flash('Analysis job not found', 'error')
+        return redirect(url_for('crawl'))
+    return render_template('job_status.html', job=job)
+
+def job_api(job_id):
+    """Job progress for polling: overall state plus per-URL states"""
+    job = get_service('job_manager').get(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    
+    if job['state'] == 'done' and job['analysis_id']:
+        job['results_url'] = url_for('results', analysis_id=job['analysis_id'])
+    return jsonify(job)
+
+def load_analysis_result(analysis_id):
+    """Load a complete saved analysis (raises FileNotFoundError if it does not exist)"""
+    return get_service('analysis_store').load(analysis_id)
+
+def load_analysis_summary(analysis_id):
+    """Load a saved analysis without the per-URL keyword tables, which views fetch on demand"""
+    return get_service('analysis_store').load_summary(analysis_id)
+
+def default_product_title(result):
+    """Default SEO context for an analysis: first successful URL's title, else its domain"""
+    default_title = ""
+    if result['urls']:
+        # Try to get title from first successful URL
+        first_url_data = next((data for data in result['url_details'] if data['status'] == 'success'), None)
+        if first_url_data and first_url_data['title']:
+            default_title = first_url_data['title']
+        else:
+            # Fallback to domain name
+            parsed_url = urlparse(result['urls'][0])
+            default_title = parsed_url.netloc.replace('www.', '').replace('.com', '').replace('.', ' ')
+            default_title = ' '.join(word.capitalize() for word in default_title.split())
+    return default_title
+
+def sse_event(event, data):
+    """Format one Server-Sent Events message"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
 def results(analysis_id):
     try:
-        with open(f'data/analysis_{analysis_id}.json', 'r') as f:
-            result = json.load(f)
+        result = load_analysis_summary(analysis_id)
         return render_template('results.html', result=result)
     except FileNotFoundError:
         flash('Analysis not found', 'error')
         return redirect(url_for('index'))
 
-@app.route('/seo-analysis/<analysis_id>', methods=['GET', 'POST'])
+def refresh(analysis_id):
+    """Queue a refresh of a saved analysis: re-crawl its URLs and re-rank"""
+    try:
+        urls = load_analysis_summary(analysis_id)['urls']
+    except FileNotFoundError:
+        if request.accept_mimetypes.best == 'application/json':
+            return jsonify({'error': 'Analysis not found'}), 404
+        flash('Analysis not found', 'error')
+        return redirect(url_for('index'))
+    
+    flask_app = current_app._get_current_object()
+    
+    def run_job(job):
+        with flask_app.app_context():
+            refresh_job(job, analysis_id)
+    
+    job_id = get_service('job_manager').submit(run_job, urls, kind='refresh')
+    
+    if request.accept_mimetypes.best == 'application/json':
+        return jsonify({
+            'job_id': job_id,
+            'status_url': url_for('job_api', job_id=job_id)
+        }), 202
+    
+    return redirect(url_for('job_status', job_id=job_id))
+
+def api_analysis(analysis_id):
+    """Complete saved analysis as JSON, including every URL's keyword table"""
+    try:
+        return jsonify(load_analysis_result(analysis_id))
+    except FileNotFoundError:
+        return jsonify({'error': 'Analysis not found'}), 404
+
+def api_analysis_keywords(analysis_id):
+    """Page through an analysis' ranked keywords, sorted and filtered by the database
+    
+    Query parameters: page (1-based), per_page (max KEYWORDS_API_MAX_PER_PAGE),
+    sort (strategic_score, frequency or coverage), order (desc or asc), tier
+    (universal, majority, gap, quality or general) and top_k.
+    """
+    try:
+        page = int(request.args.get('page', 1))
+        per_page = int(request.args.get('per_page', 50))
+        top_k = int(request.args['top_k']) if request.args.get('top_k') else None
+    except ValueError:
+        return jsonify({'error': 'page, per_page and top_k must be integers'}), 400
+    
+    sort = request.args.get('sort', 'strategic_score')
+    order = request.args.get('order', 'desc')
+    tier = request.args.get('tier') or None
+    
+    if page < 1 or not 1 <= per_page <= current_app.config['KEYWORDS_API_MAX_PER_PAGE'] or (top_k is not None and top_k < 1):
+        return jsonify({'error': f"page and top_k must be positive and per_page between 1 and {current_app.config['KEYWORDS_API_MAX_PER_PAGE']}"}), 400
+    if sort not in KEYWORD_SORTS:
+        return jsonify({'error': f"sort must be one of: {', '.join(KEYWORD_SORTS)}"}), 400
+    if order not in ('desc', 'asc'):
+        return jsonify({'error': 'order must be desc or asc'}), 400
+    if tier is not None and tier not in KEYWORD_TIERS.values():
+        return jsonify({'error': f"tier must be one of: {', '.join(KEYWORD_TIERS.values())}"}), 400
+    
+    try:
+        total, keywords = get_service('analysis_store').query_keywords(
+            analysis_id, sort=sort, descending=order == 'desc', tier=tier,
+            offset=(page - 1) * per_page, limit=per_page, top_k=top_k
+        )
+    except FileNotFoundError:
+        return jsonify({'error': 'Analysis not found'}), 404
+    
+    return jsonify({
+        'analysis_id': analysis_id,
+        'total': total,
+        'page': page,
+        'per_page': per_page,
+        'pages': (total + per_page - 1) // per_page,
+        'sort': sort,
+        'order': order,
+        'tier': tier,
+        'top_k': top_k,
+        'keywords': keywords
+    })
+
+def api_url_keywords(analysis_id, position):
+    """Keyword frequencies of one crawled URL (the position in url_details)"""
+    try:
+        keywords = get_service('analysis_store').load_url_keywords(analysis_id, position)
+    except FileNotFoundError:
+        return jsonify({'error': 'Analysis not found'}), 404
+    
+    if keywords is None:
+        return jsonify({'error': 'URL not found'}), 404
+    return jsonify(keywords)
+
 def seo_analysis(analysis_id):
     try:
-        with open(f'data/analysis_{analysis_id}.json', 'r') as f:
-            result = json.load(f)
+        result = load_analysis_summary(analysis_id)
         
         # Get default product title from first URL title or domain
-        default_title = ""
-        if result['urls']:
-            # Try to get title from first successful URL
-            first_url_data = next((data for data in result['url_details'] if data['status'] == 'success'), None)
-            if first_url_data and first_url_data['title']:
-                default_title = first_url_data['title']
-            else:
-                # Fallback to domain name
-                from urllib.parse import urlparse
-                parsed_url = urlparse(result['urls'][0])
-                default_title = parsed_url.netloc.replace('www.', '').replace('.com', '').replace('.', ' ')
-                default_title = ' '.join(word.capitalize() for word in default_title.split())
+        default_title = default_product_title(result)
         
         if request.method == 'POST':
             product_title = request.form.get('product_title', '').strip()
@@ -771,8 +2017,12 @@ def seo_analysis(analysis_id):
                 flash('Please enter a product title', 'error')
                 return render_template('seo_analysis.html', result=result, default_title=default_title)
             
-            # Analyze keywords with OpenAI
-            seo_analysis_result = analyze_keywords_with_openai(result['common_keywords'], product_title)
+            # Analyze keywords with OpenAI - either the top 40 in one request, or the
+            # whole ranked list split into concurrent chunks
+            if request.form.get('full_list'):
+                seo_analysis_result = analyze_keywords_chunked(result['common_keywords'], product_title)
+            else:
+                seo_analysis_result = analyze_keywords_with_openai(result['common_keywords'], product_title)
             
             return render_template('seo_analysis.html', 
                                  result=result, 
@@ -786,5 +2036,84 @@ def seo_analysis(analysis_id):
         flash('Analysis not found', 'error')
         return redirect(url_for('index'))
 
+def seo_analysis_stream(analysis_id):
+    """Stream the SEO analysis as Server-Sent Events while the completion is generated
+    
+    EventSource can only send GETs, so the page's CSRF token is checked from the
+    query string; otherwise any site could start a paid completion with an <img>.
+    """
+    if current_app.config['WTF_CSRF_ENABLED']:
+        try:
+            validate_csrf(request.args.get('csrf_token'))
+        except ValidationError:
+            return jsonify({'error': 'Missing or invalid CSRF token'}), 400
+    
+    product_title = request.args.get('product_title', '').strip()
+    if not product_title:
+        return jsonify({'error': 'product_title is required'}), 400
+    
+    try:
+        result = load_analysis_summary(analysis_id)
+    except FileNotFoundError:
+        return jsonify({'error': 'Analysis not found'}), 404
+    
+    payload = seo_keyword_payload(result['common_keywords'])
+    cache_key = seo_cache_key(payload, product_title)
+    
+    def generate():
+        cached_html = get_cached_analysis(cache_key)
+        if cached_html is not None:
+            yield sse_event('done', {'html': cached_html, 'cached': True})
+            return
+        
+        try:
+            renderer = StreamingMarkdownRenderer()
+            markdown_parts = []
+            
+            for delta in stream_seo_analysis(build_seo_prompt(payload, product_title)):
+                markdown_parts.append(delta)
+                for event, html in renderer.feed(delta):
+                    yield sse_event(event, {'html': html})
+            
+            for event, html in renderer.finish():
+                yield sse_event(event, {'html': html})
+            
+            # Send the canonical rendering last so the page ends up identical to the non-streaming view
+            html = markdown_to_html(''.join(markdown_parts).strip())
+            cache_analysis(cache_key, html)
+            yield sse_event('done', {'html': html, 'cached': False})
+        
+        except Exception as e:
+            yield sse_event('analysis_error', {'message': f"Error analyzing keywords: {str(e)}"})
+    
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+def register_routes(flask_app):
+    """Register the view functions (endpoint names are the function names)"""
+    flask_app.add_url_rule('/', view_func=index)
+    flask_app.add_url_rule('/health', view_func=health)
+    flask_app.add_url_rule('/metrics', view_func=metrics_endpoint)
+    flask_app.add_url_rule('/crawl', methods=['GET', 'POST'], view_func=crawl)
+    flask_app.add_url_rule('/bulk', methods=['GET', 'POST'], view_func=bulk)
+    flask_app.add_url_rule('/jobs/<job_id>', view_func=job_status)
+    flask_app.add_url_rule('/api/jobs/<job_id>', view_func=job_api)
+    flask_app.add_url_rule('/results/<analysis_id>', view_func=results)
+    flask_app.add_url_rule('/results/<analysis_id>/refresh', methods=['POST'], view_func=refresh)
+    flask_app.add_url_rule('/api/analyses/<analysis_id>', view_func=api_analysis)
+    flask_app.add_url_rule('/api/analyses/<analysis_id>/keywords', view_func=api_analysis_keywords)
+    flask_app.add_url_rule('/api/analyses/<analysis_id>/urls/<int:position>/keywords', view_func=api_url_keywords)
+    flask_app.add_url_rule('/seo-analysis/<analysis_id>', methods=['GET', 'POST'], view_func=seo_analysis)
+    flask_app.add_url_rule('/seo-analysis/<analysis_id>/stream', view_func=seo_analysis_stream)
+
+# Module-level application for `python app.py` and WSGI servers (gunicorn app:app)
+app = create_app()
+analysis_store, job_manager, llm_cache, page_cache, fetch_scheduler = (
+    app.extensions['services'][name] for name in SERVICES
+)
+
 if __name__ == '__main__':
     app.run(debug=True) 
\ No newline at end of file
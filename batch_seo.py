@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""
+Bulk SEO analysis across many saved analyses.
+
+Runs the OpenAI keyword analysis for a list of analysis IDs concurrently,
+throttled by token-bucket rate limits (requests and tokens per minute) and
+retrying with exponential backoff when the API answers 429. Results are
+written to a JSONL file as they finish.
+
+Input is a JSONL file of {"analysis_id": ..., "product_title": ...} objects
+or a CSV with analysis_id,product_title columns. product_title is optional
+and defaults to the same title the SEO analysis page would suggest.
+
+Usage:
+    python batch_seo.py jobs.jsonl -o seo_results.jsonl --concurrency 8 --rpm 60 --tpm 150000
+"""
+
+import argparse
+import csv
+import json
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import app
+
+
+class TokenBucket:
+    """Thread-safe token bucket: refills at `rate` tokens per second up to `capacity`"""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def per_minute(cls, amount):
+        return cls(amount / 60.0, amount)
+
+    def acquire(self, amount=1):
+        """Block until `amount` tokens are available, then take them"""
+        amount = min(amount, self.capacity)
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return
+                wait = (amount - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+def is_rate_limited(error):
+    """True for OpenAI 429 responses (RateLimitError or any error carrying status 429)"""
+    return getattr(error, 'status_code', None) == 429 or type(error).__name__ == 'RateLimitError'
+
+
+def retry_after_seconds(error):
+    response = getattr(error, 'response', None)
+    headers = getattr(response, 'headers', None) or {}
+    try:
+        return float(headers.get('retry-after'))
+    except (TypeError, ValueError):
+        return None
+
+
+def read_jobs(path):
+    """Read (analysis_id, product_title) pairs from a JSONL or CSV file"""
+    jobs = []
+    with open(path, 'r', newline='') as f:
+        if path.endswith('.csv'):
+            for row in csv.DictReader(f):
+                jobs.append((row['analysis_id'].strip(), (row.get('product_title') or '').strip()))
+        else:
+            for line in f:
+                if line.strip():
+                    entry = json.loads(line)
+                    jobs.append((entry['analysis_id'], (entry.get('product_title') or '').strip()))
+    return jobs
+
+
+class BatchSEOAnalyzer:
+    """Runs cached, rate-limited OpenAI analyses for many saved analyses"""
+
+    def __init__(self, requests_per_minute=60, tokens_per_minute=150000, max_retries=5,
+                 backoff_base=2.0, client=None, use_cache=True):
+        self.request_bucket = TokenBucket.per_minute(requests_per_minute)
+        self.token_bucket = TokenBucket.per_minute(tokens_per_minute)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.client = client
+        self.use_cache = use_cache
+
+    def analyze(self, analysis_id, product_title=''):
+        """Analyze one saved analysis, returning a JSON-serializable result record"""
+        started = time.monotonic()
+        record = {'analysis_id': analysis_id, 'product_title': product_title, 'status': 'error',
+                  'cached': False, 'attempts': 0, 'html': None, 'error': None}
+        try:
+            result = app.load_analysis_summary(analysis_id)
+            product_title = product_title or app.default_product_title(result)
+            record['product_title'] = product_title
+
+            payload = app.seo_keyword_payload(result['common_keywords'])
+            cache_key = app.seo_cache_key(payload, product_title)
+            cached_html = app.get_cached_analysis(cache_key) if self.use_cache else None
+
+            if cached_html is not None:
+                record.update(status='ok', cached=True, html=cached_html)
+            else:
+                prompt = app.build_seo_prompt(payload, product_title)
+                markdown_content = self._request_with_retries(prompt, record)
+                html = app.markdown_to_html(markdown_content)
+                if self.use_cache:
+                    app.cache_analysis(cache_key, html)
+                record.update(status='ok', html=html)
+
+        except FileNotFoundError:
+            record['error'] = 'Analysis not found'
+        except Exception as e:
+            record['error'] = f'Error analyzing keywords: {str(e)}'
+
+        record['elapsed_seconds'] = round(time.monotonic() - started, 3)
+        return record
+
+    def _request_with_retries(self, prompt, record):
+        estimated_tokens = (app.estimate_tokens(app.SEO_SYSTEM_PROMPT) + app.estimate_tokens(prompt)
+                            + app.OPENAI_MAX_TOKENS)
+        for attempt in range(self.max_retries + 1):
+            # Throughput is bounded by the API quota rather than by serial round trips
+            self.request_bucket.acquire()
+            self.token_bucket.acquire(estimated_tokens)
+            record['attempts'] = attempt + 1
+            try:
+                return app.request_seo_analysis(prompt, client=self.client)
+            except Exception as e:
+                if not is_rate_limited(e) or attempt == self.max_retries:
+                    raise
+                delay = retry_after_seconds(e)
+                if delay is None:
+                    delay = self.backoff_base * (2 ** attempt) * (0.5 + random.random())
+                time.sleep(delay)
+
+    def run(self, jobs, output, concurrency=8):
+        """Analyze (analysis_id, product_title) jobs concurrently, writing JSONL records to output"""
+        summary = {'ok': 0, 'error': 0, 'cached': 0}
+        write_lock = threading.Lock()
+
+        with ThreadPoolExecutor(max_workers=max(1, concurrency)) as executor:
+            futures = [executor.submit(self.analyze, analysis_id, title) for analysis_id, title in jobs]
+            for future in as_completed(futures):
+                record = future.result()
+                with write_lock:
+                    output.write(json.dumps(record) + '\n')
+                    output.flush()
+                summary[record['status']] += 1
+                summary['cached'] += int(record['cached'])
+
+        return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Run SEO analysis for many saved analyses concurrently.')
+    parser.add_argument('input', help='JSONL or CSV file of analysis_id[,product_title]')
+    parser.add_argument('-o', '--output', default='seo_results.jsonl', help='JSONL file to write results to')
+    parser.add_argument('--concurrency', type=int, default=8, help='maximum requests in flight')
+    parser.add_argument('--rpm', type=int, default=60, help='requests per minute allowed by the API quota')
+    parser.add_argument('--tpm', type=int, default=150000, help='tokens per minute allowed by the API quota')
+    parser.add_argument('--max-retries', type=int, default=5, help='retries per analysis after a 429')
+    parser.add_argument('--no-cache', action='store_true', help='always call the API, neither reading nor storing cached analyses')
+    args = parser.parse_args(argv)
+
+    jobs = read_jobs(args.input)
+    analyzer = BatchSEOAnalyzer(args.rpm, args.tpm, args.max_retries, use_cache=not args.no_cache)
+
+    started = time.monotonic()
+    with open(args.output, 'a') as output:
+        summary = analyzer.run(jobs, output, concurrency=args.concurrency)
+
+    print(f"Analyzed {len(jobs)} analyses in {time.monotonic() - started:.1f}s: "
+          f"{summary['ok']} ok ({summary['cached']} from cache), {summary['error']} failed -> {args.output}")
+    return 0 if summary['error'] == 0 else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
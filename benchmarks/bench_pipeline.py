@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+Benchmark each stage of the crawl-to-keywords pipeline against a local site stub.
+
+Pages come from benchmarks/site_stub.py (samples/*.html plus generated small,
+medium and large product pages), so no network access is needed. Per page it
+times the stages of crawl_url() (fetch, parse, extract_ecommerce_content) and
+the whole call, clean_html() and tokenize_text(); across document counts it
+times find_common_keywords() and save_analysis_result().
+
+Results are written as JSON. Pass --baseline with an earlier results file to
+flag stages that got slower by more than --threshold (exit status 1).
+
+Usage: python benchmarks/bench_pipeline.py [--repeat N] [--output FILE] [--baseline FILE]
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from bs4 import BeautifulSoup
+
+import app
+from fetcher import fetch_page
+from site_stub import PDP_SIZES, load_samples, serve
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+DEFAULT_OUTPUT = os.path.join(ROOT, 'benchmarks', 'results', 'pipeline.json')
+DOCUMENT_COUNTS = (2, 6, 50, 200)
+
+
+def best_time(func, rounds):
+    best = float('inf')
+    for _ in range(rounds):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def page_stages(url, rounds):
+    """Timings for the stages of crawl_url() and text processing on one page"""
+    content = fetch_page(url, headers=app.BROWSER_HEADERS).content
+
+    def parse():
+        soup = BeautifulSoup(content, 'lxml')
+        app.strip_non_content(soup)
+        return soup
+
+    soup = parse()
+    crawl_result, error = app.crawl_url(url)
+    if error:
+        raise RuntimeError(error)
+    html = content.decode('utf-8', errors='replace')
+
+    return len(content), {
+        'fetch': best_time(lambda: fetch_page(url, headers=app.BROWSER_HEADERS), rounds),
+        'parse': best_time(parse, rounds),
+        'extract_ecommerce_content': best_time(lambda: app.extract_ecommerce_content(soup), rounds),
+        'crawl_url': best_time(lambda: app.crawl_url(url), rounds),
+        'clean_html': best_time(lambda: app.clean_html(html), rounds),
+        'tokenize_text': best_time(lambda: app.tokenize_text(crawl_result['content']), rounds),
+    }
+
+
+def document_keywords(base_url, count):
+    """Weighted keyword tables for `count` generated medium product pages"""
+    documents = []
+    for page in range(count):
+        crawl_result, _ = app.crawl_url(f'{base_url}/pdp/medium/{page}.html')
+        fields = dict(crawl_result['sections'], meta_title=crawl_result['title'],
+                      meta_description=crawl_result['description'])
+        documents.append(app.tokenize_fields(fields))
+    return documents
+
+
+def run(rounds):
+    results = {}
+    with serve() as base_url:
+        pages = [(name, f'{base_url}/samples/{name}') for name in load_samples()]
+        pages += [(f'pdp-{size}', f'{base_url}/pdp/{size}/0.html') for size in PDP_SIZES]
+
+        print(f"{'page':<24}{'bytes':>10}" + ''.join(f'{stage:>16}' for stage in
+              ('fetch', 'parse', 'extract', 'crawl_url', 'clean_html', 'tokenize')) + '   (ms)')
+        for name, url in pages:
+            size, stages = page_stages(url, rounds)
+            for stage, seconds in stages.items():
+                results[f'{stage}/{name}'] = seconds
+            print(f'{name:<24}{size:>10}' + ''.join(f'{seconds * 1000:>16.2f}' for seconds in stages.values()))
+
+        all_documents = document_keywords(base_url, max(DOCUMENT_COUNTS))
+
+    print(f"\n{'documents':<24}{'find_common_keywords':>22}{'save_analysis_result':>22}   (ms)")
+    for count in DOCUMENT_COUNTS:
+        documents = all_documents[:count]
+        urls_data = [{'url': f'https://example.com/{i}', 'title': '', 'description': '',
+                      'total_tokens': sum(doc.values()), 'filtered_keywords': doc,
+                      'keyword_count': len(doc), 'status': 'success'} for i, doc in enumerate(documents)]
+        common_keywords = app.find_common_keywords(documents)
+
+        find_seconds = best_time(lambda: app.find_common_keywords(documents), rounds)
+        save_seconds = best_time(lambda: app.save_analysis_result(f'bench{count}', urls_data, common_keywords), rounds)
+        results[f'find_common_keywords/{count} docs'] = find_seconds
+        results[f'save_analysis_result/{count} docs'] = save_seconds
+        print(f'{count:<24}{find_seconds * 1000:>22.2f}{save_seconds * 1000:>22.2f}')
+
+    return results
+
+
+def compare(results, baseline, threshold):
+    """Print stages slower than baseline by more than threshold; return how many there were"""
+    regressions = 0
+    for key, seconds in results.items():
+        previous = baseline['results'].get(key)
+        if previous and seconds > previous * threshold:
+            regressions += 1
+            print(f'REGRESSION {key}: {previous * 1000:.2f}ms -> {seconds * 1000:.2f}ms ({seconds / previous:.2f}x)')
+    if not regressions:
+        print(f'No stage slower than {threshold:.2f}x the baseline')
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=5, help='timing rounds per measurement (best is reported)')
+    parser.add_argument('--output', default=DEFAULT_OUTPUT, help='where to write the results JSON')
+    parser.add_argument('--baseline', help='earlier results JSON to compare against')
+    parser.add_argument('--threshold', type=float, default=1.25, help='slowdown factor reported as a regression')
+    args = parser.parse_args()
+
+    output = os.path.abspath(args.output)
+    baseline_path = os.path.abspath(args.baseline) if args.baseline else None
+
+    # Work in a scratch directory so saved analyses and caches don't touch data/
+    with tempfile.TemporaryDirectory() as scratch:
+        os.chdir(scratch)
+        # One local stub host: no politeness delay, robots.txt or cache in the way
+        bench_app = app.create_app({'HTTP_CACHE_ENABLED': False, 'CRAWL_HOST_DELAY': 0, 'ROBOTS_TXT_ENABLED': False})
+        with bench_app.app_context():
+            results = run(args.repeat)
+
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump({
+            'timestamp': datetime.now().isoformat(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'repeat': args.repeat,
+            'results': results
+        }, f, indent=2)
+    print(f'\nSaved results to {output}')
+
+    if baseline_path:
+        with open(baseline_path, 'r') as f:
+            baseline = json.load(f)
+        if compare(results, baseline, args.threshold):
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Benchmark application startup: import time and first-request latency.
+
+Each round runs in a fresh interpreter (as a gunicorn worker boot would) and
+times `import app`, the first GET / and GET /health through the test client,
+and the first use of the OpenAI client, which is created lazily.
+
+Usage: python benchmarks/bench_startup.py [--repeat N]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+# Runs inside the child interpreter; prints timings in seconds and whether the OpenAI SDK was loaded by the import
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import app
+timings = {'import app': time.perf_counter() - start}
+openai_at_import = 'openai' in sys.modules
+
+client = app.app.test_client()
+for path in ('/', '/health'):
+    start = time.perf_counter()
+    client.get(path)
+    timings[f'first GET {path}'] = time.perf_counter() - start
+
+start = time.perf_counter()
+app.get_openai_client()
+timings['first OpenAI client use'] = time.perf_counter() - start
+
+print(json.dumps({'timings': timings, 'openai_at_import': openai_at_import}))
+"""
+
+
+def run_probe():
+    # The OpenAI client only needs a key to be constructed; no request is made
+    env = dict(os.environ, OPENAI_API_KEY=os.environ.get('OPENAI_API_KEY', 'benchmark-key'))
+    output = subprocess.run([sys.executable, '-c', PROBE], cwd=ROOT, env=env,
+                            capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=5, help='fresh interpreters to start (median and best are reported)')
+    args = parser.parse_args()
+
+    runs = [run_probe() for _ in range(args.repeat)]
+
+    print(f"{'stage':<28}{'median (ms)':>14}{'best (ms)':>12}")
+    for stage in runs[0]['timings']:
+        values = [run['timings'][stage] for run in runs]
+        print(f'{stage:<28}{statistics.median(values) * 1000:>14.1f}{min(values) * 1000:>12.1f}')
+    print(f"OpenAI SDK imported at startup: {'yes' if runs[0]['openai_at_import'] else 'no'}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Benchmark tokenize_text() against the previous NLTK-based implementation.
+
+Runs both tokenizers over the text of samples/*.html (and larger inputs made
+by repeating it), checks they return identical counts, and prints timings.
+
+Usage: python benchmarks/bench_tokenize.py [--repeat N]
+"""
+
+import argparse
+import glob
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import nltk
+from nltk.tokenize import word_tokenize
+from nltk.util import ngrams
+
+from app import PRESERVE_TERMS, STOP_WORDS, clean_html, tokenize_text
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+try:
+    nltk.data.find('tokenizers/punkt')
+    HAS_PUNKT = True
+except LookupError:
+    # Without punkt, tokenize each text as one line - identical here since all
+    # sentence punctuation is stripped before word_tokenize runs
+    HAS_PUNKT = False
+
+
+def legacy_tokenize_text(text, max_ngram=4):
+    """The tokenize_text() implementation before the single-pass rewrite"""
+    text = re.sub(r'[^\w\s]', ' ', text.lower())
+    words = word_tokenize(text, preserve_line=not HAS_PUNKT)
+
+    stop_words = set(STOP_WORDS)
+    preserve_terms = set(PRESERVE_TERMS)
+
+    filtered_words = []
+    for word in words:
+        if (word not in stop_words and
+            len(word) >= 2 and
+            not word.isdigit() and
+            not (len(word) == 2 and word not in ['xs', 'sm', 'md', 'lg', 'xl', 'os']) and
+            word.isalpha()):
+            filtered_words.append(word)
+
+    tokens = {}
+
+    for word in filtered_words:
+        if len(word) >= 3 or word in preserve_terms:
+            tokens[word] = tokens.get(word, 0) + 1
+
+    for n in range(2, min(max_ngram + 1, len(filtered_words) + 1)):
+        n_grams = list(ngrams(filtered_words, n))
+        for gram in n_grams:
+            if (len(gram) > 1 and
+                not all(word in stop_words for word in gram) and
+                not any(len(word) < 2 for word in gram) and
+                any(word in preserve_terms or len(word) >= 3 for word in gram)):
+
+                phrase = ' '.join(gram)
+                if not phrase.startswith(('the ', 'a ', 'an ')) and not phrase.endswith((' the', ' a', ' an')):
+                    tokens[phrase] = tokens.get(phrase, 0) + 1
+
+    return tokens
+
+
+def best_time(func, text, rounds):
+    best = float('inf')
+    for _ in range(rounds):
+        start = time.perf_counter()
+        func(text)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=5, help='timing rounds per input (best is reported)')
+    args = parser.parse_args()
+
+    samples = sorted(glob.glob(os.path.join(ROOT, 'samples', '*.html')))
+    texts = []
+    for path in samples:
+        with open(path, 'r', encoding='utf-8') as f:
+            texts.append((os.path.basename(path), clean_html(f.read())))
+
+    combined = ' '.join(text for _, text in texts)
+    for multiplier in (10, 100):
+        texts.append((f'all samples x{multiplier}', ' '.join([combined] * multiplier)))
+
+    print(f"{'input':<24}{'words':>9}{'legacy (ms)':>14}{'new (ms)':>12}{'speedup':>10}")
+    for name, text in texts:
+        if legacy_tokenize_text(text) != tokenize_text(text):
+            print(f'{name}: token counts differ from the legacy implementation')
+            sys.exit(1)
+
+        legacy = best_time(legacy_tokenize_text, text, args.repeat)
+        new = best_time(tokenize_text, text, args.repeat)
+        print(f'{name:<24}{len(text.split()):>9}{legacy * 1000:>14.2f}{new * 1000:>12.2f}{legacy / new:>9.1f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Local HTTP stub of competitor sites for benchmarks.
+
+Serves samples/*.html at /samples/<name> and generated product detail pages
+at /pdp/<size>/<n>.html, where size is one of PDP_SIZES. Generated pages have
+the usual PDP sections (title, breadcrumbs, description, specifications,
+reviews, price) plus navigation and script noise, built deterministically
+from a product vocabulary so runs are comparable.
+
+Usage as a library:
+
+    with serve() as base_url:
+        crawl_url(f'{base_url}/pdp/large/0.html')
+
+or standalone: python benchmarks/site_stub.py [--port 8765]
+"""
+
+import argparse
+import glob
+import os
+import random
+import threading
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+# Repeats of each body section per page size; 'large' is roughly 1.5MB of HTML
+PDP_SIZES = {'small': 2, 'medium': 20, 'large': 200}
+
+VOCABULARY = (
+    'trail running shoe waterproof breathable mesh upper cushioned midsole rubber outsole grip '
+    'lightweight durable premium comfort fit size wide narrow heel drop stability support arch '
+    'men women kids black blue red grey green reflective laces recycled materials vegan leather '
+    'warranty free shipping returns price sale discount best rated top quality performance '
+    'marathon road hiking terrain rocky mud wet dry weather season winter summer insulated gore tex'
+).split()
+
+
+def paragraph(rng, words=60):
+    return ' '.join(rng.choice(VOCABULARY) for _ in range(words)).capitalize() + '.'
+
+
+def generate_pdp(size, page):
+    """HTML for generated product page number `page` of the given size"""
+    rng = random.Random(f'{size}-{page}')
+    repeats = PDP_SIZES[size]
+    title = ' '.join(rng.choice(VOCABULARY) for _ in range(5)).title()
+
+    navigation = ''.join(f'<li><a href="/c/{i}">{rng.choice(VOCABULARY)}</a></li>' for i in range(40))
+    specs = ''.join(f'<tr><th>{rng.choice(VOCABULARY)}</th><td>{paragraph(rng, 8)}</td></tr>'
+                    for _ in range(repeats * 5))
+    reviews = ''.join(f'<div class="review"><h4>{paragraph(rng, 5)}</h4><p>{paragraph(rng)}</p></div>'
+                      for _ in range(repeats * 10))
+    description = ''.join(f'<p>{paragraph(rng)}</p>' for _ in range(repeats * 3))
+    scripts = ''.join(f'<script>window.__state_{i} = {{"sku": "{page}-{i}", "tracking": true}};</script>'
+                      for _ in range(repeats) for i in range(3))
+
+    return f"""<!DOCTYPE html>
+<html lang="en">
+<head>
+<meta charset="utf-8">
+<title>{title} | Example Outfitters</title>
+<meta name="description" content="{paragraph(rng, 20)}">
+<style>.product-title {{ font-size: 2rem; }}</style>
+</head>
+<body>
+<header><nav><ul>{navigation}</ul></nav></header>
+<nav aria-label="breadcrumb" class="breadcrumb"><a href="/">Home</a> / <a href="/shoes">Shoes</a> / {title}</nav>
+<main>
+<h1 class="product-title">{title}</h1>
+<div class="product-price"><span class="price-current">${rng.randint(40, 220)}.99</span></div>
+<div class="product-description">{description}</div>
+<table class="product-specs">{specs}</table>
+<section class="customer-reviews">{reviews}</section>
+</main>
+<footer><ul>{navigation}</ul></footer>
+{scripts}
+</body>
+</html>"""
+
+
+class SiteStubHandler(BaseHTTPRequestHandler):
+    """Serves sample guides and generated PDPs"""
+
+    samples = {}
+
+    def do_GET(self):
+        parts = self.path.strip('/').split('/')
+        body = None
+        if len(parts) == 2 and parts[0] == 'samples':
+            body = self.samples.get(parts[1])
+        elif len(parts) == 3 and parts[0] == 'pdp' and parts[1] in PDP_SIZES and parts[2].endswith('.html'):
+            try:
+                body = generate_pdp(parts[1], int(parts[2][:-len('.html')])).encode('utf-8')
+            except ValueError:
+                body = None
+
+        if body is None:
+            self.send_error(404)
+            return
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def load_samples():
+    samples = {}
+    for path in sorted(glob.glob(os.path.join(ROOT, 'samples', '*.html'))):
+        with open(path, 'rb') as f:
+            samples[os.path.basename(path)] = f.read()
+    return samples
+
+
+@contextmanager
+def serve(port=0):
+    """Run the stub in a background thread, yielding its base URL"""
+    SiteStubHandler.samples = load_samples()
+    server = ThreadingHTTPServer(('127.0.0.1', port), SiteStubHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f'http://127.0.0.1:{server.server_address[1]}'
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Serve sample and generated product pages locally.')
+    parser.add_argument('--port', type=int, default=8765)
+    args = parser.parse_args()
+
+    with serve(args.port) as base_url:
+        print(f'Serving {base_url}/samples/<name> and {base_url}/pdp/<{"|".join(PDP_SIZES)}>/<n>.html (Ctrl+C to stop)')
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == '__main__':
+    main()
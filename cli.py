@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+Offline batch analysis of competitor URL groups.
+
+Runs the same crawl -> tokenize -> find_common_keywords -> save pipeline as
+the /crawl form for every group in an input file, without going through HTTP.
+Pages are downloaded by a thread pool (through the per-host politeness
+scheduler) and the CPU-bound parsing and tokenizing is spread over a process
+pool, so large back-fills use every core. Several groups are in flight at
+once so both pools stay busy.
+
+Input is a JSONL file of {"group_id": ..., "urls": [...]} objects, or a CSV
+with group_id,url columns (one row per URL; rows sharing a group_id form a
+group). group_id is optional in JSONL and defaults to the line number.
+
+Each finished group is appended to the output JSONL file with its analysis_id.
+Re-running with the same output file resumes: groups already recorded as
+done are skipped.
+
+Usage:
+    python cli.py groups.jsonl -o analyses.jsonl --processes 8 --concurrency 4
+"""
+
+import argparse
+import csv
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import app
+
+
+def read_groups(path):
+    """Read (group_id, urls) pairs from a JSONL or CSV file, in input order"""
+    groups = {}
+    with open(path, 'r', newline='') as f:
+        if path.endswith('.csv'):
+            for row in csv.DictReader(f):
+                url = (row.get('url') or '').strip()
+                if url:
+                    groups.setdefault((row.get('group_id') or '').strip(), []).append(url)
+        else:
+            for line_number, line in enumerate(f, start=1):
+                if line.strip():
+                    entry = json.loads(line)
+                    group_id = str(entry.get('group_id') or line_number)
+                    groups.setdefault(group_id, []).extend(url.strip() for url in entry['urls'] if url.strip())
+    return list(groups.items())
+
+
+def completed_groups(path):
+    """group_ids already recorded as done in an earlier run's output file"""
+    done = set()
+    if not os.path.exists(path):
+        return done
+    with open(path, 'r') as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue  # Line cut short by an interrupted run
+            if record.get('status') == 'done':
+                done.add(record['group_id'])
+    return done
+
+
+def ends_with_newline(path):
+    """True if the file is empty, missing or ends with a complete line"""
+    try:
+        with open(path, 'rb') as f:
+            f.seek(0, os.SEEK_END)
+            if f.tell() == 0:
+                return True
+            f.seek(-1, os.SEEK_END)
+            return f.read(1) == b'\n'
+    except FileNotFoundError:
+        return True
+
+
+class BatchAnalyzer:
+    """Analyzes URL groups with shared fetch threads and parse/tokenize processes"""
+
+    def __init__(self, processes=None, fetch_workers=8):
+        self.processes = processes or os.cpu_count() or 1
+        self.fetch_workers = fetch_workers
+        # Read once here: worker threads have no app context
+        self.weights = app.get_setting('FIELD_WEIGHTS')
+        self.fetch_options = app.get_fetch_options()
+        self.deduplicate = app.get_setting('DEDUPLICATE_PAGES')
+        self.max_distance = app.get_setting('DUPLICATE_MAX_DISTANCE')
+
+    def analyze(self, group_id, urls, fetchers, workers):
+        """Crawl, tokenize, aggregate and save one group, returning its output record"""
+        started = time.monotonic()
+        fetched = list(fetchers.map(lambda url: app.fetch_url(url, fetch_options=self.fetch_options), urls))
+        pending = [
+            workers.submit(app.analyze_page, response.content, response.url, self.weights) if response else None
+            for response, _ in fetched
+        ]
+
+        urls_data = []
+        for url, (_, error), future in zip(urls, fetched, pending):
+            if future is None:
+                urls_data.append(app.failed_url_record(url, error))
+                continue
+            try:
+                page, tokens, _ = future.result()
+            except Exception as e:
+                urls_data.append(app.failed_url_record(url, f'Unexpected error for {url}: {str(e)}'))
+                continue
+            urls_data.append(app.url_record(url, page, tokens))
+        if self.deduplicate:
+            # Pages are parsed in parallel, so near-duplicates are only found here: they are
+            # still tokenized but left out of the group's keyword stats
+            app.resolve_duplicates(urls_data, self.max_distance)
+
+        record = {
+            'group_id': group_id,
+            'urls': urls,
+            'urls_crawled': sum(1 for data in urls_data if data['status'] == 'success'),
+            'duplicates': sum(1 for data in urls_data if data['status'] == 'duplicate')
+        }
+        try:
+            analysis_id, result, message = app.complete_analysis(urls_data)
+        except app.AnalysisError as e:
+            record.update(status='failed', message=str(e))
+        else:
+            record.update(
+                status='done',
+                analysis_id=analysis_id,
+                keyword_count=result['keyword_count'],
+                top_keywords=[keyword_data['keyword'] for keyword_data in result['common_keywords'][:10]],
+                message=message
+            )
+        record['seconds'] = round(time.monotonic() - started, 3)
+        return record
+
+    def run(self, groups, output, concurrency=4):
+        """Analyze (group_id, urls) groups, concurrency at a time, writing JSONL records to output"""
+        summary = {'done': 0, 'failed': 0}
+        write_lock = threading.Lock()
+
+        with app.create_parse_pool(self.processes) as workers, \
+                ThreadPoolExecutor(max_workers=self.fetch_workers) as fetchers, \
+                ThreadPoolExecutor(max_workers=max(1, concurrency)) as executor:
+            futures = [executor.submit(self.analyze, group_id, urls, fetchers, workers) for group_id, urls in groups]
+            for future in as_completed(futures):
+                record = future.result()
+                with write_lock:
+                    output.write(json.dumps(record) + '\n')
+                    output.flush()
+                summary[record['status']] += 1
+
+        return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Analyze groups of competitor URLs without the web app.')
+    parser.add_argument('input', help='JSONL file of {"group_id", "urls"} objects or CSV with group_id,url rows')
+    parser.add_argument('-o', '--output', default='analyses.jsonl', help='JSONL file to append results to')
+    parser.add_argument('--processes', type=int, default=None, help='parse/tokenize processes (default: CPU count)')
+    parser.add_argument('--fetch-workers', type=int, default=8, help='concurrent page downloads')
+    parser.add_argument('--concurrency', type=int, default=4, help='URL groups analyzed at once')
+    parser.add_argument('--no-resume', action='store_true', help='re-analyze groups already done in the output file')
+    args = parser.parse_args(argv)
+
+    groups = read_groups(args.input)
+    if not args.no_resume:
+        done = completed_groups(args.output)
+        skipped = sum(1 for group_id, _ in groups if group_id in done)
+        groups = [(group_id, urls) for group_id, urls in groups if group_id not in done]
+        if skipped:
+            print(f'Resuming: skipping {skipped} groups already done in {args.output}')
+
+    analyzer = BatchAnalyzer(args.processes, args.fetch_workers)
+    started = time.monotonic()
+    with open(args.output, 'a') as output:
+        if not ends_with_newline(args.output):
+            output.write('\n')  # The previous run was interrupted mid-write
+        summary = analyzer.run(groups, output, concurrency=args.concurrency)
+
+    print(f"Analyzed {len(groups)} groups in {time.monotonic() - started:.1f}s: "
+          f"{summary['done']} done, {summary['failed']} failed -> {args.output}")
+    return 0 if summary['failed'] == 0 else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
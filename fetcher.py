@@ -0,0 +1,240 @@
+"""
+HTTP fetching for the crawler: pooled keep-alive sessions per host, an
+on-disk page cache that revalidates with conditional GETs, and streaming
+downloads that can stop at a byte cap or once a marker has been received
+"""
+
+import os
+import glob
+import json
+import hashlib
+import threading
+from collections import OrderedDict, namedtuple
+from http.cookiejar import DefaultCookiePolicy
+from datetime import datetime
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.request import ACCEPT_ENCODING
+
+# Connections kept alive per host (matches the crawl thread pool size)
+POOL_MAXSIZE = 10
+
+# Hosts with a pooled session; the least recently used session is closed beyond this
+MAX_SESSIONS = 256
+
+# Read size for streamed downloads
+CHUNK_SIZE = 64 * 1024
+
+# Default on-disk page cache size; eviction trims it to EVICT_TO of this so it does not run on every write
+CACHE_MAX_BYTES = 1024 * 1024 * 1024
+EVICT_TO = 0.9
+
+# truncated is None for complete bodies, else 'max_bytes' or 'stop_marker'
+FetchResult = namedtuple('FetchResult', ['url', 'status_code', 'content', 'headers', 'from_cache', 'truncated'],
+                         defaults=[None])
+
+_sessions = OrderedDict()
+_sessions_lock = threading.Lock()
+
+
+def get_session(url):
+    """Return the shared keep-alive session for the URL's host, creating it on first use
+
+    Sessions never store cookies, so one analysis cannot change what a later
+    one sees. At most MAX_SESSIONS are kept; the least recently used is closed.
+    """
+    host = urlparse(url).netloc.lower()
+
+    with _sessions_lock:
+        session = _sessions.get(host)
+        if session is None:
+            session = requests.Session()
+            session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=POOL_MAXSIZE)
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            _sessions[host] = session
+            while len(_sessions) > MAX_SESSIONS:
+                _, evicted = _sessions.popitem(last=False)
+                evicted.close()
+        else:
+            _sessions.move_to_end(host)
+
+    return session
+
+
+def close_sessions():
+    """Close every pooled session (mainly useful for tests and shutdown)"""
+    with _sessions_lock:
+        for session in _sessions.values():
+            session.close()
+        _sessions.clear()
+
+
+class PageCache:
+    """On-disk cache of page bodies keyed by URL, storing ETag/Last-Modified validators
+
+    Once the bodies take more than max_bytes (None for no limit), the entries
+    stored or revalidated longest ago are removed first.
+    """
+
+    def __init__(self, cache_dir, max_bytes=CACHE_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self._size = None  # Bytes of bodies on disk, counted on the first write
+        self._lock = threading.Lock()
+
+    def _paths(self, url):
+        key = hashlib.sha256(url.encode('utf-8')).hexdigest()
+        base = os.path.join(self.cache_dir, key[:2], key)
+        return base + '.json', base + '.body'
+
+    def get(self, url):
+        """Return (meta, body) for a cached URL, or None if it is not cached"""
+        meta_path, body_path = self._paths(url)
+        try:
+            with open(meta_path, 'r') as f:
+                meta = json.load(f)
+            with open(body_path, 'rb') as f:
+                body = f.read()
+        except (OSError, ValueError):
+            return None
+        return meta, body
+
+    def put(self, url, response, body):
+        """Store a 200 response body if it carries validators we can revalidate with later"""
+        etag = response.headers.get('ETag')
+        last_modified = response.headers.get('Last-Modified')
+        if not etag and not last_modified:
+            return False
+
+        meta = {
+            'url': url,
+            'etag': etag,
+            'last_modified': last_modified,
+            'content_type': response.headers.get('Content-Type', ''),
+            'stored_at': datetime.now().isoformat()
+        }
+        self._write(url, meta, body)
+        return True
+
+    def touch(self, url, meta, response):
+        """Refresh stored validators after a 304 without rewriting the body"""
+        meta = dict(meta)
+        meta['etag'] = response.headers.get('ETag', meta.get('etag'))
+        meta['last_modified'] = response.headers.get('Last-Modified', meta.get('last_modified'))
+        meta['revalidated_at'] = datetime.now().isoformat()
+        self._write(url, meta, None)
+
+    def _write(self, url, meta, body):
+        meta_path, body_path = self._paths(url)
+        os.makedirs(os.path.dirname(meta_path), exist_ok=True)
+
+        # Write to temp files and rename so concurrent readers never see partial data
+        suffix = f'.{os.getpid()}.{threading.get_ident()}.tmp'
+        with self._lock:
+            if body is not None:
+                with open(body_path + suffix, 'wb') as f:
+                    f.write(body)
+                os.replace(body_path + suffix, body_path)
+            with open(meta_path + suffix, 'w') as f:
+                json.dump(meta, f)
+            os.replace(meta_path + suffix, meta_path)
+
+            if self.max_bytes is not None:
+                if self._size is not None and body is not None:
+                    self._size += len(body)
+                if self._size is None or self._size > self.max_bytes:
+                    self._evict()
+
+    def _evict(self):
+        # Rescan rather than trust the running total, since other processes share the directory
+        entries = []
+        for meta_path in glob.glob(os.path.join(self.cache_dir, '*', '*.json')):
+            body_path = meta_path[:-len('.json')] + '.body'
+            try:
+                entries.append((os.path.getmtime(meta_path), os.path.getsize(body_path), meta_path, body_path))
+            except OSError:
+                continue
+        self._size = sum(size for _, size, _, _ in entries)
+        if self._size <= self.max_bytes:
+            return
+        # The meta file is rewritten on every store and revalidation, so its mtime is the last use
+        entries.sort()
+        for _, size, meta_path, body_path in entries:
+            if self._size <= self.max_bytes * EVICT_TO:
+                break
+            for path in (meta_path, body_path):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            self._size -= size
+
+
+def read_body(response, max_bytes=None, stop_marker=None):
+    """Read a streamed response body, returning (content, truncated)
+
+    Content is decoded from gzip/deflate/br as it arrives. Reading stops after
+    max_bytes of decoded content, or after the chunk in which stop_marker
+    (matched case-insensitively) first appears; truncated names which limit
+    ended the download, or is None if the whole body was read.
+    """
+    marker = stop_marker.lower().encode('utf-8') if stop_marker else None
+    body = bytearray()
+    try:
+        for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+            search_from = max(0, len(body) - len(marker) + 1) if marker else 0
+            body.extend(chunk)
+
+            if max_bytes and len(body) > max_bytes:
+                del body[max_bytes:]
+                return bytes(body), 'max_bytes'
+            if marker and marker in bytes(body[search_from:]).lower():
+                return bytes(body), 'stop_marker'
+    finally:
+        response.close()
+    return bytes(body), None
+
+
+def fetch_page(url, headers=None, timeout=30, cache=None, max_bytes=None, stop_marker=None):
+    """GET a page through the pooled session for its host, revalidating against the cache.
+
+    Raises the usual requests exceptions (including HTTPError for error statuses).
+    A 304 Not Modified reply is served from the cached body without re-downloading it.
+    The body is streamed with compressed transfer, so memory stays bounded by
+    max_bytes; see read_body() for max_bytes and stop_marker. Truncated bodies
+    are not cached.
+    """
+    request_headers = dict(headers or {})
+    # gzip and deflate, plus br when a Brotli decoder is installed
+    request_headers.setdefault('Accept-Encoding', ACCEPT_ENCODING)
+    cached = cache.get(url) if cache is not None else None
+
+    if cached:
+        meta, _ = cached
+        if meta.get('etag'):
+            request_headers['If-None-Match'] = meta['etag']
+        if meta.get('last_modified'):
+            request_headers['If-Modified-Since'] = meta['last_modified']
+
+    response = get_session(url).get(url, headers=request_headers, timeout=timeout, stream=True)
+
+    if response.status_code == 304 and cached:
+        response.close()
+        meta, body = cached
+        cache.touch(url, meta, response)
+        return FetchResult(url, 200, body, response.headers, True)
+
+    if response.status_code >= 400:
+        response.close()
+    response.raise_for_status()
+
+    content, truncated = read_body(response, max_bytes, stop_marker)
+
+    if cache is not None and response.status_code == 200 and truncated is None:
+        cache.put(url, response, content)
+
+    return FetchResult(url, response.status_code, content, response.headers, False, truncated)
@@ -0,0 +1,117 @@
+"""
+Near-duplicate detection for crawled pages.
+
+simhash() reduces a page's extracted text to a 64-bit SimHash over word
+shingles: pages whose text is mostly the same (syndicated manufacturer copy,
+the same product under different URL parameters) get fingerprints that
+differ in only a few bits. DuplicateIndex finds an earlier page within a
+Hamming distance using band lookups, so checking a page against hundreds of
+others does not compare it with each of them.
+"""
+
+import re
+import hashlib
+import threading
+from collections import Counter
+
+BITS = 64
+SHINGLE_SIZE = 3  # Words per shingle
+DEFAULT_MAX_DISTANCE = 3  # Differing bits still treated as a near-duplicate
+
+WORD_PATTERN = re.compile(r'\w+')
+
+
+def simhash(text, shingle_size=SHINGLE_SIZE):
+    """64-bit SimHash of text's word shingles, or None if it has too few words to compare"""
+    words = WORD_PATTERN.findall(text.lower())
+    if len(words) < shingle_size:
+        return None
+    shingles = {' '.join(words[i:i + shingle_size]) for i in range(len(words) - shingle_size + 1)}
+
+    # Count, for every bit position, how many shingle hashes have it set. Hashes are
+    # concatenated as 8-byte big-endian digests, so the bytes at offset j, j+8, ...
+    # hold bits 8j..8j+7 of every hash and can be tallied per byte value in C.
+    digests = b''.join(hashlib.blake2b(shingle.encode('utf-8'), digest_size=8).digest() for shingle in shingles)
+    half = len(shingles) / 2
+    fingerprint = 0
+    for offset in range(8):
+        ones = [0] * 8
+        for byte, count in Counter(digests[offset::8]).items():
+            for bit in range(8):
+                if byte & (0x80 >> bit):
+                    ones[bit] += count
+        for bit in range(8):
+            fingerprint = (fingerprint << 1) | (ones[bit] > half)
+    return fingerprint
+
+
+def hamming_distance(a, b):
+    return bin(a ^ b).count('1')
+
+
+class DuplicateIndex:
+    """Fingerprints of pages seen so far, looked up by Hamming distance
+
+    The 64 bits are split into max_distance + 1 bands: two fingerprints within
+    max_distance bits of each other must agree exactly on at least one band,
+    so only pages sharing a band are compared. Each page has a position (its
+    place in the input), so lookups can be limited to earlier pages and always
+    return the earliest match, whatever order pages were added in. Safe to
+    share between threads; snapshot() gives a lock-free copy that can be sent
+    to a worker process.
+    """
+
+    def __init__(self, max_distance=DEFAULT_MAX_DISTANCE):
+        self.max_distance = max_distance
+        bands = max_distance + 1
+        edges = [BITS * i // bands for i in range(bands + 1)]
+        self._bands = [(start, (1 << (end - start)) - 1) for start, end in zip(edges, edges[1:])]
+        self._buckets = [{} for _ in self._bands]
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def _band_values(self, fingerprint):
+        return [(fingerprint >> start) & mask for start, mask in self._bands]
+
+    def _find(self, fingerprint, before):
+        best = None
+        for buckets, value in zip(self._buckets, self._band_values(fingerprint)):
+            for position, key, candidate in buckets.get(value, ()):
+                if (before is None or position < before) and (best is None or position < best[0]) \
+                        and hamming_distance(fingerprint, candidate) <= self.max_distance:
+                    best = (position, key)
+        return best[1] if best is not None else None
+
+    def find(self, fingerprint, before=None):
+        """Key of the earliest indexed page within max_distance bits of fingerprint, or None
+
+        With before, only pages at a lower position are considered.
+        """
+        if fingerprint is None:
+            return None
+        if self._lock is None:
+            return self._find(fingerprint, before)
+        with self._lock:
+            return self._find(fingerprint, before)
+
+    def add(self, key, fingerprint, position=None):
+        """Index a page at position (default: after every page added so far)"""
+        if fingerprint is None:
+            return
+        with self._lock:
+            if position is None:
+                position = self._count
+            self._count = max(self._count, position + 1)
+            for buckets, value in zip(self._buckets, self._band_values(fingerprint)):
+                buckets.setdefault(value, []).append((position, key, fingerprint))
+
+    def snapshot(self):
+        """A read-only copy of the index as it is now (picklable, for worker processes)"""
+        copy = DuplicateIndex.__new__(DuplicateIndex)
+        copy.max_distance = self.max_distance
+        copy._bands = self._bands
+        with self._lock:
+            copy._buckets = [{value: list(entries) for value, entries in buckets.items()} for buckets in self._buckets]
+            copy._count = self._count
+        copy._lock = None
+        return copy
@@ -0,0 +1,223 @@
+"""
+Background job execution for long-running analyses.
+
+A JobManager runs submitted work on a local thread pool and tracks each job's
+state and per-URL progress. Updates are also written to a small JSON file
+(per-URL progress at most every URL_PERSIST_INTERVAL seconds) so a status
+request served by another worker process still sees the job.
+"""
+
+import os
+import glob
+import json
+import time
+import uuid
+import threading
+import traceback
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+# Job lifecycle states, in order
+JOB_STATES = ('queued', 'fetching', 'tokenizing', 'aggregating', 'done', 'failed')
+
+# Per-URL states
+URL_STATES = ('queued', 'fetching', 'tokenizing', 'done', 'duplicate', 'failed')
+
+# Seconds between sweeps of expired job files
+SWEEP_INTERVAL = 3600
+
+# Least seconds between state file writes for per-URL progress alone
+URL_PERSIST_INTERVAL = 0.5
+
+
+class JobError(Exception):
+    """Raised by job functions to fail a job with a user-facing message"""
+
+
+class Job:
+    """A unit of background work plus its progress, safe to update from worker threads"""
+
+    def __init__(self, manager, job_id, kind, urls):
+        self._manager = manager
+        self._lock = threading.Lock()
+        now = datetime.now().isoformat()
+        self.data = {
+            'job_id': job_id,
+            'kind': kind,
+            'state': 'queued',
+            'message': '',
+            'analysis_id': None,
+            'created_at': now,
+            'updated_at': now,
+            'urls': [{'url': url, 'state': 'queued', 'error': None} for url in urls]
+        }
+        # URLs per state, so progress updates need not scan the whole list
+        self._url_counts = Counter(queued=len(urls))
+        self._persisted_at = 0.0  # time.monotonic() of the last state file write
+
+    @property
+    def job_id(self):
+        return self.data['job_id']
+
+    def update(self, **fields):
+        """Set job-level fields such as state, message or analysis_id"""
+        with self._lock:
+            self.data.update(fields)
+            self.data['updated_at'] = datetime.now().isoformat()
+            self._persist()
+
+    def set_urls(self, urls):
+        """Replace the job's URL list, e.g. once a bulk job has read its sitemap"""
+        with self._lock:
+            self.data['urls'] = [{'url': url, 'state': 'queued', 'error': None} for url in urls]
+            self._url_counts = Counter(queued=len(urls))
+            self.data['updated_at'] = datetime.now().isoformat()
+            self._persist()
+
+    def update_url(self, index, state, error=None):
+        """Record progress for one URL of the job
+
+        The state file is rewritten when the job's state changes, otherwise at
+        most every URL_PERSIST_INTERVAL seconds.
+        """
+        with self._lock:
+            entry = self.data['urls'][index]
+            self._url_counts[entry['state']] -= 1
+            self._url_counts[state] += 1
+            entry['state'] = state
+            entry['error'] = error
+
+            # While URLs are in flight the job is fetching until every URL has been fetched
+            job_state = self.data['state']
+            if job_state in ('queued', 'fetching', 'tokenizing'):
+                in_fetch = self._url_counts['queued'] or self._url_counts['fetching']
+                self.data['state'] = 'fetching' if in_fetch else 'tokenizing'
+            self.data['updated_at'] = datetime.now().isoformat()
+            if (self.data['state'] != job_state
+                    or time.monotonic() - self._persisted_at >= URL_PERSIST_INTERVAL):
+                self._persist()
+
+    def snapshot(self):
+        with self._lock:
+            return self._snapshot()
+
+    def _persist(self):
+        # Called under the lock so an older snapshot never overwrites a newer one
+        self._manager._persist(self._snapshot())
+        self._persisted_at = time.monotonic()
+
+    def _snapshot(self):
+        data = dict(self.data)
+        data['urls'] = [dict(entry) for entry in self.data['urls']]
+        return data
+
+
+class JobManager:
+    """Runs jobs on a bounded local worker pool and reports their status
+
+    Finished jobs' state files are deleted once they have not been updated for
+    job_ttl seconds (checked at most once per SWEEP_INTERVAL, on submit).
+    """
+
+    def __init__(self, max_workers=2, state_dir=os.path.join('data', 'jobs'), max_jobs_in_memory=500,
+                 job_ttl=7 * 24 * 3600):
+        self.max_workers = max_workers
+        self.state_dir = state_dir
+        self.max_jobs_in_memory = max_jobs_in_memory
+        self.job_ttl = job_ttl
+        self._jobs = {}
+        self._lock = threading.Lock()
+        self._executor = None
+        self._last_sweep = None
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='analysis-job')
+            return self._executor
+
+    def submit(self, func, urls, kind='crawl'):
+        """Queue func(job) to run in the background and return the new job's ID"""
+        job = Job(self, uuid.uuid4().hex[:12], kind, urls)
+        with self._lock:
+            self._jobs[job.job_id] = job
+            self._evict_finished()
+            now = time.monotonic()
+            sweep = self._last_sweep is None or now - self._last_sweep >= SWEEP_INTERVAL
+            if sweep:
+                self._last_sweep = now
+        if sweep:
+            self.sweep_expired()
+        self._persist(job.snapshot())
+        self._get_executor().submit(self._run, job, func)
+        return job.job_id
+
+    def _run(self, job, func):
+        try:
+            func(job)
+        except JobError as e:
+            job.update(state='failed', message=str(e))
+        except Exception as e:
+            traceback.print_exc()
+            job.update(state='failed', message=f'Error processing URLs: {str(e)}')
+
+    def _evict_finished(self):
+        # Finished jobs remain readable from disk, so only recent ones stay in memory
+        excess = len(self._jobs) - self.max_jobs_in_memory
+        if excess <= 0:
+            return
+        finished = [job_id for job_id, job in self._jobs.items() if job.data['state'] in ('done', 'failed')]
+        for job_id in finished[:excess]:
+            del self._jobs[job_id]
+
+    def sweep_expired(self):
+        """Delete state files of finished jobs not updated for job_ttl seconds; returns how many"""
+        cutoff = time.time() - self.job_ttl
+        removed = 0
+        for path in glob.glob(os.path.join(self.state_dir, 'job_*.json')):
+            try:
+                if os.path.getmtime(path) > cutoff:
+                    continue
+                with open(path, 'r') as f:
+                    snapshot = json.load(f)
+                if snapshot.get('state') not in ('done', 'failed'):
+                    continue
+                os.remove(path)
+            except (OSError, ValueError):
+                continue  # Written or removed by another process meanwhile
+            removed += 1
+            with self._lock:
+                self._jobs.pop(snapshot.get('job_id'), None)
+        return removed
+
+    def get(self, job_id):
+        """Return a status snapshot for a job, or None if it is unknown"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is not None:
+            return job.snapshot()
+
+        # Job may have been submitted through a different worker process
+        try:
+            with open(self._path(job_id), 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def shutdown(self, wait=True):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait)
+
+    def _path(self, job_id):
+        return os.path.join(self.state_dir, f'job_{os.path.basename(job_id)}.json')
+
+    def _persist(self, snapshot):
+        os.makedirs(self.state_dir, exist_ok=True)
+        path = self._path(snapshot['job_id'])
+        tmp_path = f'{path}.{threading.get_ident()}.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(snapshot, f)
+        os.replace(tmp_path, path)
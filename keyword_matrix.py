@@ -0,0 +1,123 @@
+"""
+NumPy document-term matrix backend for keyword scoring.
+
+Phrases are interned into an integer vocabulary and the per-URL counters are
+stored as a sparse (COO) document-term matrix. Coverage, frequencies and the
+strategic tiers are then computed as vectorized array operations, which keeps
+large competitor sets (hundreds of PDPs) fast.
+
+NumPy is optional; check HAS_NUMPY before using this module.
+"""
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - exercised only without numpy installed
+    np = None
+
+HAS_NUMPY = np is not None
+
+# Score boost per strategic tier, highest priority first
+TIER_BOOSTS = (1000, 500, 200, 150, 50)
+
+
+class DocumentTermMatrix:
+    """Sparse document-term counts over an interned phrase vocabulary"""
+
+    def __init__(self, vocabulary, doc_ids, term_ids, counts, num_docs):
+        self.vocabulary = vocabulary
+        self.doc_ids = doc_ids
+        self.term_ids = term_ids
+        self.counts = counts
+        self.num_docs = num_docs
+
+    @classmethod
+    def from_counters(cls, file_keywords_list):
+        """Build the matrix from a list of {phrase: count} dicts, one per document"""
+        if not HAS_NUMPY:
+            raise RuntimeError('The matrix keyword backend requires numpy')
+
+        term_index = {}
+        vocabulary = []
+        doc_ids = []
+        term_ids = []
+        counts = []
+
+        for doc_id, keywords_dict in enumerate(file_keywords_list):
+            for keyword, count in keywords_dict.items():
+                term_id = term_index.get(keyword)
+                if term_id is None:
+                    term_id = term_index[keyword] = len(vocabulary)
+                    vocabulary.append(keyword)
+                doc_ids.append(doc_id)
+                term_ids.append(term_id)
+                counts.append(count)
+
+        counts = np.asarray(counts) if counts else np.zeros(0, dtype=np.int64)
+        return cls(
+            vocabulary,
+            np.asarray(doc_ids, dtype=np.int64),
+            np.asarray(term_ids, dtype=np.int64),
+            counts,
+            len(file_keywords_list)
+        )
+
+    def doc_frequency(self):
+        """Number of documents each term appears in"""
+        return np.bincount(self.term_ids, minlength=len(self.vocabulary))
+
+    def total_frequency(self):
+        """Summed count of each term across all documents"""
+        totals = np.bincount(self.term_ids, weights=self.counts, minlength=len(self.vocabulary))
+        if np.issubdtype(self.counts.dtype, np.integer):
+            totals = totals.astype(np.int64)
+        return totals
+
+
+def rank_keywords_matrix(file_keywords_list, thresholds, quality_pattern):
+    """Vectorized equivalent of app.rank_keywords() over a document-term matrix.
+
+    thresholds is the dict from app.tier_thresholds(); quality_pattern is the
+    compiled regex marking tier-4 quality keywords.
+    """
+    matrix = DocumentTermMatrix.from_counters(file_keywords_list)
+    num_files = matrix.num_docs
+    if not matrix.vocabulary:
+        return []
+
+    doc_freq = matrix.doc_frequency()
+    total_freq = matrix.total_frequency()
+    avg_freq = total_freq / doc_freq
+
+    partial = doc_freq >= thresholds['partial']
+    tier1 = (doc_freq == num_files) & (total_freq >= 2)
+    tier2 = (doc_freq >= thresholds['majority']) & (total_freq >= 3)
+    tier3 = (total_freq >= thresholds['gap_frequency']) & (avg_freq >= 1.5)
+    tier5 = partial & (total_freq >= 3) & (avg_freq >= 1.0)
+
+    # The quality-term regex is the only per-string test, so only run it on
+    # keywords that pass tier 4's numeric conditions and no earlier tier
+    tier4 = np.zeros(len(matrix.vocabulary), dtype=bool)
+    candidates = np.flatnonzero(partial & (total_freq >= 2) & ~(tier1 | tier2 | tier3))
+    vocabulary = matrix.vocabulary
+    for term_id in candidates:
+        if quality_pattern.search(vocabulary[term_id].lower()):
+            tier4[term_id] = True
+
+    boost = np.select([tier1, tier2, tier3, tier4, tier5], TIER_BOOSTS, default=0)
+    selected = np.flatnonzero(boost)
+    scores = total_freq[selected] + boost[selected]
+
+    # Sort by strategic score (descending) and then alphabetically
+    lowered = np.array([vocabulary[term_id].lower() for term_id in selected], dtype=str)
+    order = np.lexsort((lowered, -scores)) if len(selected) else selected
+
+    return [
+        {
+            'keyword': vocabulary[selected[i]],
+            'frequency': total_freq[selected[i]].item(),
+            'coverage': int(doc_freq[selected[i]]) / num_files,
+            'files_containing': int(doc_freq[selected[i]]),
+            'strategic_score': scores[i].item()
+        }
+        for i in order
+    ]
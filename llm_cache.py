@@ -0,0 +1,75 @@
+"""
+Content-addressed cache for LLM analysis results.
+
+Entries are keyed by a SHA-256 of the request inputs (keyword payload, product
+title, model, temperature) and hold the rendered HTML. Recently used entries
+are kept in an in-memory LRU; every entry is also written to disk so it
+survives restarts and is shared between worker processes.
+"""
+
+import os
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+
+
+class LLMCache:
+    """Two-level (memory LRU + disk) string cache keyed by request content"""
+
+    def __init__(self, cache_dir, max_memory_entries=256):
+        self.cache_dir = cache_dir
+        self.max_memory_entries = max_memory_entries
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(**parts):
+        """Stable hash of the inputs that determine an LLM response"""
+        canonical = json.dumps(parts, sort_keys=True, separators=(',', ':'), ensure_ascii=False)
+        return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key[:2], f'{key}.html')
+
+    def get(self, key):
+        """Return the cached value for key, or None"""
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return self._memory[key]
+
+        try:
+            with open(self._path(key), 'r', encoding='utf-8') as f:
+                value = f.read()
+        except OSError:
+            with self._lock:
+                self.misses += 1
+            return None
+
+        with self._lock:
+            self.hits += 1
+            self._remember(key, value)
+        return value
+
+    def set(self, key, value):
+        """Store value under key in memory and on disk"""
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(value)
+        os.replace(tmp_path, path)
+
+        with self._lock:
+            self._remember(key, value)
+
+    def _remember(self, key, value):
+        # Caller holds the lock; evict least recently used entries past the limit
+        self._memory[key] = value
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
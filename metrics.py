@@ -0,0 +1,178 @@
+"""
+Process-local metrics in the Prometheus text exposition format.
+
+A small, dependency-free registry of counters and histograms (with labels)
+that the /metrics endpoint renders for scraping. stage_timer() times a block
+of code into the stage latency histogram and, optionally, into a per-request
+timings dict that can be stored with an analysis.
+
+With several worker processes (e.g. gunicorn -w 4) each worker reports its
+own values; scrape the workers individually or aggregate in Prometheus.
+"""
+
+import math
+import threading
+import time
+from contextlib import contextmanager
+
+TIME_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+BYTE_BUCKETS = tuple(1024 * 4 ** i for i in range(8))  # 1KB .. 16MB
+COUNT_BUCKETS = (10, 50, 100, 500, 1000, 5000, 10000, 50000, 100000, 500000)
+
+
+def _format_labels(labelnames, values, extra=()):
+    pairs = list(zip(labelnames, values)) + list(extra)
+    if not pairs:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in pairs)
+    return '{' + ','.join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + '}'
+
+
+def _format_value(value):
+    if value == math.inf:
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f'{self.name} expects labels {self.labelnames}, got {tuple(labels)}')
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.kind}']
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            lines.extend(self._render_sample(key, value))
+        return lines
+
+
+class Counter(_Metric):
+    """Monotonically increasing count, optionally split by labels"""
+
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+    def _render_sample(self, key, value):
+        return [f'{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}']
+
+
+class Histogram(_Metric):
+    """Distribution of observed values over fixed cumulative buckets"""
+
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=TIME_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            counts, total = self._values.get(key, ([0] * len(self.buckets), 0))
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+            self._values[key] = (counts, total + value)
+
+    def count(self, **labels):
+        with self._lock:
+            counts, _ = self._values.get(self._key(labels), ([0] * len(self.buckets), 0))
+            return counts[-1]
+
+    def _render_sample(self, key, value):
+        counts, total = value
+        lines = [
+            f'{self.name}_bucket{_format_labels(self.labelnames, key, [("le", _format_value(bound))])} {count}'
+            for bound, count in zip(self.buckets, counts)
+        ]
+        lines.append(f'{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(total)}')
+        lines.append(f'{self.name}_count{_format_labels(self.labelnames, key)} {counts[-1]}')
+        return lines
+
+
+class Registry:
+    """Named collection of metrics rendered together"""
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric):
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._register(Counter(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=TIME_BUCKETS):
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self):
+        """All metrics in the Prometheus text format (version 0.0.4)"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+STAGE_SECONDS = REGISTRY.histogram(
+    'analyzer_stage_duration_seconds', 'Time spent in each pipeline stage', ['stage'])
+PAGE_BYTES = REGISTRY.histogram(
+    'analyzer_page_size_bytes', 'Size of crawled page bodies', buckets=BYTE_BUCKETS)
+DOWNLOADED_BYTES = REGISTRY.counter(
+    'analyzer_downloaded_bytes_total', 'Page bytes downloaded (excluding pages served from the HTTP cache)')
+PAGE_TOKENS = REGISTRY.histogram(
+    'analyzer_page_tokens', 'Weighted keyword occurrences per crawled page', buckets=COUNT_BUCKETS)
+VOCABULARY_SIZE = REGISTRY.histogram(
+    'analyzer_vocabulary_size', 'Distinct keywords per crawled page or per analysis', ['scope'], buckets=COUNT_BUCKETS)
+TRUNCATED_PAGES = REGISTRY.counter(
+    'analyzer_truncated_pages_total', 'Page downloads cut short, by the limit that stopped them', ['reason'])
+FETCH_BACKOFFS = REGISTRY.counter(
+    'analyzer_fetch_backoffs_total', 'Times a host was backed off after asking us to slow down', ['status'])
+CACHE_REQUESTS = REGISTRY.counter(
+    'analyzer_cache_requests_total', 'Cache lookups by cache and result', ['cache', 'result'])
+PAGES = REGISTRY.counter(
+    'analyzer_pages_total', 'Crawled pages by outcome', ['status'])
+OPENAI_TOKENS = REGISTRY.counter(
+    'analyzer_openai_tokens_total', 'OpenAI tokens reported by the API', ['kind'])
+
+
+@contextmanager
+def stage_timer(stage, timings=None):
+    """Time the enclosed block into the stage histogram and, if given, add it to timings[stage]"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        STAGE_SECONDS.observe(elapsed, stage=stage)
+        if timings is not None:
+            timings[stage] = round(timings.get(stage, 0) + elapsed, 6)
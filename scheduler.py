@@ -0,0 +1,231 @@
+"""
+Polite fetching shared by every crawl in the process.
+
+A HostScheduler sits in front of fetch_page(): it limits how many requests
+run against one host at a time, spaces request starts on a host by a minimum
+delay (or the site's robots.txt Crawl-delay, if longer), backs a host off when
+it answers 429 or 503 (honouring Retry-After) and checks each URL against a
+cached robots.txt. State is kept per host, so crawls of different domains
+never wait on each other.
+"""
+
+import time
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlparse
+from urllib.robotparser import RobotFileParser
+
+import requests
+
+import metrics
+from fetcher import fetch_page
+
+# Statuses that mean "slow down" rather than a failed page
+BACKOFF_STATUSES = (429, 503)
+
+# Longest robots.txt Crawl-delay honoured, in seconds
+MAX_CRAWL_DELAY = 10
+
+# Bytes of a robots.txt file read; Google also ignores anything past 500 KiB
+ROBOTS_MAX_BYTES = 500 * 1024
+
+# Hosts whose state is kept; the least recently used idle hosts are dropped beyond this
+MAX_HOSTS = 2000
+
+
+class RobotsDisallowed(requests.exceptions.RequestException):
+    """Raised when robots.txt does not allow fetching a URL"""
+
+
+def retry_after_seconds(response, now=None):
+    """Seconds to wait from a Retry-After header (delta-seconds or HTTP-date), or None"""
+    value = (response.headers.get('Retry-After') or '').strip() if response is not None else ''
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, retry_at.timestamp() - (now if now is not None else time.time()))
+
+
+class _HostState:
+    def __init__(self, max_concurrency):
+        self.slots = threading.BoundedSemaphore(max_concurrency)
+        self.lock = threading.Lock()
+        self.next_start = 0.0
+        self.blocked_until = 0.0
+        self.active = 0
+        self.failures = 0
+        self.robots_lock = threading.Lock()
+        self.robots = None
+        self.robots_expires = 0.0
+
+
+class HostScheduler:
+    """Per-host concurrency limits, request spacing, 429/503 backoff and robots.txt checks
+
+    user_agent is the token robots.txt rules are matched against ('*' follows
+    the rules for all crawlers); headers are sent when fetching robots.txt.
+    State is kept for at most max_hosts hosts: beyond that, the least recently
+    used hosts with no request in flight or pending delay are forgotten.
+    """
+
+    def __init__(self, max_per_host=2, min_delay=0.5, max_retries=2, backoff_base=1.0, max_backoff=60,
+                 user_agent='*', headers=None, respect_robots=True, robots_ttl=3600, max_hosts=MAX_HOSTS):
+        self.max_per_host = max(1, max_per_host)
+        self.min_delay = min_delay
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.max_backoff = max_backoff
+        self.user_agent = user_agent
+        self.headers = headers
+        self.respect_robots = respect_robots
+        self.robots_ttl = robots_ttl
+        self.max_hosts = max_hosts
+        self._hosts = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _host(self, url, hold=False):
+        """The state for a URL's host; with hold, it is marked in use (see _release()) before eviction can see it"""
+        host = urlparse(url).netloc.lower()
+        with self._lock:
+            state = self._hosts.get(host)
+            if state is None:
+                state = self._hosts[host] = _HostState(self.max_per_host)
+            else:
+                self._hosts.move_to_end(host)
+            if hold:
+                with state.lock:
+                    state.active += 1
+            if len(self._hosts) > self.max_hosts:
+                self._evict_idle_hosts()
+            return state
+
+    def _release(self, state):
+        with state.lock:
+            state.active -= 1
+
+    def _evict_idle_hosts(self):
+        # Oldest first; a host still fetching or waiting out a delay or backoff is kept, as is
+        # the host just asked for (the most recently used)
+        now = time.monotonic()
+        for host, state in list(self._hosts.items())[:-1]:
+            if len(self._hosts) <= self.max_hosts:
+                break
+            with state.lock:
+                idle = state.active == 0 and max(state.next_start, state.blocked_until) <= now
+            if idle:
+                del self._hosts[host]
+
+    def robots(self, url):
+        """The parsed robots.txt for a URL's host, fetched at most once per robots_ttl"""
+        state = self._host(url, hold=True)
+        try:
+            with state.robots_lock:
+                if state.robots is None or time.monotonic() >= state.robots_expires:
+                    state.robots = self._fetch_robots(url)
+                    state.robots_expires = time.monotonic() + self.robots_ttl
+                return state.robots
+        finally:
+            self._release(state)
+
+    def _fetch_robots(self, url):
+        parsed = urlparse(url)
+        robots_url = f'{parsed.scheme}://{parsed.netloc}/robots.txt'
+        parser = RobotFileParser(robots_url)
+        try:
+            # robots.txt counts against the host's limits like any other request
+            with self._slot(url) as state:
+                self._wait_turn(state, self.min_delay)
+                response = fetch_page(robots_url, headers=self.headers, timeout=10, max_bytes=ROBOTS_MAX_BYTES)
+        except requests.exceptions.HTTPError as e:
+            if e.response is not None and e.response.status_code in (401, 403):
+                parser.disallow_all = True
+            else:
+                parser.allow_all = True
+            return parser
+        except requests.exceptions.RequestException:
+            # Unreachable robots.txt: allow everything, as with a missing one
+            parser.allow_all = True
+            return parser
+        parser.parse(response.content.decode('utf-8', errors='replace').splitlines())
+        return parser
+
+    @contextmanager
+    def _slot(self, url):
+        """Hold one of the URL's host's concurrency slots, yielding the host's state"""
+        state = self._host(url, hold=True)
+        try:
+            with state.slots:
+                yield state
+        finally:
+            self._release(state)
+
+    def can_fetch(self, url):
+        return not self.respect_robots or self.robots(url).can_fetch(self.user_agent, url)
+
+    def _delay(self, url):
+        delay = self.min_delay
+        if self.respect_robots:
+            crawl_delay = self.robots(url).crawl_delay(self.user_agent)
+            if crawl_delay:
+                delay = max(delay, min(float(crawl_delay), MAX_CRAWL_DELAY))
+        return delay
+
+    def _wait_turn(self, state, delay):
+        """Block until the host's delay and any backoff have passed, then claim the next start"""
+        while True:
+            with state.lock:
+                now = time.monotonic()
+                wait = max(state.next_start, state.blocked_until) - now
+                if wait <= 0:
+                    state.next_start = now + delay
+                    return
+            time.sleep(wait)
+
+    def backoff(self, url, response=None):
+        """Hold off new requests to a host after it asked us to slow down; returns the delay"""
+        state = self._host(url)
+        with state.lock:
+            state.failures += 1
+            delay = retry_after_seconds(response)
+            if delay is None:
+                delay = self.backoff_base * 2 ** (state.failures - 1)
+            delay = min(delay, self.max_backoff)
+            state.blocked_until = max(state.blocked_until, time.monotonic() + delay)
+        metrics.FETCH_BACKOFFS.inc(status=response.status_code if response is not None else 'none')
+        return delay
+
+    def fetch(self, url, **kwargs):
+        """fetch_page() for url once robots.txt, the host's limits and any backoff allow it
+
+        Raises RobotsDisallowed for disallowed URLs; 429/503 answers are retried
+        up to max_retries times before their HTTPError is raised.
+        """
+        if not self.can_fetch(url):
+            raise RobotsDisallowed(f'Disallowed by robots.txt: {url}')
+
+        delay = self._delay(url)
+        attempt = 0
+        while True:
+            with self._slot(url) as state:
+                self._wait_turn(state, delay)
+                try:
+                    result = fetch_page(url, **kwargs)
+                except requests.exceptions.HTTPError as e:
+                    response = e.response
+                    if response is None or response.status_code not in BACKOFF_STATUSES or attempt >= self.max_retries:
+                        raise
+                    self.backoff(url, response)
+                    attempt += 1
+                    continue
+                with state.lock:
+                    state.failures = 0
+            return result
@@ -0,0 +1,247 @@
+"""
+Single-pass CSS selector matching for content extraction.
+
+Prioritized selector lists are compiled once into plain Python predicates.
+A document is then walked a single time, recording the first element that
+matches each section's highest-priority selector, which gives the same
+answer as calling soup.select_one() for each selector in order.
+"""
+
+import re
+
+import soupsieve
+from bs4 import Tag
+
+# Compound selector pieces we compile natively: tag, #id, .class and
+# [attr], [attr=v], [attr*=v], [attr^=v], [attr$=v], [attr~=v]
+_TOKEN_RE = re.compile(r"""
+    (?P<tag>[a-zA-Z][\w-]*|\*)
+  | \#(?P<id>[\w-]+)
+  | \.(?P<cls>[\w-]+)
+  | \[\s*(?P<attr>[\w:-]+)\s*(?:(?P<op>[*^$~]?=)\s*(?:"(?P<dq>[^"]*)"|'(?P<sq>[^']*)'|(?P<bare>[\w-]+))\s*)?\]
+""", re.VERBOSE)
+
+_COMBINATOR_RE = re.compile(r'\s*(>)\s*|\s+')
+
+
+class _Compound:
+    """One compound selector such as h1.product-title[data-id*="x"]"""
+
+    __slots__ = ('tag', 'id', 'classes', 'attrs')
+
+    def __init__(self):
+        self.tag = None
+        self.id = None
+        self.classes = []
+        self.attrs = []
+
+    def matches(self, el):
+        if self.tag is not None and el.name != self.tag:
+            return False
+        attrs = el.attrs
+        if self.id is not None and attrs.get('id') != self.id:
+            return False
+        if self.classes:
+            el_classes = attrs.get('class') or ()
+            if isinstance(el_classes, str):
+                el_classes = el_classes.split()
+            for cls in self.classes:
+                if cls not in el_classes:
+                    return False
+        for name, op, value in self.attrs:
+            actual = attrs.get(name)
+            if actual is None:
+                return False
+            if op is None:
+                continue
+            if isinstance(actual, list):
+                actual = ' '.join(actual)
+            if op == '=':
+                if actual != value:
+                    return False
+            elif op == '*=':
+                if not value or value not in actual:
+                    return False
+            elif op == '^=':
+                if not value or not actual.startswith(value):
+                    return False
+            elif op == '$=':
+                if not value or not actual.endswith(value):
+                    return False
+            elif op == '~=':
+                if value not in actual.split():
+                    return False
+        return True
+
+
+def _parse_compound(text):
+    compound = _Compound()
+    pos = 0
+    while pos < len(text):
+        match = _TOKEN_RE.match(text, pos)
+        if not match:
+            return None
+        if match.group('tag'):
+            if pos != 0:
+                return None
+            if match.group('tag') != '*':
+                compound.tag = match.group('tag').lower()
+        elif match.group('id'):
+            compound.id = match.group('id')
+        elif match.group('cls'):
+            compound.classes.append(match.group('cls'))
+        else:
+            value = next((v for v in (match.group('dq'), match.group('sq'), match.group('bare')) if v is not None), None)
+            compound.attrs.append((match.group('attr').lower(), match.group('op'), value))
+        pos = match.end()
+    return compound
+
+
+class CompiledSelector:
+    """A selector compiled into right-to-left compound matchers.
+
+    Descendant and child combinators are handled natively; anything richer
+    (pseudo-classes, sibling combinators, selector groups) is delegated to
+    soupsieve so the matching semantics never change.
+    """
+
+    def __init__(self, selector):
+        self.selector = selector
+        self.chain = self._compile(selector.strip())
+        self._fallback = None if self.chain is not None else soupsieve.compile(selector)
+
+    @staticmethod
+    def _compile(selector):
+        if not selector or ',' in selector:
+            return None
+
+        chain = []
+        combinator = None
+        pos = 0
+        for match in _COMBINATOR_RE.finditer(selector):
+            compound = _parse_compound(selector[pos:match.start()])
+            if compound is None:
+                return None
+            chain.append((combinator, compound))
+            combinator = '>' if match.group(1) else ' '
+            pos = match.end()
+
+        compound = _parse_compound(selector[pos:])
+        if compound is None:
+            return None
+        chain.append((combinator, compound))
+        return chain
+
+    @property
+    def needs_attributes(self):
+        """True if the selector can only match elements that have attributes"""
+        if self.chain is None:
+            return False
+        subject = self.chain[-1][1]
+        return bool(subject.id is not None or subject.classes or subject.attrs)
+
+    @property
+    def key(self):
+        """Cheapest requirement of the rightmost compound, used to bucket selectors"""
+        if self.chain is None:
+            return None
+        subject = self.chain[-1][1]
+        if subject.id is not None:
+            return ('id', subject.id)
+        if subject.classes:
+            return ('class', subject.classes[0])
+        if subject.tag is not None:
+            return ('tag', subject.tag)
+        return None
+
+    def matches(self, el):
+        if self.chain is None:
+            return self._fallback.match(el)
+        return self._match_from(el, len(self.chain) - 1)
+
+    def _match_from(self, el, index):
+        combinator, compound = self.chain[index]
+        if not compound.matches(el):
+            return False
+        if index == 0:
+            return True
+
+        # Combinator to the left of this compound decides how ancestors are searched
+        parent = el.parent
+        if combinator == '>':
+            return isinstance(parent, Tag) and parent.parent is not None and self._match_from(parent, index - 1)
+        while isinstance(parent, Tag) and parent.parent is not None:
+            if self._match_from(parent, index - 1):
+                return True
+            parent = parent.parent
+        return False
+
+
+class SelectorMatcher:
+    """First-match-wins selector lookup for several prioritized sections in one DOM walk"""
+
+    def __init__(self, sections):
+        self.sections = list(sections)
+        self._by_id = {}
+        self._by_class = {}
+        self._by_tag = {}
+        self._attribute_only = []
+        self._always = []
+
+        for section_index, name in enumerate(self.sections):
+            for priority, selector in enumerate(sections[name]):
+                compiled = CompiledSelector(selector)
+                rule = (section_index, priority, compiled.matches)
+                key = compiled.key
+                if key is None and compiled.needs_attributes:
+                    self._attribute_only.append(rule)
+                elif key is None:
+                    self._always.append(rule)
+                elif key[0] == 'id':
+                    self._by_id.setdefault(key[1], []).append(rule)
+                elif key[0] == 'class':
+                    self._by_class.setdefault(key[1], []).append(rule)
+                else:
+                    self._by_tag.setdefault(key[1], []).append(rule)
+
+    def _candidates(self, el):
+        rules = self._by_tag.get(el.name)
+        if rules:
+            yield from rules
+        attrs = el.attrs
+        if attrs:
+            el_id = attrs.get('id')
+            if el_id is not None:
+                yield from self._by_id.get(el_id, ())
+            classes = attrs.get('class')
+            if classes:
+                if isinstance(classes, str):
+                    classes = classes.split()
+                for cls in classes:
+                    yield from self._by_class.get(cls, ())
+            # Wildcard attribute selectors like [class*="price"] have to see every element with attributes
+            yield from self._attribute_only
+        yield from self._always
+
+    def first_matches(self, root):
+        """Return {section: first matching element or None} for a parsed document"""
+        num_sections = len(self.sections)
+        best_priority = [float('inf')] * num_sections
+        best_element = [None] * num_sections
+        settled = 0
+
+        for el in root.descendants:
+            if not isinstance(el, Tag):
+                continue
+            for section_index, priority, matches in self._candidates(el):
+                # Elements arrive in document order, so only a higher-priority
+                # selector can displace a match that has already been recorded
+                if priority < best_priority[section_index] and matches(el):
+                    best_priority[section_index] = priority
+                    best_element[section_index] = el
+                    if priority == 0:
+                        settled += 1
+            if settled == num_sections:
+                break
+
+        return dict(zip(self.sections, best_element))
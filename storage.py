@@ -0,0 +1,379 @@
+"""
+Storage backends for saved analyses.
+
+An analysis is the dict built by save_analysis_result(): summary fields, the
+ranked common_keywords list and url_details, where each URL record carries its
+full filtered_keywords token table (which save() also accepts pre-compressed
+with compress_json(), as bulk analyses keep them). The token tables are by far the largest
+part and are only needed when a single URL's keywords are inspected, so the
+SQLite backend keeps the three parts in separate tables and stores each token
+table as a zlib-compressed JSON blob. Views load just the part they render.
+
+JSONFileStore keeps the original one-file-per-analysis layout. SQLiteStore
+falls back to (and imports) those legacy files, and migrate_json_files()
+imports a whole data directory at once:
+
+    python storage.py migrate data
+"""
+
+import os
+import sys
+import json
+import glob
+import zlib
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+
+# Strategic tier of a ranked keyword, from the score boost rank_keywords() gave it
+KEYWORD_TIERS = {1000: 'universal', 500: 'majority', 200: 'gap', 150: 'quality', 50: 'general'}
+
+SUMMARY_FIELDS = ('analysis_id', 'timestamp', 'urls_processed', 'keyword_count', 'urls')
+KEYWORD_FIELDS = ('keyword', 'frequency', 'coverage', 'files_containing', 'strategic_score')
+KEYWORD_SORTS = ('strategic_score', 'frequency', 'coverage')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS analyses (
+    analysis_id TEXT PRIMARY KEY,
+    timestamp TEXT,
+    urls_processed INTEGER,
+    keyword_count INTEGER,
+    urls TEXT,
+    extra TEXT
+);
+CREATE TABLE IF NOT EXISTS keywords (
+    analysis_id TEXT NOT NULL,
+    rank INTEGER NOT NULL,
+    keyword TEXT NOT NULL,
+    frequency INTEGER,
+    coverage REAL,
+    files_containing INTEGER,
+    strategic_score INTEGER,
+    tier TEXT,
+    PRIMARY KEY (analysis_id, rank)
+);
+CREATE INDEX IF NOT EXISTS keywords_by_tier ON keywords (analysis_id, tier, rank);
+CREATE INDEX IF NOT EXISTS keywords_by_frequency ON keywords (analysis_id, frequency, rank);
+CREATE INDEX IF NOT EXISTS keywords_by_coverage ON keywords (analysis_id, coverage, rank);
+CREATE TABLE IF NOT EXISTS url_tokens (
+    analysis_id TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    url TEXT,
+    status TEXT,
+    details TEXT,
+    tokens BLOB,
+    PRIMARY KEY (analysis_id, position)
+);
+"""
+
+
+def keyword_tier(keyword_data):
+    """Name of the strategic tier a ranked keyword was placed in"""
+    return KEYWORD_TIERS.get(keyword_data['strategic_score'] - keyword_data['frequency'], 'general')
+
+
+def compress_json(value):
+    return zlib.compress(json.dumps(value, separators=(',', ':')).encode('utf-8'))
+
+
+def decompress_json(blob):
+    return json.loads(zlib.decompress(blob).decode('utf-8'))
+
+
+def _packed_tokens(tokens):
+    # Bulk analyses hand over token tables already compressed with compress_json()
+    return tokens if isinstance(tokens, bytes) else compress_json(tokens)
+
+
+def _restore_tokens(details, tokens):
+    # Put filtered_keywords back in its original place, right after total_tokens
+    restored = {}
+    for key, value in details.items():
+        restored[key] = value
+        if key == 'total_tokens':
+            restored['filtered_keywords'] = tokens
+    restored.setdefault('filtered_keywords', tokens)
+    return restored
+
+
+class AnalysisStore(ABC):
+    """Interface shared by the analysis storage backends
+
+    load() returns the complete analysis. load_summary() returns the same dict
+    without the per-URL filtered_keywords tables, and load_url_keywords()
+    returns one of those tables. Missing analyses raise FileNotFoundError.
+    """
+
+    @abstractmethod
+    def save(self, result):
+        """Store an analysis under result['analysis_id'], replacing any earlier one"""
+
+    @abstractmethod
+    def load(self, analysis_id):
+        """The complete analysis"""
+
+    def load_summary(self, analysis_id):
+        result = self.load(analysis_id)
+        result['url_details'] = [{k: v for k, v in data.items() if k != 'filtered_keywords'}
+                                 for data in result['url_details']]
+        return result
+
+    def load_url_keywords(self, analysis_id, position):
+        """filtered_keywords of the URL at position, or None if there is no such URL"""
+        url_details = self.load(analysis_id)['url_details']
+        if not 0 <= position < len(url_details):
+            return None
+        return url_details[position].get('filtered_keywords', {})
+
+    def query_keywords(self, analysis_id, sort='strategic_score', descending=True, tier=None,
+                       offset=0, limit=50, top_k=None):
+        """One page of ranked keywords as (total, rows)
+
+        Keywords are optionally restricted to a tier, ordered by sort (ties keep
+        their strategic rank) and cut to the first top_k before paging. Each row
+        carries its overall rank and tier; total counts the rows before paging.
+        """
+        rows = [dict(keyword_data, rank=rank, tier=keyword_tier(keyword_data))
+                for rank, keyword_data in enumerate(self.load_summary(analysis_id)['common_keywords'], start=1)]
+        if tier is not None:
+            rows = [row for row in rows if row['tier'] == tier]
+        if sort != 'strategic_score' or not descending:
+            rows.sort(key=lambda row: row['rank'])
+            rows.sort(key=lambda row: row[sort], reverse=descending)
+        if top_k is not None:
+            rows = rows[:top_k]
+        return len(rows), rows[offset:offset + limit]
+
+
+class JSONFileStore(AnalysisStore):
+    """Original layout: one indented JSON file per analysis in data_dir"""
+
+    def __init__(self, data_dir='data'):
+        self.data_dir = data_dir
+
+    def _path(self, analysis_id):
+        return os.path.join(self.data_dir, f'analysis_{analysis_id}.json')
+
+    def save(self, result):
+        os.makedirs(self.data_dir, exist_ok=True)
+        if any(isinstance(data.get('filtered_keywords'), bytes) for data in result.get('url_details', [])):
+            result = dict(result, url_details=[
+                dict(data, filtered_keywords=decompress_json(data['filtered_keywords']))
+                if isinstance(data.get('filtered_keywords'), bytes) else data
+                for data in result['url_details']
+            ])
+        with open(self._path(result['analysis_id']), 'w') as f:
+            json.dump(result, f, indent=2)
+
+    def load(self, analysis_id):
+        with open(self._path(analysis_id), 'r') as f:
+            return json.load(f)
+
+    def analysis_ids(self):
+        prefix, suffix = len('analysis_'), len('.json')
+        return sorted(os.path.basename(path)[prefix:-suffix]
+                      for path in glob.glob(os.path.join(self.data_dir, 'analysis_*.json')))
+
+
+class SQLiteStore(AnalysisStore):
+    """Analyses in SQLite: summary, ranked keywords and compressed per-URL token tables"""
+
+    def __init__(self, db_path='data/analyses.db', legacy_dir=None):
+        self.db_path = db_path
+        self.legacy = JSONFileStore(legacy_dir) if legacy_dir else None
+        self._initialized = set()
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def _connect(self):
+        # A short-lived connection per operation keeps the store safe to share between threads
+        path = os.path.abspath(self.db_path)
+        if path not in self._initialized:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        try:
+            if path not in self._initialized:
+                with self._lock:
+                    conn.execute('PRAGMA journal_mode=WAL')
+                    conn.executescript(SCHEMA)
+                    self._initialized.add(path)
+            yield conn
+            conn.commit()
+        finally:
+            conn.close()
+
+    def save(self, result):
+        analysis_id = result['analysis_id']
+        # Older JSON files may lack some summary fields; derive them where possible
+        common_keywords = result.get('common_keywords', [])
+        url_details = result.get('url_details', [])
+        extra = {k: v for k, v in result.items()
+                 if k not in SUMMARY_FIELDS and k not in ('common_keywords', 'url_details')}
+
+        keyword_rows = [
+            (analysis_id, rank, kw['keyword'], kw['frequency'], kw['coverage'],
+             kw.get('files_containing'), kw['strategic_score'], keyword_tier(kw))
+            for rank, kw in enumerate(common_keywords, start=1)
+        ]
+        url_rows = [
+            (analysis_id, position, data.get('url'), data.get('status'),
+             json.dumps({k: v for k, v in data.items() if k != 'filtered_keywords'}),
+             _packed_tokens(data.get('filtered_keywords', {})))
+            for position, data in enumerate(url_details)
+        ]
+
+        with self._connect() as conn:
+            for table in ('analyses', 'keywords', 'url_tokens'):
+                conn.execute(f'DELETE FROM {table} WHERE analysis_id = ?', (analysis_id,))
+            conn.execute(
+                'INSERT INTO analyses (analysis_id, timestamp, urls_processed, keyword_count, urls, extra) '
+                'VALUES (?, ?, ?, ?, ?, ?)',
+                (analysis_id, result.get('timestamp'), result.get('urls_processed', len(url_details)),
+                 result.get('keyword_count', len(common_keywords)),
+                 json.dumps(result.get('urls', [data.get('url') for data in url_details])), json.dumps(extra))
+            )
+            conn.executemany('INSERT INTO keywords VALUES (?, ?, ?, ?, ?, ?, ?, ?)', keyword_rows)
+            conn.executemany('INSERT INTO url_tokens VALUES (?, ?, ?, ?, ?, ?)', url_rows)
+
+    def _import_legacy(self, analysis_id):
+        # Older analyses still live in JSON files; move each one over the first time it is read
+        if self.legacy is None:
+            return False
+        try:
+            self.save(self.legacy.load(analysis_id))
+        except FileNotFoundError:
+            return False
+        return True
+
+    def _load(self, analysis_id, with_tokens):
+        with self._connect() as conn:
+            summary = conn.execute(
+                'SELECT timestamp, urls_processed, keyword_count, urls, extra FROM analyses WHERE analysis_id = ?',
+                (analysis_id,)
+            ).fetchone()
+            if summary is None:
+                return None
+
+            keywords = conn.execute(
+                'SELECT keyword, frequency, coverage, files_containing, strategic_score '
+                'FROM keywords WHERE analysis_id = ? ORDER BY rank', (analysis_id,)
+            ).fetchall()
+            columns = 'details, tokens' if with_tokens else 'details'
+            url_rows = conn.execute(
+                f'SELECT {columns} FROM url_tokens WHERE analysis_id = ? ORDER BY position', (analysis_id,)
+            ).fetchall()
+
+        timestamp, urls_processed, keyword_count, urls, extra = summary
+        url_details = []
+        for row in url_rows:
+            data = json.loads(row[0])
+            if with_tokens:
+                data = _restore_tokens(data, decompress_json(row[1]))
+            url_details.append(data)
+
+        result = {
+            'analysis_id': analysis_id,
+            'timestamp': timestamp,
+            'urls_processed': urls_processed,
+            'urls': json.loads(urls),
+            'common_keywords': [dict(zip(KEYWORD_FIELDS, row)) for row in keywords],
+            'keyword_count': keyword_count,
+            'url_details': url_details
+        }
+        result.update(json.loads(extra))
+        return result
+
+    def load(self, analysis_id):
+        result = self._load(analysis_id, with_tokens=True)
+        if result is None and self._import_legacy(analysis_id):
+            result = self._load(analysis_id, with_tokens=True)
+        if result is None:
+            raise FileNotFoundError(analysis_id)
+        return result
+
+    def load_summary(self, analysis_id):
+        result = self._load(analysis_id, with_tokens=False)
+        if result is None and self._import_legacy(analysis_id):
+            result = self._load(analysis_id, with_tokens=False)
+        if result is None:
+            raise FileNotFoundError(analysis_id)
+        return result
+
+    def _exists(self, conn, analysis_id):
+        return conn.execute('SELECT 1 FROM analyses WHERE analysis_id = ?', (analysis_id,)).fetchone() is not None
+
+    def query_keywords(self, analysis_id, sort='strategic_score', descending=True, tier=None,
+                       offset=0, limit=50, top_k=None):
+        if sort not in KEYWORD_SORTS:
+            raise ValueError(f'Unknown keyword sort: {sort}')
+
+        where = 'analysis_id = ?' + (' AND tier = ?' if tier is not None else '')
+        params = (analysis_id, tier) if tier is not None else (analysis_id,)
+        # rank already follows strategic_score (ties broken alphabetically), so it doubles as the tie-breaker
+        direction = 'DESC' if descending else 'ASC'
+        order = 'rank' if sort == 'strategic_score' and descending else f'{sort} {direction}, rank'
+        top_k_limit = -1 if top_k is None else top_k
+
+        with self._connect() as conn:
+            if not self._exists(conn, analysis_id):
+                rows = None
+            else:
+                total = conn.execute(
+                    f'SELECT COUNT(*) FROM (SELECT 1 FROM keywords WHERE {where} LIMIT ?)', params + (top_k_limit,)
+                ).fetchone()[0]
+                rows = conn.execute(
+                    f'SELECT rank, tier, {", ".join(KEYWORD_FIELDS)} FROM keywords WHERE {where} ORDER BY {order} '
+                    'LIMIT ? OFFSET ?',
+                    params + (max(0, min(limit, total - offset)), offset)
+                ).fetchall()
+
+        if rows is None:
+            if self._import_legacy(analysis_id):
+                return self.query_keywords(analysis_id, sort, descending, tier, offset, limit, top_k)
+            raise FileNotFoundError(analysis_id)
+
+        return total, [dict(zip(KEYWORD_FIELDS, row[2:]), rank=row[0], tier=row[1]) for row in rows]
+
+    def load_url_keywords(self, analysis_id, position):
+        with self._connect() as conn:
+            row = conn.execute(
+                'SELECT tokens FROM url_tokens WHERE analysis_id = ? AND position = ?', (analysis_id, position)
+            ).fetchone()
+            exists = row is not None or self._exists(conn, analysis_id)
+
+        if not exists:
+            if self._import_legacy(analysis_id):
+                return self.load_url_keywords(analysis_id, position)
+            raise FileNotFoundError(analysis_id)
+        return decompress_json(row[0]) if row is not None else None
+
+
+def create_store(backend='sqlite', data_dir='data'):
+    """Build the configured analysis store ('sqlite' or 'json') rooted at data_dir"""
+    if backend == 'json':
+        return JSONFileStore(data_dir)
+    if backend == 'sqlite':
+        return SQLiteStore(os.path.join(data_dir, 'analyses.db'), legacy_dir=data_dir)
+    raise ValueError(f'Unknown analysis store backend: {backend}')
+
+
+def migrate_json_files(data_dir, store, remove=False):
+    """Import every data_dir/analysis_*.json file into store, returning the migrated IDs"""
+    legacy = JSONFileStore(data_dir)
+    migrated = []
+    for analysis_id in legacy.analysis_ids():
+        store.save(legacy.load(analysis_id))
+        migrated.append(analysis_id)
+        if remove:
+            os.remove(legacy._path(analysis_id))
+    return migrated
+
+
+if __name__ == '__main__':
+    if len(sys.argv) < 2 or sys.argv[1] != 'migrate':
+        print('Usage: python storage.py migrate [data_dir] [--remove]')
+        sys.exit(1)
+    data_dir = next((arg for arg in sys.argv[2:] if not arg.startswith('--')), 'data')
+    migrated = migrate_json_files(data_dir, create_store('sqlite', data_dir), remove='--remove' in sys.argv)
+    print(f'Migrated {len(migrated)} analyses into {os.path.join(data_dir, "analyses.db")}')
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Tests for the application factory and lazy startup
+"""
+
+import os
+import subprocess
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import app
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+
+def test_import_is_lazy(tmp_path):
+    # A fresh interpreter without an API key: importing must not build the OpenAI client or create data/
+    probe = ("import sys; sys.path.insert(0, %r); import app; "
+             "print('openai' in sys.modules, app.openai_client is None)" % ROOT)
+    env = {key: value for key, value in os.environ.items() if key != 'OPENAI_API_KEY'}
+    output = subprocess.run([sys.executable, '-c', probe], cwd=tmp_path, env=env,
+                            capture_output=True, text=True, check=True).stdout
+
+    assert output.split() == ['False', 'True']
+    assert not os.path.exists(tmp_path / 'data')
+
+
+def test_create_app_applies_config_overrides():
+    flask_app = app.create_app({'CRAWL_MAX_WORKERS': 1, 'KEYWORDS_API_MAX_PER_PAGE': 10})
+
+    assert 'results' in flask_app.view_functions
+    with flask_app.app_context():
+        assert app.get_setting('CRAWL_MAX_WORKERS') == 1
+    assert app.get_setting('CRAWL_MAX_WORKERS') == app.app.config['CRAWL_MAX_WORKERS']
+
+    response = flask_app.test_client().get('/api/analyses/any/keywords?per_page=20')
+    assert response.status_code == 400
+
+
+def test_each_app_has_its_own_services():
+    default_store = app.analysis_store
+    flask_app = app.create_app({'HTTP_CACHE_ENABLED': False})
+
+    assert app.analysis_store is default_store and app.page_cache is not None
+    with flask_app.app_context():
+        assert app.get_service('analysis_store') is flask_app.extensions['services']['analysis_store']
+        assert app.get_service('analysis_store') is not default_store
+        assert app.get_service('page_cache') is None
+        # Worker threads see the app that started them
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            assert executor.submit(app.in_app_context(lambda: app.get_service('page_cache'))).result() is None
+    assert app.get_service('analysis_store') is default_store
+
+
+def test_invalid_field_weights_are_a_clear_error(monkeypatch):
+    monkeypatch.setenv('FIELD_WEIGHTS', '{"product_title": 4')
+    with pytest.raises(ValueError, match='FIELD_WEIGHTS is not valid JSON'):
+        app.create_app()
+    monkeypatch.setenv('FIELD_WEIGHTS', '{"product_title": "high"}')
+    with pytest.raises(ValueError, match='numeric section weights'):
+        app.create_app()
+
+    monkeypatch.setenv('FIELD_WEIGHTS', '{"reviews": 0}')
+    assert app.create_app().config['FIELD_WEIGHTS'] == dict(app.DEFAULT_FIELD_WEIGHTS, reviews=0)
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Tests for the bulk SEO analysis runner, using a local stub of the OpenAI client
+"""
+
+import io
+import json
+import os
+from types import SimpleNamespace
+
+import pytest
+
+import app
+import batch_seo
+from llm_cache import LLMCache
+
+MARKDOWN_TABLE = """| Keyword/Phrase | Search Intent | SEO Opportunity |
+|----------------|---------------|-----------------|
+| trail running shoe | Commercial | High |"""
+
+
+class RateLimited(Exception):
+    status_code = 429
+
+    def __init__(self):
+        super().__init__('Rate limit reached')
+        self.response = SimpleNamespace(headers={'retry-after': '0'})
+
+
+class FlakyOpenAI:
+    """Stand-in for openai.OpenAI() that answers 429 for the first `failures` requests"""
+
+    def __init__(self, failures=0):
+        self.calls = 0
+        self.failures = failures
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    def _create(self, **kwargs):
+        self.calls += 1
+        if self.calls <= self.failures:
+            raise RateLimited()
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=MARKDOWN_TABLE))])
+
+
+@pytest.fixture
+def analyses(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    os.makedirs('data')
+    for analysis_id in ('a1', 'a2', 'a3'):
+        with open(f'data/analysis_{analysis_id}.json', 'w') as f:
+            json.dump({'analysis_id': analysis_id, 'urls': ['https://www.trailshop.com/p'],
+                       'url_details': [{'status': 'success', 'title': f'Shoe {analysis_id}'}],
+                       'common_keywords': [{'keyword': 'trail running shoe', 'frequency': 9,
+                                            'coverage': 1.0, 'strategic_score': 1009}]}, f)
+    monkeypatch.setattr(app, 'llm_cache', LLMCache(str(tmp_path / 'llm_cache')))
+
+
+def test_rate_limited_requests_are_retried(analyses):
+    client = FlakyOpenAI(failures=2)
+    analyzer = batch_seo.BatchSEOAnalyzer(requests_per_minute=6000, client=client)
+
+    record = analyzer.analyze('a1')
+
+    assert record['status'] == 'ok'
+    assert record['attempts'] == 3
+    assert record['product_title'] == 'Shoe a1'
+    assert '<table' in record['html']
+
+
+def test_run_writes_jsonl_and_reuses_cache(analyses):
+    client = FlakyOpenAI()
+    analyzer = batch_seo.BatchSEOAnalyzer(requests_per_minute=6000, client=client)
+    output = io.StringIO()
+
+    summary = analyzer.run([('a1', 'Trail Shoe'), ('a2', 'Trail Shoe'), ('missing', '')], output, concurrency=1)
+
+    records = {r['analysis_id']: r for r in map(json.loads, output.getvalue().splitlines())}
+    assert summary == {'ok': 2, 'error': 1, 'cached': 1}
+    assert records['missing']['error'] == 'Analysis not found'
+    # a1 and a2 share keywords and title, so only one of them reaches the API
+    assert client.calls == 1
+
+
+def test_no_cache_neither_reads_nor_fills_the_cache(analyses):
+    client = FlakyOpenAI()
+
+    batch_seo.BatchSEOAnalyzer(requests_per_minute=6000, client=client, use_cache=False).analyze('a1')
+    record = batch_seo.BatchSEOAnalyzer(requests_per_minute=6000, client=client).analyze('a1')
+
+    assert client.calls == 2 and not record['cached']
+
+
+def test_token_bucket_throttles_past_capacity():
+    bucket = batch_seo.TokenBucket(rate=100, capacity=2)
+    bucket.acquire()
+    bucket.acquire()
+    started = batch_seo.time.monotonic()
+    bucket.acquire()
+    assert batch_seo.time.monotonic() - started >= 0.005
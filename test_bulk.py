@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Tests for sitemap discovery and the streaming bulk analysis pipeline
+"""
+
+import gzip
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import app
+from scheduler import HostScheduler
+from sitemaps import discover_sitemap_urls, parse_sitemap, parse_url_list
+from storage import SQLiteStore
+
+NS = 'xmlns="http://www.sitemaps.org/schemas/sitemap/0.9"'
+
+
+def urlset(urls):
+    return (f'<?xml version="1.0" encoding="UTF-8"?><urlset {NS}>'
+            + ''.join(f'<url><loc>{url}</loc><lastmod>2024-01-01</lastmod></url>' for url in urls)
+            + '</urlset>').encode('utf-8')
+
+
+class SiteHandler(BaseHTTPRequestHandler):
+    base_url = ''
+
+    def do_GET(self):
+        if self.path == '/sitemap.xml':
+            body = (f'<sitemapindex {NS}><sitemap><loc>{self.base_url}/shoes.xml.gz</loc></sitemap>'
+                    f'<sitemap><loc>{self.base_url}/blog.xml</loc></sitemap></sitemapindex>').encode('utf-8')
+        elif self.path == '/shoes.xml.gz':
+            body = gzip.compress(urlset([f'{self.base_url}/shoes/{i}' for i in range(4)]))
+        elif self.path == '/blog.xml':
+            body = urlset([f'{self.base_url}/blog/post'])
+        elif self.path.startswith('/shoes/'):
+            body = (f'<html><head><title>Trail Running Shoe {self.path}</title></head><body><main>'
+                    '<h1>Waterproof trail running shoe</h1><div class="product-description"><p>Breathable mesh upper '
+                    'with a cushioned midsole. Waterproof trail running shoe for wet weather.</p>'
+                    f'<p>Model {self.path[-1]} ships in {len(self.path) * 3} colourways from warehouse '
+                    f'{self.path[-1]}.</p></div></main></body></html>').encode('utf-8')
+        else:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def base_url():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), SiteHandler)
+    SiteHandler.base_url = f'http://127.0.0.1:{server.server_port}'
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield SiteHandler.base_url
+    server.shutdown()
+
+
+def test_sitemap_parsing_and_url_lists():
+    pages, sitemaps = parse_sitemap(gzip.compress(urlset(['https://a.example/1', 'https://a.example/2'])))
+    assert pages == ['https://a.example/1', 'https://a.example/2'] and sitemaps == []
+
+    fetched = {'index': f'<sitemapindex {NS}><sitemap><loc>child</loc></sitemap></sitemapindex>'.encode(),
+               'child': urlset(['https://a.example/shoes/1', 'https://a.example/bags/1', 'https://a.example/shoes/2'])}
+    assert discover_sitemap_urls('index', fetched.get, include='/shoes/') == ['https://a.example/shoes/1',
+                                                                              'https://a.example/shoes/2']
+
+    text = '# competitors\nhttps://a.example/1\n\nhttps://a.example/1\nhttps://b.example/2,Shoe B\nnot a url\n'
+    assert parse_url_list(text) == ['https://a.example/1', 'https://b.example/2']
+    assert parse_url_list(text, limit=1) == ['https://a.example/1']
+
+
+def test_oversized_gzip_sitemap_is_rejected():
+    bomb = gzip.compress(urlset(['https://a.example/1']) + b' ' * 2048)
+    with pytest.raises(ValueError):
+        parse_sitemap(bomb, max_bytes=1024)
+    assert parse_sitemap(bomb, max_bytes=4096)[0] == ['https://a.example/1']
+
+
+def test_incremental_aggregation_matches_batch_ranking():
+    documents = [{'trail shoe': 3, 'mesh': 1}, {'trail shoe': 2, 'waterproof': 4}, {'trail shoe': 1, 'mesh': 2}]
+    aggregator = app.KeywordAggregator()
+    for document in documents:
+        aggregator.add(document)
+
+    assert aggregator.num_files == 3
+    assert aggregator.rank() == app.find_common_keywords(documents, backend='python')
+
+
+def test_bulk_job_reads_sitemap_and_saves_analysis(base_url, tmp_path, monkeypatch):
+    store = SQLiteStore(str(tmp_path / 'analyses.db'))
+    monkeypatch.setattr(app, 'analysis_store', store)
+    monkeypatch.setattr(app, 'page_cache', None)
+    monkeypatch.setattr(app, 'fetch_scheduler', HostScheduler(min_delay=0))
+
+    class Progress:
+        def __init__(self):
+            self.data = {}
+            self.urls = []
+
+        def update(self, **fields):
+            self.data.update(fields)
+
+        def set_urls(self, urls):
+            self.urls = list(urls)
+
+        def update_url(self, index, state, error=None):
+            pass
+
+    progress = Progress()
+    with app.app.app_context():
+        app.bulk_job(progress, sitemap_url=f'{base_url}/sitemap.xml', include='/shoes/', limit=3)
+
+    assert progress.urls == [f'{base_url}/shoes/{i}' for i in range(3)]
+    assert progress.data['state'] == 'done'
+    result = store.load(progress.data['analysis_id'])
+    assert result['urls'] == progress.urls
+    assert result['url_details'][0]['filtered_keywords']['waterproof trail running shoe'] >= 1
+    assert result['common_keywords'][0]['files_containing'] == 3
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Tests for the offline batch analysis command line
+"""
+
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import app
+import cli
+from scheduler import HostScheduler
+from storage import SQLiteStore
+
+
+class PDPHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if not self.path.startswith('/pdp/'):
+            self.send_error(404)
+            return
+        body = (f'<html><head><title>Trail Shoe {self.path}</title>'
+                '<meta name="description" content="Waterproof trail running shoe"></head><body><main>'
+                '<h1>Waterproof trail running shoe</h1><div class="product-description"><p>Cushioned midsole and '
+                'breathable mesh upper. A waterproof trail running shoe for wet weather.</p>'
+                f'<p>Model {self.path} ships in {len(self.path) * 3} colourways from warehouse '
+                f'{self.path[-1]}.</p></div></main></body></html>').encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def base_url(tmp_path, monkeypatch):
+    monkeypatch.setattr(app, 'analysis_store', SQLiteStore(str(tmp_path / 'analyses.db')))
+    monkeypatch.setattr(app, 'page_cache', None)
+    monkeypatch.setattr(app, 'fetch_scheduler', HostScheduler(min_delay=0, respect_robots=False))
+    server = ThreadingHTTPServer(('127.0.0.1', 0), PDPHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f'http://127.0.0.1:{server.server_port}'
+    server.shutdown()
+
+
+def test_read_groups_from_csv_and_jsonl(tmp_path):
+    csv_path = tmp_path / 'groups.csv'
+    csv_path.write_text('group_id,url\nshoes,https://a.example/1\nbags,https://b.example/1\nshoes,https://a.example/2\n')
+    jsonl_path = tmp_path / 'groups.jsonl'
+    jsonl_path.write_text('{"group_id": "shoes", "urls": ["https://a.example/1"]}\n\n{"urls": ["https://b.example/1"]}\n')
+
+    assert cli.read_groups(str(csv_path)) == [('shoes', ['https://a.example/1', 'https://a.example/2']),
+                                              ('bags', ['https://b.example/1'])]
+    assert cli.read_groups(str(jsonl_path)) == [('shoes', ['https://a.example/1']), ('3', ['https://b.example/1'])]
+
+
+def test_cli_analyzes_groups_and_resumes(base_url, tmp_path):
+    groups = tmp_path / 'groups.jsonl'
+    groups.write_text(
+        json.dumps({'group_id': 'shoes', 'urls': [f'{base_url}/pdp/1', f'{base_url}/pdp/2']}) + '\n'
+        + json.dumps({'group_id': 'broken', 'urls': [f'{base_url}/pdp/3', f'{base_url}/missing']}) + '\n'
+    )
+    output = tmp_path / 'out.jsonl'
+    output.write_text('{"group_id": "partial"')  # Cut short by an interrupted run
+
+    assert cli.main([str(groups), '-o', str(output), '--processes', '2']) == 1
+    records = {record['group_id']: record for record in map(json.loads, output.read_text().splitlines()[1:])}
+
+    assert records['shoes']['status'] == 'done'
+    assert 'waterproof trail running shoe' in records['shoes']['top_keywords']
+    assert app.analysis_store.load(records['shoes']['analysis_id'])['urls_processed'] == 2
+    assert records['broken']['status'] == 'failed' and records['broken']['urls_crawled'] == 1
+
+    # Resuming only retries the failed group
+    cli.main([str(groups), '-o', str(output), '--processes', '1'])
+    group_ids = [json.loads(line)['group_id'] for line in output.read_text().splitlines()[1:]]
+    assert sorted(group_ids) == ['broken', 'broken', 'shoes']
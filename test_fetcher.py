@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+Tests for pooled fetching, the conditional-GET page cache and streamed downloads
+"""
+
+import gzip
+import os
+import time
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+
+import fetcher
+from fetcher import PageCache, close_sessions, fetch_page, get_session
+
+PAGE = b'<html><head><title>Stub PDP</title></head><body><h1>Stub</h1></body></html>'
+
+
+class ETagHandler(BaseHTTPRequestHandler):
+    requests_seen = []
+
+    def do_GET(self):
+        ETagHandler.requests_seen.append(dict(self.headers))
+        if self.headers.get('If-None-Match') == '"v1"':
+            self.send_response(304)
+            self.send_header('ETag', '"v1"')
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html')
+        self.send_header('Content-Length', str(len(PAGE)))
+        self.send_header('ETag', '"v1"')
+        self.send_header('Last-Modified', 'Mon, 01 Jan 2024 00:00:00 GMT')
+        self.end_headers()
+        self.wfile.write(PAGE)
+
+    def log_message(self, *args):
+        pass
+
+
+LONG_PAGE = b'<html><body><main>' + b'<p>trail running shoe</p>' * 4000 + b'</main><footer>' + b'x' * 100000 + b'</footer></body></html>'
+
+
+class GzipHandler(BaseHTTPRequestHandler):
+    accept_encoding = None
+
+    def do_GET(self):
+        GzipHandler.accept_encoding = self.headers.get('Accept-Encoding')
+        body = gzip.compress(LONG_PAGE)
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html')
+        self.send_header('Content-Encoding', 'gzip')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('ETag', '"v1"')
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class CookieHandler(BaseHTTPRequestHandler):
+    cookies_seen = []
+
+    def do_GET(self):
+        CookieHandler.cookies_seen.append(self.headers.get('Cookie'))
+        self.send_response(200)
+        self.send_header('Content-Length', str(len(PAGE)))
+        self.send_header('Set-Cookie', 'currency=EUR; Path=/')
+        self.end_headers()
+        self.wfile.write(PAGE)
+
+    def log_message(self, *args):
+        pass
+
+
+def serve(handler=ETagHandler):
+    server = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def test_conditional_get_reuses_cached_body(tmp_path):
+    server = serve()
+    url = f'http://127.0.0.1:{server.server_port}/pdp'
+    cache = PageCache(str(tmp_path))
+    ETagHandler.requests_seen = []
+    try:
+        first = fetch_page(url, cache=cache)
+        second = fetch_page(url, cache=cache)
+    finally:
+        server.shutdown()
+
+    assert first.content == PAGE and not first.from_cache
+    assert second.content == PAGE and second.from_cache
+    assert ETagHandler.requests_seen[1]['If-None-Match'] == '"v1"'
+    assert ETagHandler.requests_seen[1]['If-Modified-Since'] == 'Mon, 01 Jan 2024 00:00:00 GMT'
+
+
+def test_sessions_are_shared_per_host():
+    assert get_session('https://shop.example.com/a') is get_session('https://SHOP.example.com/b')
+    assert get_session('https://shop.example.com/a') is not get_session('https://other.example.com/a')
+
+
+def test_least_recently_used_sessions_are_closed(monkeypatch):
+    close_sessions()
+    monkeypatch.setattr(fetcher, 'MAX_SESSIONS', 2)
+    first = get_session('https://a.example.com/')
+    get_session('https://b.example.com/')
+    get_session('https://a.example.com/')
+    get_session('https://c.example.com/')
+
+    assert list(fetcher._sessions) == ['a.example.com', 'c.example.com']
+    assert get_session('https://a.example.com/') is first
+    close_sessions()
+
+
+def test_cookies_are_not_sent_on_later_fetches():
+    server = serve(CookieHandler)
+    url = f'http://127.0.0.1:{server.server_port}/pdp'
+    CookieHandler.cookies_seen = []
+    try:
+        fetch_page(url)
+        fetch_page(url)
+    finally:
+        server.shutdown()
+
+    assert CookieHandler.cookies_seen == [None, None]
+
+
+def test_compressed_body_is_decoded_and_cached(tmp_path):
+    server = serve(GzipHandler)
+    cache = PageCache(str(tmp_path))
+    url = f'http://127.0.0.1:{server.server_port}/pdp'
+    try:
+        result = fetch_page(url, cache=cache)
+    finally:
+        server.shutdown()
+
+    assert 'gzip' in GzipHandler.accept_encoding
+    assert result.content == LONG_PAGE and result.truncated is None
+    assert cache.get(url)[1] == LONG_PAGE
+
+
+def test_download_stops_at_byte_cap_and_is_not_cached(tmp_path):
+    server = serve(GzipHandler)
+    cache = PageCache(str(tmp_path))
+    url = f'http://127.0.0.1:{server.server_port}/pdp'
+    try:
+        result = fetch_page(url, cache=cache, max_bytes=1000)
+    finally:
+        server.shutdown()
+
+    assert result.content == LONG_PAGE[:1000]
+    assert result.truncated == 'max_bytes'
+    assert cache.get(url) is None
+
+
+def test_download_stops_after_marker():
+    server = serve(GzipHandler)
+    try:
+        result = fetch_page(f'http://127.0.0.1:{server.server_port}/pdp', stop_marker='</MAIN>')
+    finally:
+        server.shutdown()
+
+    assert result.truncated == 'stop_marker'
+    assert b'</main>' in result.content
+    assert len(result.content) < len(LONG_PAGE)
+
+
+def test_cache_evicts_least_recently_stored_pages(tmp_path):
+    cache = PageCache(str(tmp_path), max_bytes=250)
+    response = SimpleNamespace(headers={'ETag': '"v1"'})
+    now = time.time()
+    for age, name in ((20, 'a'), (10, 'b')):
+        cache.put(f'https://shop.example/{name}', response, b'x' * 100)
+        meta_path, _ = cache._paths(f'https://shop.example/{name}')
+        os.utime(meta_path, (now - age, now - age))
+
+    cache.put('https://shop.example/c', response, b'x' * 100)
+
+    assert cache.get('https://shop.example/a') is None
+    assert cache.get('https://shop.example/b') is not None and cache.get('https://shop.example/c') is not None
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Tests for near-duplicate page detection
+"""
+
+import pickle
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import app
+from fingerprint import DuplicateIndex, hamming_distance, simhash
+from scheduler import HostScheduler
+from storage import SQLiteStore
+
+COPY = ('This waterproof trail running shoe pairs a breathable mesh upper with a cushioned midsole and a '
+        'grippy outsole for wet rocky paths. The gusseted tongue keeps grit out, the toe cap protects against '
+        'roots and stones, and the removable insole can be swapped for orthotics. Sizes run true to length '
+        'with a roomy toe box for long days on the trail.')
+OTHER_COPY = ('A lightweight insulated jacket for cold alpine mornings, packing down into its own chest pocket. '
+              'Recycled synthetic fill stays warm when damp, the hood fits over a helmet and the hem cinches '
+              'against wind. Two zipped hand pockets and elastic cuffs finish a layer built for belays and '
+              'summit pushes alike.')
+
+PAGE = ('<html><head><title>{title}</title></head><body><main><h1>{title}</h1>'
+        '<div class="product-description"><p>{copy}</p></div></main></body></html>')
+
+
+class ShopHandler(BaseHTTPRequestHandler):
+    pages = {
+        '/shoe': PAGE.format(title='Trail Shoe', copy=COPY),
+        # The same product under another URL, naming the selected colour
+        '/shoe?colour=red': PAGE.format(title='Trail Shoe', copy=COPY + ' Colour: red.'),
+        '/jacket': PAGE.format(title='Alpine Jacket', copy=OTHER_COPY)
+    }
+    delays = {}
+
+    def do_GET(self):
+        time.sleep(self.delays.get(self.path, 0))
+        body = self.pages.get(self.path)
+        if body is None:
+            self.send_error(404)
+            return
+        body = body.encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def base_url(tmp_path, monkeypatch):
+    monkeypatch.setattr(app, 'analysis_store', SQLiteStore(str(tmp_path / 'analyses.db')))
+    monkeypatch.setattr(app, 'page_cache', None)
+    monkeypatch.setattr(app, 'fetch_scheduler', HostScheduler(min_delay=0, respect_robots=False))
+    server = ThreadingHTTPServer(('127.0.0.1', 0), ShopHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f'http://127.0.0.1:{server.server_port}'
+    server.shutdown()
+
+
+def test_simhash_of_near_duplicates_is_close():
+    near = COPY + ' Colour: red.'
+
+    assert simhash(COPY) == simhash(COPY.upper())
+    assert hamming_distance(simhash(COPY), simhash(near)) <= 3 < hamming_distance(simhash(COPY), simhash(OTHER_COPY))
+    assert simhash('too short') is None
+
+
+def test_duplicate_index_finds_earliest_page():
+    index = DuplicateIndex(max_distance=3)
+    fingerprint = simhash(COPY)
+
+    # Added out of input order, as concurrent crawls finish
+    index.add('b', fingerprint ^ 0b101, position=1)
+    index.add('c', simhash(OTHER_COPY), position=2)
+    index.add('a', fingerprint, position=0)
+    index.add('d', None, position=3)
+
+    assert index.find(fingerprint) == 'a'
+    assert index.find(fingerprint, before=0) is None
+    assert index.find(fingerprint ^ (0b1111 << 20)) is None
+    assert index.find(simhash(OTHER_COPY), before=2) is None
+
+    snapshot = pickle.loads(pickle.dumps(index.snapshot()))
+    assert snapshot.find(fingerprint ^ (1 << 63), before=2) == 'a'
+    assert snapshot.find(simhash(OTHER_COPY)) == 'c'
+
+
+def test_near_duplicate_pages_are_not_counted(base_url, monkeypatch):
+    # The first shoe URL answers last, but is still the one kept
+    monkeypatch.setattr(ShopHandler, 'delays', {'/shoe': 0.3})
+    urls = [f'{base_url}/shoe', f'{base_url}/shoe?colour=red', f'{base_url}/jacket']
+    with app.app.app_context():
+        analysis_id, result, message = app.run_crawl_analysis(urls)
+
+    details = result['url_details']
+    assert [data['status'] for data in details] == ['success', 'duplicate', 'success']
+    assert details[1]['duplicate_of'] == urls[0] and details[1]['filtered_keywords'] == {}
+    assert 'Near-duplicate URLs skipped' in message
+    assert app.analysis_store.load(analysis_id)['url_details'] == details
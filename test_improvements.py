@@ -7,7 +7,8 @@ import sys
 import os
 sys.path.append('.')
 
-from app import clean_html, tokenize_text, filter_ecommerce_keywords, find_common_keywords
+import app
+from app import clean_html, tokenize_text, tokenize_fields, find_common_keywords
 
 def test_text_processing():
     """Test the improved text processing"""
@@ -39,28 +40,55 @@ def test_text_processing():
     for i, token in enumerate(sorted(tokens)[:10]):
         print(f"     {i+1}. {token}")
     
-    # Test keyword filtering
-    print("\n3. Testing keyword filtering...")
-    filtered = filter_ecommerce_keywords(tokens)
+    # Test field-weighted keyword extraction (stop words and noise are filtered during tokenization)
+    print("\n3. Testing field-weighted keywords...")
+    filtered = tokenize_fields({'product_title': 'Best Laptop Guide', 'main_content': clean_text})
     print(f"   Filtered keywords: {len(filtered)}")
     print("   Sample filtered keywords:")
     for i, keyword in enumerate(sorted(filtered)[:10]):
-        print(f"     {i+1}. {keyword}")
+        print(f"     {i+1}. {keyword} (weight: {filtered[keyword]})")
+    assert filtered['laptop'] > tokens['laptop']
     
     # Test with multiple files
     print("\n4. Testing common keyword finding...")
-    file1_tokens = {"best", "laptop", "quality", "price", "buy", "shipping"}
-    file2_tokens = {"best", "laptop", "quality", "performance", "buy", "payment"}
-    file3_tokens = {"best", "laptop", "quality", "durable", "buy", "secure"}
+    file1_tokens = {"best": 2, "laptop": 3, "quality": 1, "price": 2, "buy": 1, "shipping": 1}
+    file2_tokens = {"best": 1, "laptop": 2, "quality": 2, "performance": 1, "buy": 1, "payment": 1}
+    file3_tokens = {"best": 1, "laptop": 2, "quality": 1, "durable": 1, "buy": 2, "secure": 1}
     
     common = find_common_keywords([file1_tokens, file2_tokens, file3_tokens])
     print(f"   Common keywords: {len(common)}")
     print("   Ranked results:")
-    for i, (keyword, freq) in enumerate(common):
-        print(f"     {i+1}. {keyword} (frequency: {freq})")
+    for i, keyword_data in enumerate(common):
+        print(f"     {i+1}. {keyword_data['keyword']} (frequency: {keyword_data['frequency']})")
+    assert common[0]['keyword'] == 'laptop'
     
     print("\n" + "=" * 50)
     print("Test completed!")
 
+def test_field_weights_scale_section_counts():
+    """Title words count 3x and description words 2x, as before per-field tokenizing"""
+    with app.app.app_context():
+        tokens = tokenize_fields({'product_title': 'Trail Shoe',
+                                  'description': 'Waterproof trail shoe with a cushioned midsole',
+                                  'main_content': 'Free returns on every trail order'})
+    
+    assert tokens['midsole'] == 2
+    assert tokens['returns'] == 1
+    # 'trail' appears once in each section: 3 + 2 + 1
+    assert tokens['trail'] == 6
+    assert tokens['trail shoe'] == 3 + 2
+    # Phrases never span two sections
+    assert 'shoe waterproof' not in tokens
+
+def test_field_weight_overrides():
+    """Weights passed in (or set through FIELD_WEIGHTS) replace the defaults; zero drops a section"""
+    weights = dict(app.DEFAULT_FIELD_WEIGHTS, product_title=5, reviews=0)
+    tokens = tokenize_fields({'product_title': 'Trail Shoe', 'description': 'Cushioned midsole',
+                              'reviews': 'Comfortable for long runs'}, weights)
+    
+    assert tokens['trail'] == 5
+    assert tokens['midsole'] == 2
+    assert 'comfortable' not in tokens
+
 if __name__ == "__main__":
     test_text_processing() 
\ No newline at end of file
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Tests for the background job manager
+"""
+
+import json
+import os
+import time
+
+import app
+from jobs import JobError, JobManager
+
+
+def wait_for(manager, job_id, timeout=5):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        job = manager.get(job_id)
+        if job['state'] in ('done', 'failed'):
+            return job
+        time.sleep(0.01)
+    raise AssertionError('job did not finish')
+
+
+def test_job_progress_and_completion(tmp_path):
+    manager = JobManager(max_workers=1, state_dir=str(tmp_path))
+    seen_states = []
+
+    def work(job):
+        job.update(state='fetching')
+        job.update_url(0, 'fetching')
+        job.update_url(1, 'failed', 'timeout')
+        job.update_url(0, 'tokenizing')
+        seen_states.append(job.snapshot()['state'])
+        job.update_url(0, 'done')
+        job.update(state='done', analysis_id='abc123', message='ok')
+
+    job_id = manager.submit(work, ['https://a.example/p', 'https://b.example/p'])
+    job = wait_for(manager, job_id)
+    manager.shutdown()
+
+    assert seen_states == ['tokenizing']
+    assert job['analysis_id'] == 'abc123'
+    assert [entry['state'] for entry in job['urls']] == ['done', 'failed']
+    assert job['urls'][1]['error'] == 'timeout'
+
+    # Status is also readable by a manager in another process
+    assert JobManager(state_dir=str(tmp_path)).get(job_id)['state'] == 'done'
+
+
+def test_url_progress_writes_are_throttled(tmp_path, monkeypatch):
+    manager = JobManager(max_workers=1, state_dir=str(tmp_path))
+    writes = []
+    persist = manager._persist
+    monkeypatch.setattr(manager, '_persist', lambda snapshot: (writes.append(snapshot), persist(snapshot)))
+    urls = [f'https://a.example/p{i}' for i in range(300)]
+
+    def work(job):
+        job.update(state='fetching')
+        for index in range(len(urls)):
+            job.update_url(index, 'fetching')
+            job.update_url(index, 'tokenizing')
+        for index in range(len(urls)):
+            job.update_url(index, 'done')
+        job.update(state='done')
+
+    job_id = manager.submit(work, urls)
+    job = wait_for(manager, job_id)
+    manager.shutdown()
+
+    # Job-level updates and the switch to tokenizing are written at once, URL progress is batched
+    assert len(writes) < 20
+    assert 'tokenizing' in [snapshot['state'] for snapshot in writes]
+    assert JobManager(state_dir=str(tmp_path)).get(job_id) == job
+    assert {entry['state'] for entry in job['urls']} == {'done'}
+
+
+def test_job_errors_fail_the_job(tmp_path):
+    manager = JobManager(max_workers=1, state_dir=str(tmp_path))
+
+    def work(job):
+        raise JobError('Not enough URLs could be crawled successfully')
+
+    job = wait_for(manager, manager.submit(work, ['https://a.example/p']))
+    manager.shutdown()
+
+    assert job['state'] == 'failed'
+    assert job['message'] == 'Not enough URLs could be crawled successfully'
+
+
+def test_expired_finished_jobs_are_swept(tmp_path):
+    manager = JobManager(max_workers=1, state_dir=str(tmp_path), job_ttl=60)
+    finished = wait_for(manager, manager.submit(lambda job: job.update(state='done'), []))
+    manager.shutdown()
+    running_path = tmp_path / 'job_running.json'
+    running_path.write_text(json.dumps({'job_id': 'running', 'state': 'fetching'}))
+
+    # Both files were last updated two minutes ago; only the finished job's is removed
+    finished_path = tmp_path / f"job_{finished['job_id']}.json"
+    for path in (finished_path, running_path):
+        os.utime(path, (time.time() - 120, time.time() - 120))
+
+    assert manager.sweep_expired() == 1
+    assert not finished_path.exists() and running_path.exists()
+    assert manager.get(finished['job_id']) is None
+
+
+def test_crawl_submission_reports_job_through_the_api(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)  # Job state files live under ./data
+    monkeypatch.setattr(app, 'run_crawl_analysis', lambda urls, progress=None: ('abc12345', {}, 'ok'))
+    client = app.create_app({'WTF_CSRF_ENABLED': False}).test_client()
+
+    response = client.post('/crawl', data={'url_1': 'https://a.example/p', 'url_2': 'https://b.example/p'},
+                           headers={'Accept': 'application/json'})
+    assert response.status_code == 202
+    status_url = response.get_json()['status_url']
+
+    deadline = time.time() + 5
+    job = client.get(status_url).get_json()
+    while job['state'] not in ('done', 'failed') and time.time() < deadline:
+        time.sleep(0.01)
+        job = client.get(status_url).get_json()
+
+    assert job['state'] == 'done' and job['analysis_id'] == 'abc12345'
+    assert job['results_url'] == '/results/abc12345'
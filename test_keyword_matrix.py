@@ -0,0 +1,33 @@
+#!/usr/bin/env python3
+"""
+Tests that the NumPy document-term matrix backend ranks keywords like the Python one
+"""
+
+import random
+
+import pytest
+
+pytest.importorskip('numpy')
+
+from app import find_common_keywords
+
+
+def make_documents(seed, num_docs):
+    rng = random.Random(seed)
+    vocabulary = ['premium leather', 'trail shoe', 'waterproof', 'Best', 'best', 'size chart', 'pro max'] + \
+        [f'term{i}' for i in range(200)]
+    return [
+        {rng.choice(vocabulary): rng.randint(1, 6) for _ in range(rng.randint(0, 80))}
+        for _ in range(num_docs)
+    ]
+
+
+@pytest.mark.parametrize('num_docs', [1, 2, 3, 6, 25])
+def test_matrix_backend_matches_python_backend(num_docs):
+    for seed in range(20):
+        docs = make_documents(seed, num_docs)
+        assert find_common_keywords(docs, backend='matrix') == find_common_keywords(docs, backend='python')
+
+
+def test_matrix_backend_handles_empty_documents():
+    assert find_common_keywords([{}, {}], backend='matrix') == []
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Tests for memoized OpenAI keyword analysis, using a local stub of the OpenAI client
+"""
+
+import re
+from types import SimpleNamespace
+
+import pytest
+
+import app
+from llm_cache import LLMCache
+
+KEYWORDS = [
+    {'keyword': 'trail running shoe', 'frequency': 12, 'coverage': 1.0, 'files_containing': 3, 'strategic_score': 1012},
+    {'keyword': 'waterproof', 'frequency': 6, 'coverage': 0.66, 'files_containing': 2, 'strategic_score': 506}
+]
+
+MARKDOWN_TABLE = """| Keyword/Phrase | Search Intent | SEO Opportunity |
+|----------------|---------------|-----------------|
+| trail running shoe | Commercial | High |"""
+
+
+class StubOpenAI:
+    """Minimal stand-in for openai.OpenAI() that records chat completion requests"""
+
+    def __init__(self, reply=MARKDOWN_TABLE, error=None):
+        self.calls = []
+        self.reply = reply
+        self.error = error
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    def _create(self, **kwargs):
+        self.calls.append(kwargs)
+        if self.error:
+            raise self.error
+        reply = self.reply(kwargs['messages'][-1]['content']) if callable(self.reply) else self.reply
+        message = SimpleNamespace(content=reply)
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    cache = LLMCache(str(tmp_path), max_memory_entries=2)
+    monkeypatch.setattr(app, 'llm_cache', cache)
+    return cache
+
+
+def test_repeat_analysis_is_served_from_cache(cache):
+    client = StubOpenAI()
+
+    first = app.analyze_keywords_with_openai(KEYWORDS, 'Trail Shoe', client=client)
+    second = app.analyze_keywords_with_openai(KEYWORDS, 'Trail Shoe', client=client)
+
+    assert '<table' in first
+    assert second == first
+    assert len(client.calls) == 1
+
+    # A different product title is a different request
+    app.analyze_keywords_with_openai(KEYWORDS, 'Hiking Boot', client=client)
+    assert len(client.calls) == 2
+
+
+def test_disk_store_survives_memory_eviction(cache, tmp_path):
+    client = StubOpenAI()
+    for title in ('A', 'B', 'C'):
+        app.analyze_keywords_with_openai(KEYWORDS, title, client=client)
+
+    # 'A' was evicted from the 2-entry LRU but is still on disk
+    fresh_cache = LLMCache(str(tmp_path))
+    key = LLMCache.make_key(keywords=app.seo_keyword_payload(KEYWORDS), product_title='A',
+                            model=app.OPENAI_MODEL, temperature=app.OPENAI_TEMPERATURE)
+    assert key not in cache._memory
+    assert fresh_cache.get(key) is not None
+
+
+def test_errors_are_not_cached(cache):
+    failing = StubOpenAI(error=RuntimeError('rate limited'))
+    assert app.analyze_keywords_with_openai(KEYWORDS, 'Trail Shoe', client=failing).startswith('Error analyzing keywords')
+
+    client = StubOpenAI()
+    assert '<table' in app.analyze_keywords_with_openai(KEYWORDS, 'Trail Shoe', client=client)
+    assert len(client.calls) == 1
+
+
+def test_chunked_analysis_merges_tables(cache):
+    keywords = [{'keyword': f'kw{i}', 'frequency': 100 - i, 'coverage': 1.0, 'strategic_score': 1100 - i}
+                for i in range(90)]
+
+    def reply(prompt):
+        # Rate every third keyword High; each batch also repeats kw0 to check de-duplication
+        listed = re.findall(r'^(kw\d+) \(freq', prompt, flags=re.M)
+        rows = [f'| {kw} | Commercial | {"High" if int(kw[2:]) % 3 == 0 else "Low"} |' for kw in listed + ['kw0']]
+        return '| Keyword/Phrase | Search Intent | SEO Opportunity |\n|---|---|---|\n' + '\n'.join(rows)
+
+    client = StubOpenAI(reply=reply)
+    html = app.analyze_keywords_chunked(keywords, 'Trail Shoe', chunk_size=40, max_concurrency=3, client=client)
+
+    assert len(client.calls) == 3
+    assert 'Analyzed 90 of 90 keywords in 3 batches' in html
+    rows = re.findall(r'<tr><td>(kw\d+)</td><td>Commercial</td><td>(\w+)</td></tr>', html)
+    assert len(rows) == 90
+    assert [level for _, level in rows] == ['High'] * 30 + ['Low'] * 60
+    assert [kw for kw, _ in rows][:3] == ['kw0', 'kw3', 'kw6']
+
+
+def test_chunked_analysis_respects_token_budget(cache):
+    keywords = [{'keyword': f'kw{i}', 'frequency': 1, 'coverage': 0.5, 'strategic_score': 51} for i in range(200)]
+    client = StubOpenAI()
+
+    html = app.analyze_keywords_chunked(keywords, 'Trail Shoe', chunk_size=40, token_budget=6000, client=client)
+
+    assert len(client.calls) == 2
+    assert 'Analyzed 80 of 200 keywords in 2 batches' in html
@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""
+Tests for the metrics registry and the /metrics endpoint
+"""
+
+import app
+from llm_cache import LLMCache
+from metrics import Registry, stage_timer
+
+
+def test_histogram_and_counter_rendering():
+    registry = Registry()
+    latency = registry.histogram('demo_seconds', 'Demo latency', ['stage'], buckets=(0.1, 1))
+    hits = registry.counter('demo_hits_total', 'Demo hits', ['cache'])
+
+    latency.observe(0.05, stage='fetch')
+    latency.observe(0.5, stage='fetch')
+    hits.inc(cache='http')
+    hits.inc(2, cache='http')
+
+    lines = registry.render().splitlines()
+    assert '# TYPE demo_seconds histogram' in lines
+    assert 'demo_seconds_bucket{stage="fetch",le="0.1"} 1' in lines
+    assert 'demo_seconds_bucket{stage="fetch",le="+Inf"} 2' in lines
+    assert 'demo_seconds_count{stage="fetch"} 2' in lines
+    assert 'demo_hits_total{cache="http"} 3' in lines
+
+
+def test_stage_timer_accumulates_into_timings():
+    timings = {}
+    before = app.metrics.STAGE_SECONDS.count(stage='parse')
+    for _ in range(2):
+        with stage_timer('parse', timings):
+            pass
+
+    assert list(timings) == ['parse']
+    assert app.metrics.STAGE_SECONDS.count(stage='parse') == before + 2
+
+
+def test_metrics_endpoint_reports_cache_lookups(monkeypatch, tmp_path):
+    monkeypatch.setattr(app, 'llm_cache', LLMCache(str(tmp_path)))
+    misses = app.metrics.CACHE_REQUESTS.value(cache='llm', result='miss')
+    assert app.get_cached_analysis('missing') is None
+
+    response = app.app.test_client().get('/metrics')
+    body = response.get_data(as_text=True)
+
+    assert response.status_code == 200
+    assert response.mimetype == 'text/plain'
+    assert '# TYPE analyzer_stage_duration_seconds histogram' in body
+    assert f'analyzer_cache_requests_total{{cache="llm",result="miss"}} {misses + 1}' in body
@@ -0,0 +1,33 @@
+#!/usr/bin/env python3
+"""
+Tests for parsing and tokenizing in the optional process pool
+"""
+
+import glob
+import os
+
+import app
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+
+def test_pool_results_match_in_thread_processing(monkeypatch):
+    monkeypatch.setattr(app, 'parse_pool', None)
+    with open(sorted(glob.glob(os.path.join(ROOT, 'samples', '*.html')))[0], 'rb') as f:
+        content = f.read()
+
+    assert app.get_parse_pool() is None  # PARSE_PROCESSES defaults to 0
+    monkeypatch.setitem(app.app.config, 'PARSE_PROCESSES', 2)
+    with app.app.app_context():
+        pool = app.get_parse_pool()
+        assert pool is app.get_parse_pool() is not None
+    try:
+        timings = {}
+        pooled = app.parse_and_tokenize(content, 'https://example.com/guide', timings=timings, pool=pool)
+        local = app.parse_and_tokenize(content, 'https://example.com/guide')
+    finally:
+        pool.shutdown()
+
+    assert pooled == local
+    assert pooled[1] and set(pooled[0]) == {'title', 'description', 'content_hash', 'body_hash', 'fingerprint'}
+    assert set(timings) == {'parse', 'extract', 'fingerprint', 'tokenize'}
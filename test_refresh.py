@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Tests for refreshing a saved analysis incrementally
+"""
+
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import app
+from scheduler import HostScheduler
+from storage import SQLiteStore
+
+PAGE = ('<html><head><title>{title}</title></head><body><main><h1>{title}</h1>'
+        '<div class="product-description"><p>Waterproof trail running shoe with a cushioned midsole. {extra}</p></div>'
+        '</main>{markup}</body></html>')
+
+
+class ShopHandler(BaseHTTPRequestHandler):
+    pages = {}
+
+    def do_GET(self):
+        body = self.pages.get(self.path)
+        if body is None:
+            self.send_error(404)
+            return
+        body = body.encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def base_url(tmp_path, monkeypatch):
+    monkeypatch.setattr(app, 'analysis_store', SQLiteStore(str(tmp_path / 'analyses.db')))
+    monkeypatch.setattr(app, 'page_cache', None)
+    monkeypatch.setattr(app, 'fetch_scheduler', HostScheduler(min_delay=0, respect_robots=False))
+    ShopHandler.pages = {
+        f'/p{i}': PAGE.format(title=f'Trail Shoe {i}', extra='Breathable mesh upper.', markup='')
+        for i in range(3)
+    }
+    server = ThreadingHTTPServer(('127.0.0.1', 0), ShopHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f'http://127.0.0.1:{server.server_port}'
+    server.shutdown()
+
+
+def test_aggregator_remove_undoes_add():
+    aggregator = app.KeywordAggregator()
+    aggregator.add({'trail shoe': 2, 'mesh': 1})
+    aggregator.add({'trail shoe': 1, 'gore tex': 3})
+    aggregator.remove({'trail shoe': 2, 'mesh': 1})
+
+    assert aggregator.num_files == 1
+    assert aggregator.doc_freq == {'trail shoe': 1, 'gore tex': 1}
+    assert aggregator.total_freq == {'trail shoe': 1, 'gore tex': 3}
+
+
+def test_refresh_retokenizes_only_changed_pages(base_url):
+    urls = [f'{base_url}/p{i}' for i in range(3)]
+    with app.app.app_context():
+        analysis_id, original, _ = app.run_crawl_analysis(urls)
+
+        # p1's text changes, p2 only gains markup that extraction ignores, p0 is byte-identical
+        ShopHandler.pages['/p1'] = PAGE.format(title='Trail Shoe 1', extra='Gore tex lining keeps feet dry. Gore tex.', markup='')
+        ShopHandler.pages['/p2'] = PAGE.format(title='Trail Shoe 2', extra='Breathable mesh upper.',
+                                               markup='<script>var build = 2;</script>')
+        new_id, result, message = app.refresh_analysis(analysis_id)
+        fresh_id, fresh, _ = app.run_crawl_analysis(urls)
+
+    diff = result['ranking_diff']
+    assert new_id != analysis_id and result['refreshed_from'] == analysis_id
+    assert diff['pages'] == {'unchanged': 2, 'changed': 1, 'failed': 0}
+    assert diff['previous_analysis_id'] == analysis_id
+    assert 'gore tex' in {entry['keyword'] for entry in diff['added']}
+    assert 'Analysis refreshed! 1 of 3 pages changed' in message
+
+    # Incremental stats give the same ranking as analyzing from scratch
+    assert result['common_keywords'] == fresh['common_keywords']
+    saved = app.analysis_store.load(new_id)
+    assert saved['ranking_diff'] == diff
+    assert saved['url_details'][0]['filtered_keywords'] == original['url_details'][0]['filtered_keywords']
+
+
+def test_refresh_resolves_near_duplicates_like_a_new_analysis(base_url):
+    urls = [f'{base_url}/p{i}' for i in range(3)]
+    with app.app.app_context():
+        analysis_id, _, _ = app.run_crawl_analysis(urls)
+
+        # p2 now serves p0's content, so it is a near-duplicate of p0
+        ShopHandler.pages['/p2'] = ShopHandler.pages['/p0']
+        duplicate_id, refreshed, _ = app.refresh_analysis(analysis_id)
+        _, fresh, _ = app.run_crawl_analysis(urls)
+
+        assert [data['status'] for data in refreshed['url_details']] == ['success', 'success', 'duplicate']
+        assert refreshed['url_details'][2]['duplicate_of'] == urls[0]
+        assert refreshed['common_keywords'] == fresh['common_keywords']
+
+        # Once p0 changes, the saved duplicate is analyzed again and counted
+        ShopHandler.pages['/p0'] = PAGE.format(title='Trail Shoe 0', extra='Gore tex lining keeps feet dry.', markup='')
+        _, refreshed, _ = app.refresh_analysis(duplicate_id)
+        _, fresh, _ = app.run_crawl_analysis(urls)
+
+    assert [data['status'] for data in refreshed['url_details']] == ['success', 'success', 'success']
+    assert refreshed['common_keywords'] == fresh['common_keywords']
+
+
+def test_refresh_retokenizes_every_page_when_field_weights_changed(base_url, monkeypatch):
+    urls = [f'{base_url}/p{i}' for i in range(3)]
+    with app.app.app_context():
+        analysis_id, original, _ = app.run_crawl_analysis(urls)
+
+        monkeypatch.setitem(app.app.config, 'FIELD_WEIGHTS', dict(app.DEFAULT_FIELD_WEIGHTS, product_title=5))
+        new_id, result, _ = app.refresh_analysis(analysis_id)
+        _, fresh, _ = app.run_crawl_analysis(urls)
+
+    assert result['ranking_diff']['pages'] == {'unchanged': 0, 'changed': 3, 'failed': 0}
+    assert result['field_weights']['product_title'] == 5
+    assert [data['filtered_keywords'] for data in result['url_details']] == \
+        [data['filtered_keywords'] for data in fresh['url_details']]
+    assert result['url_details'][0]['filtered_keywords'] != original['url_details'][0]['filtered_keywords']
+    assert result['common_keywords'] == fresh['common_keywords']
+    assert app.analysis_store.load(new_id)['field_weights'] == result['field_weights']
+
+
+def test_ranking_diff():
+    previous = [{'keyword': keyword} for keyword in ('a', 'b', 'c', 'd')]
+    current = [{'keyword': keyword} for keyword in ('c', 'a', 'e', 'b')]
+    diff = app.ranking_diff(previous, current)
+
+    assert diff['added'] == [{'keyword': 'e', 'rank': 3}]
+    assert diff['removed'] == [{'keyword': 'd', 'previous_rank': 4}]
+    assert diff['moved'] == [{'keyword': 'c', 'previous_rank': 3, 'rank': 1, 'change': 2},
+                             {'keyword': 'b', 'previous_rank': 2, 'rank': 4, 'change': -2},
+                             {'keyword': 'a', 'previous_rank': 1, 'rank': 2, 'change': -1}]
+
+
+def test_refresh_of_unknown_analysis_is_404(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)  # The app's analysis store lives under ./data
+    client = app.create_app({'WTF_CSRF_ENABLED': False}).test_client()
+    response = client.post('/results/missing/refresh', headers={'Accept': 'application/json'})
+    assert response.status_code == 404
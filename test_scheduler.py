@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Tests for the per-host politeness scheduler
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+from scheduler import ROBOTS_MAX_BYTES, HostScheduler, RobotsDisallowed, retry_after_seconds
+
+ROBOTS = b'User-agent: *\nDisallow: /private\n'
+
+
+class PoliteHandler(BaseHTTPRequestHandler):
+    in_flight = 0
+    max_in_flight = 0
+    busy_answers = 0
+    robots = ROBOTS
+    lock = threading.Lock()
+
+    def do_GET(self):
+        if self.path == '/robots.txt':
+            self.reply(200, PoliteHandler.robots)
+        elif self.path == '/busy' and PoliteHandler.busy_answers:
+            PoliteHandler.busy_answers -= 1
+            self.reply(429, b'slow down', {'Retry-After': '0'})
+        else:
+            with PoliteHandler.lock:
+                PoliteHandler.in_flight += 1
+                PoliteHandler.max_in_flight = max(PoliteHandler.max_in_flight, PoliteHandler.in_flight)
+            time.sleep(0.05)
+            with PoliteHandler.lock:
+                PoliteHandler.in_flight -= 1
+            self.reply(200, b'<html><body>ok</body></html>')
+
+    def reply(self, status, body, headers=None):
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def base_url():
+    PoliteHandler.in_flight = PoliteHandler.max_in_flight = PoliteHandler.busy_answers = 0
+    PoliteHandler.robots = ROBOTS
+    server = ThreadingHTTPServer(('127.0.0.1', 0), PoliteHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f'http://127.0.0.1:{server.server_port}'
+    server.shutdown()
+
+
+def test_robots_txt_disallows_urls(base_url):
+    scheduler = HostScheduler(min_delay=0)
+
+    with pytest.raises(RobotsDisallowed):
+        scheduler.fetch(f'{base_url}/private/page')
+    assert scheduler.fetch(f'{base_url}/public').status_code == 200
+
+
+def test_robots_txt_is_fetched_politely_and_capped(base_url):
+    # Rules past the size cap are ignored
+    PoliteHandler.robots = b'# padding\n' * (ROBOTS_MAX_BYTES // 10 + 1) + ROBOTS
+    scheduler = HostScheduler(min_delay=0.2)
+    start = time.monotonic()
+
+    assert scheduler.fetch(f'{base_url}/private/page').status_code == 200
+    # The page waited its turn after the robots.txt request
+    assert time.monotonic() - start >= 0.2
+
+
+def test_idle_hosts_are_evicted_beyond_max_hosts():
+    scheduler = HostScheduler(min_delay=0, max_hosts=2)
+    scheduler.backoff('http://busy.example/')  # Backing off, so kept
+    for host in ('a', 'b', 'c'):
+        scheduler._host(f'http://{host}.example/')
+
+    assert list(scheduler._hosts) == ['busy.example', 'c.example']
+
+
+def test_held_host_is_not_evicted_before_its_slot_is_taken():
+    scheduler = HostScheduler(min_delay=0, max_hosts=1)
+    state = scheduler._host('http://a.example/', hold=True)
+    scheduler._host('http://b.example/')
+
+    # a.example is still registered, so later requests share its limits
+    assert scheduler._host('http://a.example/') is state
+    scheduler._release(state)
+    scheduler._host('http://c.example/')
+    assert 'a.example' not in scheduler._hosts
+
+
+def test_host_concurrency_and_spacing(base_url):
+    scheduler = HostScheduler(max_per_host=1, min_delay=0.1)
+    start = time.monotonic()
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        list(executor.map(lambda i: scheduler.fetch(f'{base_url}/p{i}'), range(4)))
+
+    assert PoliteHandler.max_in_flight == 1
+    assert time.monotonic() - start >= 0.3
+
+
+def test_backoff_retries_after_429(base_url):
+    PoliteHandler.busy_answers = 1
+    assert HostScheduler(min_delay=0).fetch(f'{base_url}/busy').status_code == 200
+
+    PoliteHandler.busy_answers = 5
+    with pytest.raises(requests.exceptions.HTTPError):
+        HostScheduler(min_delay=0, max_retries=1, backoff_base=0).fetch(f'{base_url}/busy')
+
+
+def test_retry_after_parsing():
+    class Response:
+        def __init__(self, value):
+            self.headers = {'Retry-After': value}
+
+    assert retry_after_seconds(Response('7')) == 7
+    assert retry_after_seconds(Response('Wed, 21 Oct 2015 07:28:10 GMT'), now=1445412480) == 10
+    assert retry_after_seconds(Response('soon')) is None
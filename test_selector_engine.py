@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+"""
+Tests that the single-pass selector engine agrees with soup.select_one()
+"""
+
+from bs4 import BeautifulSoup
+
+from selector_engine import CompiledSelector, SelectorMatcher
+
+PAGE = """
+<html><body>
+  <nav aria-label="Breadcrumb trail"><a>Home</a></nav>
+  <div class="product-name"><h1 id="t">Trail Runner</h1></div>
+  <div class="item-details-wrap">Lightweight shoe</div>
+  <div class="product-description">Waterproof trail running shoe</div>
+  <span class="was-price sale">$99</span>
+  <ul class="spec-list"><li>Weight: 9oz</li></ul>
+  <div data-testid="description-box">Testid description</div>
+</body></html>
+"""
+
+SECTIONS = {
+    'title': ['h1.product-title', '.product-name h1', 'h1'],
+    'description': ['.product-description', '[class*="details"]', '[data-testid*="description"]'],
+    'price': ['.price', '[class*="price"]'],
+    'breadcrumbs': ['.breadcrumb', 'nav[aria-label*="breadcrumb"]', 'nav[aria-label*="Breadcrumb"]'],
+    'specs': ['ul > li', '.spec-list li:first-child'],
+    'missing': ['.does-not-exist', '#nope']
+}
+
+
+def test_first_matches_agree_with_select_one():
+    soup = BeautifulSoup(PAGE, 'lxml')
+    matches = SelectorMatcher(SECTIONS).first_matches(soup)
+
+    for section, selectors in SECTIONS.items():
+        expected = next((soup.select_one(s) for s in selectors if soup.select_one(s)), None)
+        assert matches[section] is expected, section
+
+
+def test_unsupported_syntax_falls_back_to_soupsieve():
+    assert CompiledSelector('.spec-list li:first-child').chain is None
+    assert CompiledSelector('.product-name > h1').chain is not None
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Tests for streaming SEO analysis over Server-Sent Events, using a fake streaming OpenAI client
+"""
+
+import json
+import os
+from types import SimpleNamespace
+
+import flask
+import pytest
+from flask_wtf.csrf import generate_csrf
+
+import app
+from llm_cache import LLMCache
+
+MARKDOWN = """**Competitive keyword analysis**
+
+| Keyword/Phrase | Search Intent | SEO Opportunity |
+|----------------|---------------|-----------------|
+| trail running shoe | Commercial | High |
+| waterproof | Informational | Medium |
+
+- Prioritize **trail running shoe** in the title"""
+
+
+class FakeStreamingOpenAI:
+    """Stand-in for openai.OpenAI() whose chat completions stream a canned reply in small chunks"""
+
+    def __init__(self, reply=MARKDOWN, chunk_size=7):
+        self.calls = []
+        self.reply = reply
+        self.chunk_size = chunk_size
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    def _create(self, **kwargs):
+        self.calls.append(kwargs)
+        assert kwargs.get('stream') is True
+        for start in range(0, len(self.reply), self.chunk_size):
+            delta = SimpleNamespace(content=self.reply[start:start + self.chunk_size])
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=delta)])
+
+
+def parse_sse(body):
+    events = []
+    for message in body.strip().split('\n\n'):
+        lines = dict(line.split(': ', 1) for line in message.split('\n'))
+        events.append((lines['event'], json.loads(lines['data'])))
+    return events
+
+
+@pytest.fixture
+def stream_client(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    os.makedirs('data')
+    with open('data/analysis_stream1.json', 'w') as f:
+        json.dump({'analysis_id': 'stream1', 'common_keywords': [
+            {'keyword': 'trail running shoe', 'frequency': 9, 'coverage': 1.0, 'files_containing': 3, 'strategic_score': 1009}
+        ]}, f)
+
+    fake = FakeStreamingOpenAI()
+    monkeypatch.setattr(app, 'openai_client', fake)
+    monkeypatch.setattr(app, 'llm_cache', LLMCache(str(tmp_path / 'llm_cache')))
+
+    # The page's CSRF token, as the form would pass it to EventSource
+    client = app.app.test_client()
+    with app.app.test_request_context():
+        token = generate_csrf()
+        with client.session_transaction() as session:
+            session['csrf_token'] = flask.session['csrf_token']
+    client.token = token
+    return client, fake
+
+
+def test_renderer_emits_rows_as_lines_complete():
+    renderer = app.StreamingMarkdownRenderer()
+    events = renderer.feed('| a | b |\n|---|---|\n| 1 | 2')
+    assert [event for event, _ in events] == ['table_start']
+
+    events = renderer.feed(' |\n| 3 | 4 |\n') + renderer.finish()
+    assert events == [('table_row', '<tr><td>1</td><td>2</td></tr>'),
+                      ('table_row', '<tr><td>3</td><td>4</td></tr>'),
+                      ('table_end', '')]
+
+
+def test_stream_endpoint_sends_rows_then_canonical_html(stream_client):
+    client, fake = stream_client
+
+    response = client.get(f'/seo-analysis/stream1/stream?product_title=Trail+Shoe&csrf_token={client.token}')
+    events = parse_sse(response.get_data(as_text=True))
+
+    assert response.mimetype == 'text/event-stream'
+    assert [event for event, _ in events] == ['html', 'table_start', 'table_row', 'table_row', 'table_end', 'html', 'done']
+    assert events[-1][1]['html'] == app.markdown_to_html(MARKDOWN)
+
+    # The finished analysis is cached, so a repeat request never reaches the API
+    again = parse_sse(client.get(f'/seo-analysis/stream1/stream?product_title=Trail+Shoe&csrf_token={client.token}')
+                      .get_data(as_text=True))
+    assert again == [('done', {'html': events[-1][1]['html'], 'cached': True})]
+    assert len(fake.calls) == 1
+
+
+def test_stream_endpoint_requires_product_title(stream_client):
+    client, _ = stream_client
+    assert client.get(f'/seo-analysis/stream1/stream?csrf_token={client.token}').status_code == 400
+    assert client.get(f'/seo-analysis/missing/stream?product_title=x&csrf_token={client.token}').status_code == 404
+
+
+def test_stream_endpoint_requires_csrf_token(stream_client):
+    client, fake = stream_client
+    for query in ('', '&csrf_token=forged'):
+        response = client.get(f'/seo-analysis/stream1/stream?product_title=Trail+Shoe{query}')
+        assert response.status_code == 400 and 'CSRF' in response.get_json()['error']
+    assert fake.calls == []
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Tests for the analysis storage backends
+"""
+
+import json
+import os
+
+import pytest
+
+import app
+from storage import JSONFileStore, SQLiteStore, keyword_tier, migrate_json_files
+
+RESULT = {
+    'analysis_id': 'abc12345',
+    'timestamp': '2025-06-01T12:30:00.000000',
+    'urls_processed': 2,
+    'urls': ['https://a.example/p', 'https://b.example/p'],
+    'common_keywords': [
+        {'keyword': 'trail running shoe', 'frequency': 9, 'coverage': 1.0, 'files_containing': 2, 'strategic_score': 1009},
+        {'keyword': 'waterproof', 'frequency': 4, 'coverage': 0.5, 'files_containing': 1, 'strategic_score': 204}
+    ],
+    'keyword_count': 2,
+    'url_details': [
+        {'url': 'https://a.example/p', 'title': 'Trail Shoe', 'description': '', 'total_tokens': 14,
+         'filtered_keywords': {'trail running shoe': 5, 'waterproof': 4, 'grip': 5}, 'keyword_count': 3,
+         'status': 'success'},
+        {'url': 'https://b.example/p', 'title': '', 'description': '', 'total_tokens': 0,
+         'filtered_keywords': {}, 'keyword_count': 0, 'status': 'failed', 'error': 'timeout'}
+    ]
+}
+
+
+@pytest.fixture
+def store(tmp_path):
+    return SQLiteStore(str(tmp_path / 'analyses.db'), legacy_dir=str(tmp_path))
+
+
+def test_sqlite_round_trip(store):
+    store.save(RESULT)
+
+    loaded = store.load('abc12345')
+    assert loaded == RESULT
+    assert list(loaded['url_details'][0]) == list(RESULT['url_details'][0])
+
+
+def test_summary_and_url_keywords_load_separately(store):
+    store.save(RESULT)
+
+    summary = store.load_summary('abc12345')
+    assert summary['common_keywords'] == RESULT['common_keywords']
+    assert all('filtered_keywords' not in data for data in summary['url_details'])
+    assert summary['url_details'][1]['error'] == 'timeout'
+
+    assert store.load_url_keywords('abc12345', 0) == {'trail running shoe': 5, 'waterproof': 4, 'grip': 5}
+    assert store.load_url_keywords('abc12345', 5) is None
+    with pytest.raises(FileNotFoundError):
+        store.load_url_keywords('missing', 0)
+
+
+def test_legacy_json_files_are_imported(store, tmp_path):
+    JSONFileStore(str(tmp_path)).save(RESULT)
+
+    # Read through from the legacy file, then served from SQLite once it is gone
+    assert store.load_summary('abc12345')['keyword_count'] == 2
+    os.remove(tmp_path / 'analysis_abc12345.json')
+    assert store.load('abc12345') == RESULT
+
+
+def test_migrate_json_files(tmp_path):
+    legacy = JSONFileStore(str(tmp_path))
+    legacy.save(RESULT)
+    legacy.save(dict(RESULT, analysis_id='def67890'))
+    store = SQLiteStore(str(tmp_path / 'analyses.db'))
+
+    assert migrate_json_files(str(tmp_path), store, remove=True) == ['abc12345', 'def67890']
+    assert store.load('def67890')['urls'] == RESULT['urls']
+    assert not any(name.endswith('.json') for name in os.listdir(tmp_path))
+
+
+def test_keyword_tiers():
+    assert [keyword_tier(kw) for kw in RESULT['common_keywords']] == ['universal', 'gap']
+
+
+def ranked_result(count=30):
+    keywords = [{'keyword': f'kw{i:02d}', 'frequency': 30 - i // 2, 'coverage': (i % 3 + 1) / 3,
+                 'files_containing': i % 3 + 1, 'strategic_score': 30 - i // 2 + (1000 if i < 10 else 50)}
+                for i in range(count)]
+    return dict(RESULT, analysis_id='ranked01', common_keywords=keywords, keyword_count=count)
+
+
+@pytest.mark.parametrize('backend', ['sqlite', 'json'])
+def test_query_keywords_backends_agree(tmp_path, backend):
+    store = SQLiteStore(str(tmp_path / 'analyses.db')) if backend == 'sqlite' else JSONFileStore(str(tmp_path))
+    store.save(ranked_result())
+
+    total, rows = store.query_keywords('ranked01', offset=5, limit=10)
+    assert total == 30
+    assert [row['rank'] for row in rows] == list(range(6, 16))
+
+    total, rows = store.query_keywords('ranked01', tier='universal', top_k=4)
+    assert total == 4
+    assert [row['keyword'] for row in rows] == ['kw00', 'kw01', 'kw02', 'kw03']
+
+    total, rows = store.query_keywords('ranked01', sort='coverage', descending=False, limit=3)
+    assert [(row['coverage'], row['rank']) for row in rows] == [(1 / 3, 1), (1 / 3, 4), (1 / 3, 7)]
+
+    with pytest.raises(FileNotFoundError):
+        store.query_keywords('missing')
+
+
+def test_keywords_api(tmp_path, monkeypatch):
+    store = SQLiteStore(str(tmp_path / 'analyses.db'))
+    store.save(ranked_result())
+    monkeypatch.setattr(app, 'analysis_store', store)
+    client = app.app.test_client()
+
+    page = client.get('/api/analyses/ranked01/keywords?page=2&per_page=8&tier=general').get_json()
+    assert (page['total'], page['pages']) == (20, 3)
+    assert [kw['rank'] for kw in page['keywords']] == list(range(19, 27))
+    assert page['keywords'][0]['tier'] == 'general'
+
+    top = client.get('/api/analyses/ranked01/keywords?sort=frequency&top_k=5&per_page=2&page=3').get_json()
+    assert top['total'] == 5
+    assert [kw['keyword'] for kw in top['keywords']] == ['kw04']
+
+    assert client.get('/api/analyses/ranked01/keywords?sort=title').status_code == 400
+    assert client.get('/api/analyses/ranked01/keywords?per_page=0').status_code == 400
+    assert client.get('/api/analyses/missing/keywords').status_code == 404